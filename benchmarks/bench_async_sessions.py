@@ -0,0 +1,140 @@
+"""
+Purpose:
+Compares running interactive programs as coroutines of one event loop (--target async)
+with running each of them in its own Python process.
+
+Explanation:
+- The program asks for a name and a number, loops, and prints a greeting, so every
+  session waits for input twice.
+- Async target: the program is compiled once and 'sessions' copies run concurrently with
+  compiler.async_target.run_session. Each answer arrives after a short simulated delay, as
+  if a student were typing, while the other sessions keep running.
+- Processes: the script target is run in 'processes' separate Python processes, one after
+  the other, with the answers on stdin (the cost of the playground's current approach).
+- Both must print the same text for the same answers.
+- Reports the time per session of both approaches and the resident memory growth of the
+  event loop process per session (Linux only).
+
+Usage:
+    python benchmarks/bench_async_sessions.py [--sessions N] [--processes P]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.async_target import run_session
+from compiler.compiler import PenguinBubbleCompiler
+
+PROGRAM = """
+penguinDo(total)(n)
+    iceBucket result = 0
+    iceBucket i = 0
+    keepWalking(i < n)
+        iceBucket result = result slideUp i
+        iceBucket i = i slideUp 1
+    returnIce result
+
+penguinTake(name) "Name? "
+penguinTake(n) "How far should I count? "
+penguinSay "Hello " + str(name) + ", the total is " + str(total(n))
+"""
+
+
+def answers_for(session):
+    return [f"penguin{session}", str(1000 + session % 100)]
+
+
+def resident_kib():
+    """
+    Returns the resident memory of this process in KiB, or None where /proc is missing.
+    """
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+async def run_sessions(program, sessions, delay):
+    """
+    Runs 'sessions' concurrent sessions; returns the printed text of each.
+    """
+    async def one(session):
+        pending = answers_for(session)
+        output = []
+
+        async def read():
+            await asyncio.sleep(delay)
+            return pending.pop(0)
+
+        async def write(text):
+            output.append(text)
+
+        await run_session(program, read, write)
+        return "".join(output)
+
+    return await asyncio.gather(*(one(session) for session in range(sessions)))
+
+
+def run_processes(source, processes, workdir):
+    """
+    Runs the script build once per session in its own process; returns the printed text of each.
+    """
+    script = os.path.join(workdir, "program.py")
+    with open(script, "w", encoding="utf-8") as f:
+        f.write(source)
+    outputs = []
+    for session in range(processes):
+        answers = "".join(f"{answer}\n" for answer in answers_for(session))
+        result = subprocess.run([sys.executable, script], input=answers, capture_output=True,
+                                text=True, check=True)
+        outputs.append(result.stdout)
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark async sessions against one process per session.")
+    parser.add_argument('--sessions', type=int, default=2000, help='Concurrent async sessions.')
+    parser.add_argument('--processes', type=int, default=20, help='Sessions run as separate processes.')
+    parser.add_argument('--delay', type=float, default=0.01, help='Simulated typing delay per answer, in seconds.')
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        program = PenguinBubbleCompiler(target="async").compile_to_code(PROGRAM)
+        script = PenguinBubbleCompiler().compile(PROGRAM)
+
+    memory_before = resident_kib()
+    start = time.perf_counter()
+    async_outputs = asyncio.run(run_sessions(program, args.sessions, args.delay))
+    async_time = time.perf_counter() - start
+    memory_after = resident_kib()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        process_outputs = run_processes(script, args.processes, workdir)
+        process_time = time.perf_counter() - start
+
+    if async_outputs[:args.processes] != process_outputs:
+        raise SystemExit("The async sessions printed different text than the processes.")
+    print(f"async target  {args.sessions} sessions in {async_time:6.2f} s, "
+          f"{async_time / args.sessions * 1e3:7.2f} ms per session")
+    print(f"processes     {args.processes} sessions in {process_time:6.2f} s, "
+          f"{process_time / args.processes * 1e3:7.2f} ms per session (without typing delays)")
+    if memory_before is not None and memory_after is not None:
+        print(f"event loop memory growth {(memory_after - memory_before) / args.sessions:.1f} KiB per session")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Purpose:
+Compares a scalar keepWalking loop with the equivalent penguinFlock bulk operations
+on a data-processing exercise (scale every value, then sum and take the maximum).
+
+Explanation:
+- Both programs are compiled with the PenguinBubbleCompiler and executed in-process.
+- A warm-up run keeps the one-time NumPy import out of the measurement.
+- The flock version uses NumPy when it is installed and the pure-Python fallback otherwise;
+  the backend in use is printed with the results.
+
+Usage:
+    python benchmarks/bench_flock.py [--size N]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.compiler import PenguinBubbleCompiler
+
+SCALAR_PROGRAM = """
+iceBucket i = 0
+iceBucket total = 0
+iceBucket largest = 0
+keepWalking(i < {size})
+    iceBucket scaled = i penguinBoost 3 slideUp 1
+    iceBucket total = total slideUp scaled
+    penguinIf(scaled > largest)
+        iceBucket largest = scaled
+    iceBucket i = i slideUp 1
+"""
+
+FLOCK_PROGRAM = """
+penguinFlock(values) range({size})
+iceBucket scaled = values penguinBoost 3 slideUp 1
+iceBucket total = flockSum(scaled)
+iceBucket largest = flockMax(scaled)
+"""
+
+
+def run(source):
+    """
+    Compiles and executes a program, returning (elapsed seconds, namespace).
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        compiled = PenguinBubbleCompiler().compile(source)
+    code = compile(compiled, "<benchmark>", "exec")
+    namespace = {}
+    start = time.perf_counter()
+    exec(code, namespace)
+    return time.perf_counter() - start, namespace
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark penguinFlock bulk operations.")
+    parser.add_argument('--size', type=int, default=1000000, help='Number of elements processed.')
+    args = parser.parse_args()
+
+    # Warm-up run so the one-time NumPy import is not part of the measurement
+    run(FLOCK_PROGRAM.format(size=1))
+
+    scalar_time, scalar = run(SCALAR_PROGRAM.format(size=args.size))
+    flock_time, flock = run(FLOCK_PROGRAM.format(size=args.size))
+    assert (scalar["total"], scalar["largest"]) == (flock["total"], flock["largest"])
+
+    backend = "numpy" if flock["_penguin_numpy"] is not None else "pure Python"
+    print(f"keepWalking loop: {scalar_time * 1000:.1f} ms")
+    print(f"penguinFlock ({backend}): {flock_time * 1000:.1f} ms")
+    print(f"speedup: {scalar_time / flock_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Purpose:
+Measures the run-time overhead of the instrumented build mode (--instrument).
+
+Explanation:
+- Two workloads: a call-heavy one (naive recursive fib, a profiled call per step) and a
+  loop-heavy one (a keepWalking loop with one cheap statement per iteration). Both are
+  worst cases; real programs do more work per call and per iteration.
+- Each program is compiled with and without instrumentation and executed in-process,
+  alternating between the two builds so both see the same machine load.
+- Reports the best time of each build and the relative overhead.
+
+Usage:
+    python benchmarks/bench_instrument.py [--fib N] [--loops N] [--repeat R]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.compiler import PenguinBubbleCompiler
+
+CALL_HEAVY = """
+penguinDo(fib)(n)
+    penguinIf(n < 2)
+        returnIce n
+    returnIce fib(n slideDown 1) slideUp fib(n slideDown 2)
+
+iceBucket result = fib({n})
+"""
+
+LOOP_HEAVY = """
+penguinDo(total)(n)
+    iceBucket acc = 0
+    iceBucket i = 0
+    keepWalking(i < n)
+        iceBucket acc = acc slideUp i penguinBoost i
+        iceBucket i = i slideUp 1
+    returnIce acc
+
+iceBucket result = total({n})
+"""
+
+
+def best_times(programs, repeat):
+    """
+    Executes the code objects in turn, 'repeat' times each, and returns the fastest run
+    of every one. The exit hook that prints the profile report is never registered.
+    """
+    best = [float("inf")] * len(programs)
+    for _ in range(repeat):
+        for number, program in enumerate(programs):
+            namespace = {"__name__": "__bench__"}
+            with mock.patch("atexit.register"):
+                start = time.perf_counter()
+                exec(program, namespace)
+                best[number] = min(best[number], time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the instrumented build mode.")
+    parser.add_argument('--fib', type=int, default=27, help='Argument of the recursive fib workload.')
+    parser.add_argument('--loops', type=int, default=1000000, help='Iterations of the loop workload.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per build; the best is reported.')
+    args = parser.parse_args()
+
+    for label, template, n in (("calls", CALL_HEAVY, args.fib), ("loops", LOOP_HEAVY, args.loops)):
+        source = template.format(n=n)
+        with contextlib.redirect_stdout(io.StringIO()):
+            plain = PenguinBubbleCompiler().compile_to_code(source)
+            instrumented = PenguinBubbleCompiler(instrument=True).compile_to_code(source)
+        baseline, profiled = best_times([plain, instrumented], args.repeat)
+        print(f"{label:>5}: plain {baseline * 1e3:8.1f} ms, instrumented {profiled * 1e3:8.1f} ms, "
+              f"overhead {(profiled / baseline - 1) * 100:+.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Purpose:
+Measures what outlining deeply nested blocks costs, in compile time and in run time.
+
+Explanation:
+- The program is machine-generated: a function whose keepWalking loop runs 'iterations'
+  times through 'depth' nested penguinIf blocks, each updating a few local variables.
+- At depth 18 Python can still compile the program as written, so it is built with
+  outlining off (outline_depth=None), with the default outline_depth and with a small one
+  that outlines every few levels. Each build must print the same result.
+- Compile time covers the .pg compiler and Python's compile(); run time is the exec of
+  the compiled code object. Both report the best of 'repeat' runs.
+- The deep build (--deep levels, 60 by default) only compiles with outlining; without it
+  Python stops with "too many statically nested blocks" or "too many levels of indentation".
+
+Usage:
+    python benchmarks/bench_outline.py [--iterations N] [--depth D] [--deep D] [--repeat R]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.compiler import PenguinBubbleCompiler
+
+
+def nested_program(depth, iterations, loops=False):
+    """
+    Builds a function with 'depth' nested penguinIf blocks (keepWalking loops that run
+    once when 'loops' is set) inside a loop of 'iterations' rounds.
+    """
+    lines = [
+        "penguinDo(walk)(rounds)",
+        "    iceBucket total = 0",
+        "    iceBucket step = 0",
+        "    keepWalking(step < rounds)",
+        "        iceBucket step = step slideUp 1",
+    ]
+    pad = "        "
+    for level in range(depth):
+        if loops:
+            lines.append(f"{pad}iceBucket once{level} = 0")
+            lines.append(f"{pad}keepWalking(once{level} < 1)")
+            lines.append(f"{pad}    iceBucket once{level} = once{level} slideUp 1")
+        else:
+            lines.append(f"{pad}penguinIf(step % {level + 7} != 0)")
+        pad += "    "
+        lines.append(f"{pad}iceBucket total = total slideUp {level}")
+    lines.append("    returnIce total")
+    lines.append(f"penguinSay walk({iterations})")
+    return "\n".join(lines) + "\n"
+
+
+def measure(source, outline_depth, repeat):
+    """
+    Returns the best compile time, the best run time and the printed output of one build.
+    """
+    best_compile = best_run = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            python = PenguinBubbleCompiler(outline_depth=outline_depth).compile(source)
+        code = compile(python, "<bench>", "exec")
+        best_compile = min(best_compile, time.perf_counter() - start)
+
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            exec(code, {"__name__": "__main__"})
+        best_run = min(best_run, time.perf_counter() - start)
+    return best_compile, best_run, output.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark outlining of deeply nested blocks.")
+    parser.add_argument('--iterations', type=int, default=200000, help='Rounds of the outer loop.')
+    parser.add_argument('--depth', type=int, default=18, help='Nesting that compiles without outlining.')
+    parser.add_argument('--deep', type=int, default=60, help='Nesting that only compiles with outlining.')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per build; the best is reported.')
+    args = parser.parse_args()
+
+    source = nested_program(args.depth, args.iterations)
+    results = {
+        "no outlining": measure(source, None, args.repeat),
+        "depth 16": measure(source, 16, args.repeat),
+        "depth 4": measure(source, 4, args.repeat),
+    }
+    if len({output for _, _, output in results.values()}) > 1:
+        raise SystemExit("The outlined builds printed a different result.")
+    base_compile, base_run, _ = results["no outlining"]
+    print(f"{args.depth} nested penguinIf blocks, {args.iterations} rounds")
+    for name, (compile_time, run_time, _) in results.items():
+        print(f"{name:<13} compile {compile_time * 1e3:7.2f} ms ({compile_time / base_compile:5.2f}x)  "
+              f"run {run_time * 1e3:8.1f} ms ({run_time / base_run:5.2f}x)")
+
+    deep = nested_program(args.deep, 1000, loops=True)
+    try:
+        measure(deep, None, 1)
+        status = "compiles"
+    except SyntaxError as e:
+        status = f"fails: {e.msg}"
+    compile_time, run_time, output = measure(deep, 16, args.repeat)
+    print(f"{args.deep} nested keepWalking loops without outlining {status}")
+    print(f"{args.deep} nested keepWalking loops, depth 16: compile {compile_time * 1e3:7.2f} ms  "
+          f"run {run_time * 1e3:8.1f} ms  prints {output.strip()}")
+
+
+if __name__ == "__main__":
+    main()
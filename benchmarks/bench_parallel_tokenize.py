@@ -0,0 +1,101 @@
+"""
+Purpose:
+Measures the speedup of Tokenizer.tokenize_parallel over Tokenizer.tokenize on a
+multi-million-line .pg source.
+
+Explanation:
+- The source repeats the calculator example until it has the requested number of lines.
+- Times the serial tokenizer, then the worker pool with 1, 2, 4 and 8 workers (or the
+  counts passed with --workers), checking that every run yields the same tokens. The pool
+  is timed directly, without the cutoff of tokenize_parallel, which falls back to
+  tokenize for sources below PARALLEL_MIN_SIZE characters and for fewer than
+  PARALLEL_MIN_WORKERS workers (after capping them at the CPU count).
+- Also times the parts that do not shrink with more workers: starting the pool and
+  unpickling the tokens in the parent. The speedup is bounded by the number of CPU cores
+  and by that unpickling.
+- With fewer CPUs than workers the workers take turns, so those times show the overhead
+  only. For them the script prints an estimate instead:
+  pool start + (serial time + pickling) / workers + unpickling.
+
+Usage:
+    python benchmarks/bench_parallel_tokenize.py [--lines N] [--workers 1 2 4 8]
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.tokenizer import PARALLEL_MIN_SIZE, PARALLEL_MIN_WORKERS, Tokenizer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def build_source(line_count):
+    """
+    Repeats examples/calculator.pg until the source has at least 'line_count' lines.
+    """
+    with open(os.path.join(ROOT, "examples", "calculator.pg"), encoding="utf-8") as f:
+        example = f.read().rstrip("\n") + "\n\n"
+    copies = line_count // example.count("\n") + 1
+    return example * copies
+
+
+def pool_start_time(workers):
+    """
+    Returns the time to start 'workers' processes, run a trivial job in each and stop them.
+    """
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(abs, range(workers)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel tokenization.")
+    parser.add_argument('--lines', type=int, default=2000000, help='Approximate source size in lines.')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help='Worker counts to time.')
+    args = parser.parse_args()
+
+    source = build_source(args.lines)
+    tokenizer = Tokenizer()
+    cpus = os.cpu_count() or 1
+    print(f"source: {source.count(chr(10)):,} lines, {len(source):,} characters, {cpus} CPU(s)")
+
+    start = time.perf_counter()
+    expected = tokenizer.tokenize(source)
+    serial = time.perf_counter() - start
+    start = time.perf_counter()
+    data = pickle.dumps(expected, protocol=pickle.HIGHEST_PROTOCOL)
+    dump = time.perf_counter() - start
+    start = time.perf_counter()
+    pickle.loads(data)
+    unpickle = time.perf_counter() - start
+    print(f"serial tokenize: {serial:.2f}s ({serial / len(source) * 1e9:.0f} ns/char), "
+          f"unpickling the tokens: {unpickle:.2f}s ({unpickle / len(source) * 1e9:.0f} ns/char)")
+
+    for workers in args.workers:
+        startup = pool_start_time(workers)
+        start = time.perf_counter()
+        tokens = tokenizer._tokenize_in_pool(source, workers, chunks_per_worker=4)
+        elapsed = time.perf_counter() - start
+        assert tokens == expected, f"token mismatch with {workers} workers"
+        line = f"{workers} worker(s): {elapsed:.2f}s  speedup {serial / elapsed:.2f}x"
+        if workers > cpus:
+            estimate = startup + (serial + dump) / workers + unpickle
+            line += f"  (only {cpus} CPU(s); estimated with {workers} cores: {estimate:.2f}s, {serial / estimate:.2f}x)"
+        print(line)
+
+    start = time.perf_counter()
+    tokenizer.tokenize_parallel(source, max(args.workers))
+    parallel = min(max(args.workers), cpus) >= PARALLEL_MIN_WORKERS and len(source) >= PARALLEL_MIN_SIZE
+    used = "worker processes" if parallel else "tokenize (cutoff)"
+    print(f"tokenize_parallel({max(args.workers)}): {time.perf_counter() - start:.2f}s using {used}")
+
+
+if __name__ == "__main__":
+    main()
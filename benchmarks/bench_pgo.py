@@ -0,0 +1,125 @@
+"""
+Purpose:
+Measures the speedup of profile-guided optimization (--pgo-collect, then --pgo-use).
+
+Explanation:
+- A dispatch loop picks one of six operations with a penguinIf/penguinWhatAbout chain on
+  every iteration. The operation used most often is tested last, and it calls a small
+  penguinDo function.
+- Training: the program is built with pgo_collect and run on a small work size in its own
+  process, which writes the profile at exit.
+- The program is then compiled without a profile and with it, and both builds are executed
+  in-process on the full work size; they must print the same result. With the profile the
+  hot branch is tested first and its function call is inlined.
+- Reports the best time of each build and the speedup.
+
+Usage:
+    python benchmarks/bench_pgo.py [--loops N] [--repeat R]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.compiler import PenguinBubbleCompiler
+from compiler.pgo import Profile
+
+DISPATCH = """
+penguinDo(scale)(x)
+    returnIce x penguinBoost 3
+
+penguinTake(n) "How many rounds? "
+iceBucket n = int(n)
+iceBucket total = 0
+iceBucket i = 0
+keepWalking(i < n)
+    iceBucket op = 5 if i % 50 else i % 5
+    penguinIf(op == 0)
+        iceBucket total = total slideUp 1
+    penguinWhatAbout(op == 1)
+        iceBucket total = total slideDown 1
+    penguinWhatAbout(op == 2)
+        iceBucket total = total slideUp 2
+    penguinWhatAbout(op == 3)
+        iceBucket total = total slideDown 2
+    penguinWhatAbout(op == 4)
+        iceBucket total = 0
+    penguinWhatAbout(op == 5)
+        iceBucket total = total slideUp scale(i % 7)
+    iceBucket i = i slideUp 1
+penguinSay total
+"""
+
+
+def collect_profile(source, rounds, workdir):
+    """
+    Builds the training program, runs it on 'rounds' iterations and loads its profile.
+    """
+    profile_path = os.path.join(workdir, "dispatch.profile.json")
+    script = os.path.join(workdir, "dispatch_collect.py")
+    with contextlib.redirect_stdout(io.StringIO()):
+        compiled = PenguinBubbleCompiler(pgo_collect=True, profile_path=profile_path).compile(source)
+    with open(script, "w", encoding="utf-8") as f:
+        f.write(compiled)
+    subprocess.run([sys.executable, script], input=f"{rounds}\n", text=True,
+                   capture_output=True, check=True)
+    return Profile.load(profile_path)
+
+
+def best_time(program, loops, repeat):
+    """
+    Executes a code object 'repeat' times with 'loops' as the penguinTake answer;
+    returns the fastest run and the printed output.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), answers(f"{loops}\n"):
+            start = time.perf_counter()
+            exec(program, {"__name__": "__main__"})
+            best = min(best, time.perf_counter() - start)
+    return best, stdout.getvalue()
+
+
+@contextlib.contextmanager
+def answers(text):
+    """
+    Feeds 'text' to the program's penguinTake prompts.
+    """
+    saved, sys.stdin = sys.stdin, io.StringIO(text)
+    try:
+        yield
+    finally:
+        sys.stdin = saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark profile-guided optimization.")
+    parser.add_argument('--loops', type=int, default=1000000, help='Iterations of the dispatch loop.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per build; the best is reported.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        profile = collect_profile(DISPATCH, max(args.loops // 100, 5000), workdir)
+
+    results = {}
+    for name, options in (("plain", {}), ("pgo", {"pgo_profile": profile, "pgo_hot_calls": 100})):
+        with contextlib.redirect_stdout(io.StringIO()):
+            program = PenguinBubbleCompiler(**options).compile_to_code(DISPATCH)
+        results[name] = best_time(program, args.loops, args.repeat)
+
+    if results["plain"][1] != results["pgo"][1]:
+        raise SystemExit("The profile-guided program printed different results.")
+    print(f"plain {results['plain'][0] * 1e3:8.1f} ms, profile-guided {results['pgo'][0] * 1e3:8.1f} ms, "
+          f"speedup {results['plain'][0] / results['pgo'][0]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Purpose:
+Measures how much smaller and faster to load generated modules are with the tree-shaken
+runtime prelude and with --minimal-output.
+
+Explanation:
+- A typical small program without penguinTake is compiled three ways: with the
+  'dynamic_input' prelude that every module used to get, tree-shaken (the default) and
+  tree-shaken with minimal_output.
+- Loading a module is timed as compile() of its source plus executing the module body,
+  repeated for 'modules' modules, which is what importing that many .py files costs
+  without the file system.
+- Reports the size of each module and the best load time per module.
+
+Usage:
+    python benchmarks/bench_prelude.py [--modules N] [--repeat R]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.compiler import PenguinBubbleCompiler
+from compiler.runtime import render_helpers
+
+PROGRAM = """
+penguinDo(area)(width, height)
+    returnIce width penguinBoost height
+
+penguinDo(describe)(name, width, height)
+    penguinSay name, "has an area of", area(width, height)
+
+describe("pond", 3, 4)
+describe("iceberg", 10, 2)
+"""
+
+
+def best_load_time(source, modules, repeat):
+    """
+    Compiles and executes a module source 'modules' times; returns the best time per module.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(modules):
+                exec(compile(source, "<module>", "exec"), {"__name__": "__bench__"})
+        best = min(best, (time.perf_counter() - start) / modules)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the size and load time of generated modules.")
+    parser.add_argument('--modules', type=int, default=2000, help='Modules loaded per run.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per variant; the best is reported.')
+    args = parser.parse_args()
+
+    shaken = PenguinBubbleCompiler().compile(PROGRAM)
+    variants = {
+        "full prelude": "\n".join(render_helpers(["dynamic_input"])) + "\n" + shaken,
+        "tree-shaken": shaken,
+        "minimal": PenguinBubbleCompiler(minimal_output=True).compile(PROGRAM),
+    }
+    for label, source in variants.items():
+        load = best_load_time(source, args.modules, args.repeat)
+        print(f"{label:>12}: {len(source.encode('utf-8')):5d} bytes, {load * 1e6:7.1f} us per module")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Purpose:
+Measures the per-keystroke cost of Tokenizer.retokenize against tokenizing the whole
+buffer again, for growing file sizes.
+
+Explanation:
+- The source repeats the calculator example until it has the requested number of lines.
+- Three edits in the middle of the file are timed: typing a character (the line count
+  stays the same, so no other token is touched), pressing Enter (one more line, so
+  the index of every token after the edit is shifted) and adding a blank line, given in
+  physical line numbers with the line_counts of the source (no index changes, but the
+  line counts after the edit move up by one).
+- retokenize updates the token list in place, so every run starts from a fresh copy
+  of the list and of the tokens after the edit; the copy is not part of the timing.
+- Each edit is checked against a full tokenize of the edited source.
+
+Usage:
+    python benchmarks/bench_retokenize.py [--lines 1000 10000 100000] [--repeat R]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.tokenizer import Tokenizer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def build_lines(line_count):
+    """
+    Repeats the non-empty lines of examples/calculator.pg until there are 'line_count' of them.
+    """
+    with open(os.path.join(ROOT, "examples", "calculator.pg"), encoding="utf-8") as f:
+        example = [ln for ln in f.read().split("\n") if ln.strip()]
+    return (example * (line_count // len(example) + 1))[:line_count]
+
+
+def best_time(function, repeat, setup=lambda: None):
+    """
+    Calls 'function(setup())' 'repeat' times and returns the fastest run and its result.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        argument = setup()
+        start = time.perf_counter()
+        result = function(argument)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark edit-delta retokenization.")
+    parser.add_argument('--lines', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Source sizes in non-empty lines.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement; the best is reported.')
+    args = parser.parse_args()
+
+    tokenizer = Tokenizer()
+    for line_count in args.lines:
+        lines = build_lines(line_count)
+        previous = tokenizer.tokenize("\n".join(lines))
+        middle = line_count // 2
+        line = lines[middle - 1]
+        counts = tokenizer.line_counts("\n".join(lines))
+        edits = (
+            ("type a character", {"first": middle, "last": middle, "text": line + " "}),
+            ("press Enter", {"first": middle, "last": middle, "text": line + "\n" + line}),
+            ("add a blank line", {"first_line": middle, "last_line": middle, "text": line + "\n"}),
+        )
+        for label, edit in edits:
+            edited = "\n".join(lines[:middle - 1] + edit["text"].split("\n") + lines[middle:])
+            full, expected = best_time(lambda _: tokenizer.tokenize(edited), args.repeat)
+            delta, tokens = best_time(
+                lambda state: tokenizer.retokenize(state[0], edit, line_counts=state[1]),
+                args.repeat,
+                setup=lambda: ([dict(token) for token in previous], list(counts))
+            )
+            if tokens != expected:
+                raise SystemExit(f"retokenize differs from tokenize for '{label}' at {line_count} lines")
+            print(f"{line_count:>7} lines, {label:<16}: tokenize {full * 1e3:8.2f} ms, "
+                  f"retokenize {delta * 1e3:8.3f} ms ({full / delta:6.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Purpose:
+Measures the effect of lowering penguinSay string concatenations to f-strings.
+
+Explanation:
+- A keepWalking loop prints a line built from several string literals and str(...)
+  calls, like the example programs do.
+- The program is compiled with the lowering and once more with it switched off
+  (lower_say_concatenation patched to return its input), for both output modes.
+- Each build runs in a subprocess whose stdout is a pipe; both builds must print
+  byte-identical output. Reports the best wall-clock time of each build.
+
+Usage:
+    python benchmarks/bench_say_fstring.py [--lines N] [--repeat R]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.compiler import PenguinBubbleCompiler
+
+PRINT_LOOP = """
+iceBucket i = 0
+keepWalking(i < {lines})
+    iceBucket half = i givePenguins 2
+    penguinSay "Step " + str(i) + ": half is " + str(half) + " and double is " + str(i * 2)
+    iceBucket i = i slideUp 1
+"""
+
+
+def run_once(path):
+    """
+    Runs a compiled program with stdout connected to a pipe; returns (elapsed time, output).
+    """
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, path], stdout=subprocess.PIPE, check=True).stdout
+    return time.perf_counter() - start, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark f-string lowering of penguinSay.")
+    parser.add_argument('--lines', type=int, default=300000, help='Lines printed per run.')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per build; the best is reported.')
+    args = parser.parse_args()
+
+    source = PRINT_LOOP.format(lines=args.lines)
+    with tempfile.TemporaryDirectory() as workdir:
+        for buffered in (False, True):
+            times, outputs = {}, {}
+            for lowered in (False, True):
+                with contextlib.redirect_stdout(io.StringIO()), contextlib.ExitStack() as stack:
+                    if not lowered:
+                        stack.enter_context(mock.patch(
+                            "compiler.code_generator.lower_say_concatenation", side_effect=lambda value: value
+                        ))
+                    compiled = PenguinBubbleCompiler(buffered_output=buffered).compile(source)
+                path = os.path.join(workdir, f"program_{buffered}_{lowered}.py")
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(compiled)
+                runs = [run_once(path) for _ in range(args.repeat)]
+                times[lowered] = min(elapsed for elapsed, _ in runs)
+                outputs[lowered] = runs[0][1]
+
+            if outputs[False] != outputs[True]:
+                raise SystemExit("The f-string build printed different output.")
+            mode = "buffered" if buffered else "print"
+            print(f"{mode:>8}: concatenation {times[False]:.3f}s, f-string {times[True]:.3f}s, "
+                  f"speedup {times[False] / times[True]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
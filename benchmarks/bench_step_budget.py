@@ -0,0 +1,87 @@
+"""
+Purpose:
+Measures the run-time overhead of the execution budget (--step-budget).
+
+Explanation:
+- Two workloads: a call-heavy one (naive recursive fib, a budget check per call) and a
+  loop-heavy one (a keepWalking loop with one cheap statement per iteration). Both are
+  worst cases; real programs do more work per call and per iteration.
+- The loop is a leaf loop, so it counts down a local int; fib pays a next() call and a
+  compare on every call. Any per-step check costs about as much as one more simple
+  statement, so expect roughly +25-35% on the loop and +70% on fib.
+- Each program is compiled with and without a budget (large enough never to run out)
+  and executed in-process, alternating between the two builds so both see the same
+  machine load.
+- Reports the best time of each build and the relative overhead.
+
+Usage:
+    python benchmarks/bench_step_budget.py [--fib N] [--loops N] [--repeat R]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.compiler import PenguinBubbleCompiler
+
+CALL_HEAVY = """
+penguinDo(fib)(n)
+    penguinIf(n < 2)
+        returnIce n
+    returnIce fib(n slideDown 1) slideUp fib(n slideDown 2)
+
+iceBucket result = fib({n})
+"""
+
+LOOP_HEAVY = """
+penguinDo(total)(n)
+    iceBucket acc = 0
+    iceBucket i = 0
+    keepWalking(i < n)
+        iceBucket acc = acc slideUp i penguinBoost i
+        iceBucket i = i slideUp 1
+    returnIce acc
+
+iceBucket result = total({n})
+"""
+
+
+def best_times(programs, repeat):
+    """
+    Executes the code objects in turn, 'repeat' times each, and returns the fastest run
+    of every one.
+    """
+    best = [float("inf")] * len(programs)
+    for _ in range(repeat):
+        for number, program in enumerate(programs):
+            namespace = {"__name__": "__bench__"}
+            start = time.perf_counter()
+            exec(program, namespace)
+            best[number] = min(best[number], time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the execution budget.")
+    parser.add_argument('--fib', type=int, default=25, help='Argument of the recursive fib workload.')
+    parser.add_argument('--loops', type=int, default=1000000, help='Iterations of the loop workload.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per build; the best is reported.')
+    args = parser.parse_args()
+
+    for label, template, n in (("calls", CALL_HEAVY, args.fib), ("loops", LOOP_HEAVY, args.loops)):
+        source = template.format(n=n)
+        with contextlib.redirect_stdout(io.StringIO()):
+            plain = PenguinBubbleCompiler().compile_to_code(source)
+            guarded = PenguinBubbleCompiler(step_budget=10 ** 9).compile_to_code(source)
+        baseline, budgeted = best_times([plain, guarded], args.repeat)
+        print(f"{label:>5}: plain {baseline * 1e3:8.1f} ms, budgeted {budgeted * 1e3:8.1f} ms, "
+              f"overhead {(budgeted / baseline - 1) * 100:+.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Purpose:
+Measures what strength reduction saves in a numeric loop.
+
+Explanation:
+- The program sums small int powers (i snowball 2, i snowball 3) and averages a float
+  with givePenguins 2.0 in a keepWalking loop of 'iterations' rounds.
+- It is compiled with strength_reduction off and on; both builds must print exactly the
+  same result. Run time is the exec of the compiled code object, best of 'repeat' runs.
+
+Usage:
+    python benchmarks/bench_strength_reduction.py [--iterations N] [--repeat R]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.compiler import PenguinBubbleCompiler
+
+PROGRAM = """
+penguinDo(crunch)(rounds)
+    iceBucket i = 0
+    iceBucket squares = 0
+    iceBucket cubes = 0
+    iceBucket mean = 0.0
+    keepWalking(i < rounds)
+        iceBucket squares = squares slideUp i snowball 2
+        iceBucket cubes = cubes slideUp i snowball 3
+        iceBucket mean = (mean slideUp i) givePenguins 2.0
+        iceBucket i = i slideUp 1
+    returnIce squares, cubes, mean
+
+penguinSay crunch({iterations})
+"""
+
+
+def measure(source, strength_reduction, repeat):
+    """
+    Returns the best run time and the printed output of one build.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        python = PenguinBubbleCompiler(strength_reduction=strength_reduction).compile(source)
+    code = compile(python, "<bench>", "exec")
+    best = float("inf")
+    for _ in range(repeat):
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            exec(code, {"__name__": "__main__"})
+        best = min(best, time.perf_counter() - start)
+    return best, output.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark strength reduction of powers and divisions.")
+    parser.add_argument('--iterations', type=int, default=1000000, help='Rounds of the loop.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per build; the best is reported.')
+    args = parser.parse_args()
+
+    source = PROGRAM.format(iterations=args.iterations)
+    base, expected = measure(source, False, args.repeat)
+    reduced, output = measure(source, True, args.repeat)
+    if output != expected:
+        raise SystemExit("The reduced build printed a different result.")
+    print(f"{args.iterations} rounds")
+    print(f"without strength reduction {base * 1e3:8.1f} ms")
+    print(f"with strength reduction    {reduced * 1e3:8.1f} ms ({base / reduced:4.2f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Purpose:
+Measures how fast the generated Python programs run, across a corpus of .pg programs and
+several compiler option sets, and compares the numbers with a saved baseline.
+
+Explanation:
+- Corpus: the example programs (calculator, temp_converter) and synthetic loop-,
+  recursion- and print-heavy programs from benchmarks/corpus. Every program reads its
+  work size through penguinTake, so all of them run from scripted inputs fed to stdin.
+- Option sets: the default build, a fully optimized build and the ast backend
+  (see OPTION_SETS). Each program is compiled once per option set.
+- Each build runs as its own Python process, 'repeat' times. The suite reports the best
+  wall time minus the start-up time of an empty program, and the peak resident memory
+  of the process (from os.wait4, where available).
+- All option sets must print exactly the same output for a program, otherwise the suite
+  stops with an error.
+- '--save' writes the results to the baseline file. Otherwise, when the baseline file
+  exists, every result is compared with it and the suite exits with status 1 if a
+  program got slower (or used more memory) by more than '--tolerance'.
+
+Baselines are only comparable on the same machine, Python version and '--scale'.
+
+Usage:
+    python benchmarks/bench_suite.py [--scale S] [--repeat R] [--options NAME ...]
+                                     [--baseline PATH] [--save] [--tolerance T]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from compiler.compiler import PenguinBubbleCompiler
+
+
+def calculator_inputs(scale):
+    rounds = []
+    for i in range(2000 * scale):
+        rounds += [i % 5 + 1, i % 97 + 1, i % 7 + 1]
+    return rounds + [6]
+
+
+def temp_converter_inputs(scale):
+    rounds = []
+    for i in range(3000 * scale):
+        rounds += [i % 2 + 1, i % 120 - 20]
+    return rounds + [3]
+
+
+# Program name -> (path relative to the repository, function of the scale that returns
+# the scripted penguinTake answers)
+CORPUS = {
+    "calculator": ("examples/calculator.pg", calculator_inputs),
+    "temp_converter": ("examples/temp_converter.pg", temp_converter_inputs),
+    "loops": ("benchmarks/corpus/loops.pg", lambda scale: [300000 * scale]),
+    "recursion": ("benchmarks/corpus/recursion.pg", lambda scale: [25, 100000 * scale]),
+    "printing": ("benchmarks/corpus/printing.pg", lambda scale: [50000 * scale]),
+}
+
+OPTION_SETS = {
+    "default": {},
+    "optimized": {
+        "inline": True,
+        "hoist_invariants": True,
+        "memoize": True,
+        "local_aliases": True,
+        "buffered_output": True,
+        "wrap_main": True,
+    },
+    "ast": {"backend": "ast"},
+}
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+
+def compile_program(source, options):
+    """
+    Compiles a .pg program with the given compiler options; returns the Python source.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        compiled = PenguinBubbleCompiler(**options).compile(source)
+    if not compiled:
+        raise SystemExit(f"The program does not compile with {options}.")
+    return compiled
+
+
+def run_once(script, inputs_path, output_path):
+    """
+    Runs a Python script in a new process with stdin read from 'inputs_path'.
+
+    :return: (wall time in seconds, peak resident memory in KiB or None).
+    """
+    with open(inputs_path, "rb") as stdin, open(output_path, "wb") as stdout:
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, script], stdin=stdin, stdout=stdout,
+                                   stderr=subprocess.PIPE)
+        if hasattr(os, "wait4"):
+            # Reap the process ourselves to get its resource usage
+            _, status, usage = os.wait4(process.pid, 0)
+            elapsed = time.perf_counter() - start
+            process.returncode = os.waitstatus_to_exitcode(status)
+            peak = usage.ru_maxrss if sys.platform != "darwin" else usage.ru_maxrss // 1024
+        else:
+            process.wait()
+            elapsed = time.perf_counter() - start
+            peak = None
+        errors = process.stderr.read().decode(errors="replace")
+        process.stderr.close()
+    if process.returncode != 0:
+        raise SystemExit(f"{script} failed with exit status {process.returncode}:\n{errors}")
+    return elapsed, peak
+
+
+def measure(script, inputs, repeat, workdir):
+    """
+    Runs a script 'repeat' times with the given penguinTake answers.
+
+    :return: (best wall time, largest peak memory, printed output).
+    """
+    inputs_path = os.path.join(workdir, "inputs.txt")
+    output_path = os.path.join(workdir, "output.txt")
+    with open(inputs_path, "w", encoding="utf-8") as f:
+        f.write("".join(f"{answer}\n" for answer in inputs))
+
+    best, peak = float("inf"), None
+    for _ in range(repeat):
+        elapsed, memory = run_once(script, inputs_path, output_path)
+        best = min(best, elapsed)
+        if memory is not None:
+            peak = max(peak or 0, memory)
+    with open(output_path, "rb") as f:
+        output = f.read()
+    return best, peak, output
+
+
+def run_suite(programs, option_sets, scale, repeat):
+    """
+    Compiles and runs every program with every option set.
+
+    :return: {program: {option set: {"time_ms": ..., "peak_kib": ...}}}
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        empty = os.path.join(workdir, "empty.py")
+        with open(empty, "w", encoding="utf-8") as f:
+            f.write("pass\n")
+        startup = measure(empty, [], repeat, workdir)[0]
+
+        for program in programs:
+            path, inputs = CORPUS[program]
+            with open(os.path.join(ROOT, path), encoding="utf-8") as f:
+                source = f.read()
+            results[program] = {}
+            outputs = {}
+            for name in option_sets:
+                script = os.path.join(workdir, f"{program}_{name}.py")
+                with open(script, "w", encoding="utf-8") as f:
+                    f.write(compile_program(source, OPTION_SETS[name]))
+                best, peak, outputs[name] = measure(script, inputs(scale), repeat, workdir)
+                results[program][name] = {"time_ms": round(max(best - startup, 0) * 1e3, 2),
+                                          "peak_kib": peak}
+            if len(set(outputs.values())) > 1:
+                raise SystemExit(f"The builds of {program} printed different output.")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints every result next to its baseline.
+
+    :return: The number of results that regressed by more than 'tolerance'.
+    """
+    regressions = 0
+    print(f"{'program':<16}{'options':<12}{'time ms':>10}{'peak MiB':>10}   vs baseline")
+    for program, builds in results.items():
+        for name, result in builds.items():
+            peak = "n/a" if result["peak_kib"] is None else f"{result['peak_kib'] / 1024:.1f}"
+            line = f"{program:<16}{name:<12}{result['time_ms']:>10.1f}{peak:>10}"
+            old = baseline.get(program, {}).get(name)
+            if old is not None:
+                notes = []
+                for key, label in (("time_ms", "time"), ("peak_kib", "memory")):
+                    if not old.get(key) or result[key] is None:
+                        continue
+                    change = result[key] / old[key] - 1
+                    notes.append(f"{label} {change * 100:+.0f}%")
+                    if change > tolerance:
+                        notes[-1] += " REGRESSION"
+                        regressions += 1
+                line += "   " + ", ".join(notes)
+            print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the generated programs of a .pg corpus.")
+    parser.add_argument('--scale', type=int, default=1, help='Multiplies the work size of every program.')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per build; the best time is reported.')
+    parser.add_argument('--programs', nargs='+', choices=sorted(CORPUS), default=list(CORPUS),
+                        help='Programs to run (all by default).')
+    parser.add_argument('--options', nargs='+', choices=sorted(OPTION_SETS), default=list(OPTION_SETS),
+                        help='Compiler option sets to run (all by default).')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline file to compare with or save to.')
+    parser.add_argument('--save', action='store_true', help='Save the results as the new baseline.')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='Relative slowdown (or memory growth) reported as a regression. Defaults to 0.10.')
+    args = parser.parse_args()
+
+    results = run_suite(args.programs, args.options, args.scale, args.repeat)
+
+    baseline = {}
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved.get("scale") != args.scale or saved.get("python") != sys.version.split()[0]:
+            print(f"Warning: the baseline was recorded with scale {saved.get('scale')} on "
+                  f"Python {saved.get('python')}; the numbers may not be comparable.")
+        baseline = saved.get("results", {})
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "scale": args.scale, "results": results},
+                      f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+    elif regressions:
+        raise SystemExit(f"{regressions} result(s) regressed by more than {args.tolerance:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
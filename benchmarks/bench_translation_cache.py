@@ -0,0 +1,84 @@
+"""
+Purpose:
+Measures how much the CodeGenerator translation cache cuts code generation time.
+
+Explanation:
+- Builds a templated program: the same menu function and the same handful of penguinSay
+  and iceBucket statements repeated 'copies' times, like generated .pg programs are.
+- The tokens are produced once; only CodeGenerator.compile_tokens is timed, with the
+  cache disabled (cache_size=0), with a fresh cache per run, and with a cache already
+  filled by an earlier compile (as in a batch worker or the REPL).
+- Every configuration must generate exactly the same lines.
+- Reports the best time of each configuration, the speedup and the cache hit rate.
+
+Usage:
+    python benchmarks/bench_translation_cache.py [--copies N] [--repeat R]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.tokenizer import Tokenizer
+from compiler.code_generator import CodeGenerator
+
+TEMPLATE = """
+penguinDo(menu{n})(choice)
+    penguinSay "1. Add" + " " + str(choice)
+    penguinSay "2. Subtract" + " " + str(choice)
+    penguinSay "3. Quit"
+    penguinIf(choice == 1)
+        iceBucket total = total slideUp step penguinBoost 2
+    penguinWhatAbout(choice == 2)
+        iceBucket total = total slideDown step penguinBoost 2
+    penguinElse
+        penguinSay "Goodbye!"
+    returnIce total
+"""
+
+
+def best_time(generator_factory, tokens, repeat):
+    """
+    Runs compile_tokens 'repeat' times, each with a generator from 'generator_factory';
+    returns the fastest run, the generated lines and the last generator.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        generator = generator_factory()
+        start = time.perf_counter()
+        lines = generator.compile_tokens(tokens)
+        best = min(best, time.perf_counter() - start)
+    return best, lines, generator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CodeGenerator translation cache.")
+    parser.add_argument('--copies', type=int, default=5000, help='Copies of the templated function.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per configuration; the best is reported.')
+    args = parser.parse_args()
+
+    source = "".join(TEMPLATE.format(n=n) for n in range(args.copies))
+    tokens = Tokenizer().tokenize(source)
+
+    warm = CodeGenerator()
+    warm.compile_tokens(tokens)
+    results = {
+        "no cache": best_time(lambda: CodeGenerator(cache_size=0), tokens, args.repeat),
+        "fresh cache": best_time(CodeGenerator, tokens, args.repeat),
+        "warm cache": best_time(lambda: warm, tokens, args.repeat),
+    }
+
+    if len({tuple(lines) for _, lines, _ in results.values()}) > 1:
+        raise SystemExit("The cached translation generated different lines.")
+    baseline = results["no cache"][0]
+    for name, (elapsed, _, generator) in results.items():
+        info = generator.cache_info()
+        print(f"{name:<12} {elapsed * 1e3:8.1f} ms  speedup {baseline / elapsed:5.2f}x  "
+              f"hit rate {info['hit_rate']:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Purpose:
+Measures the speedup of running the main program inside a function (--wrap-main).
+
+Explanation:
+- A top-level keepWalking loop updates a few variables per iteration and calls a
+  penguinDo function that reads one of them as a global, so both fast locals and a
+  declared global are exercised.
+- The program is compiled with and without wrap_main and executed in-process as
+  '__main__'; both builds must end with the same results.
+- Reports the best time of each build and the speedup.
+
+Usage:
+    python benchmarks/bench_wrap_main.py [--loops N] [--repeat R]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiler.compiler import PenguinBubbleCompiler
+
+MAIN_LOOP = """
+penguinDo(scaled)(x)
+    returnIce x penguinBoost factor
+
+iceBucket factor = 3
+iceBucket total = 0
+iceBucket odd = 0
+iceBucket i = 0
+keepWalking(i < {n})
+    iceBucket total = total slideUp i
+    penguinIf(i % 2 == 1)
+        iceBucket odd = odd slideUp 1
+    iceBucket total = total slideDown i givePenguins 2
+    penguinIf(i % 1000 == 0)
+        iceBucket total = total slideUp scaled(i)
+    iceBucket i = i slideUp 1
+penguinSay total, odd
+"""
+
+
+def best_time(program, repeat):
+    """
+    Executes a code object 'repeat' times; returns the fastest run and the printed output.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            start = time.perf_counter()
+            exec(program, {"__name__": "__main__"})
+            best = min(best, time.perf_counter() - start)
+    return best, stdout.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark wrapping the main program in a function.")
+    parser.add_argument('--loops', type=int, default=1000000, help='Iterations of the main loop.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per build; the best is reported.')
+    args = parser.parse_args()
+
+    source = MAIN_LOOP.format(n=args.loops)
+    results = {}
+    for wrap_main in (False, True):
+        with contextlib.redirect_stdout(io.StringIO()):
+            program = PenguinBubbleCompiler(wrap_main=wrap_main).compile_to_code(source)
+        results[wrap_main] = best_time(program, args.repeat)
+
+    if results[False][1] != results[True][1]:
+        raise SystemExit("The wrapped program printed different results.")
+    print(f"module level {results[False][0] * 1e3:8.1f} ms, wrapped {results[True][0] * 1e3:8.1f} ms, "
+          f"speedup {results[False][0] / results[True][0]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
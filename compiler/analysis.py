@@ -0,0 +1,607 @@
+"""
+Purpose:
+Provides the static analysis helpers shared by the optimization passes.
+
+Explanation:
+- to_python           -> Replaces custom operators (slideUp, snowball, ...) with Python operators.
+- parse_token         -> Parses the Python fragment carried by a token into 'ast' nodes.
+- block_end           -> Finds where the indented block that follows a token ends.
+- block_depths        -> Counts the blocks each token is nested in.
+- function_scopes     -> Lists every penguinDo definition with the position of its body.
+- collect_functions   -> Groups every penguinDo definition with the tokens of its body.
+- enclosing_function  -> Finds the penguinDo whose body contains a token.
+- function_locals     -> Lists the parameters and local names of a penguinDo.
+- loop_membership     -> Marks which tokens of a range sit inside a keepWalking loop.
+- function_params     -> Extracts the parameter names from a penguinDo header.
+- rewrite_token       -> Applies an 'ast' transformer to the Python fragment of a token.
+- find_pure_functions -> Detects functions without side effects (no penguinSay, no penguinTake,
+                         no global reads or writes, only calls to other pure functions).
+- recursive_functions -> Detects functions that call themselves, directly or through others.
+- number_kinds        -> Infers which variables only ever hold ints or floats.
+- expression_kinds    -> Infers whether an expression evaluates to an int or a float.
+
+Tokens are flat dictionaries and blocks are only described by the "indent" field, so
+every helper here works on token indices and indentation instead of a syntax tree.
+"""
+
+import ast
+
+from compiler.code_generator import CUSTOM_OPERATORS
+from compiler.tokens import TokenType
+
+# Builtins that never touch program state and never hand back a shared mutable object
+PURE_BUILTINS = frozenset([
+    "abs", "all", "any", "bool", "chr", "divmod", "float", "int", "isinstance",
+    "len", "max", "min", "ord", "pow", "range", "round", "str", "sum", "tuple",
+])
+
+# Tokens whose body is the indented block that follows them
+BLOCK_TOKENS = (
+    TokenType.PENGUIN_DO,
+    TokenType.KEEP_WALKING,
+    TokenType.PENGUIN_IF,
+    TokenType.PENGUIN_WHAT_ABOUT,
+    TokenType.PENGUIN_ELSE,
+)
+
+# Kinds of numbers tracked by number_kinds
+INT, FLOAT = "int", "float"
+
+# Builtins whose result kind number_kinds knows (when the program does not rebind them)
+NUMBER_BUILTINS = frozenset(["abs", "float", "int", "len", "max", "min", "ord", "round"])
+
+ARITHMETIC_TOKENS = (
+    TokenType.SLIDE_UP,
+    TokenType.SLIDE_DOWN,
+    TokenType.PENGUIN_BOOST,
+    TokenType.GIVE_PENGUINS,
+    TokenType.SNOWBALL,
+)
+
+
+class FunctionInfo:
+    """
+    A penguinDo definition together with the position of its body in the token list.
+    """
+
+    def __init__(self, token, start, end, params):
+        self.token = token
+        self.name = token["name"]
+        self.start = start      # index of the penguinDo token
+        self.end = end          # index one past the last body token
+        self.params = params
+
+    def body(self, tokens):
+        return tokens[self.start + 1:self.end]
+
+
+def to_python(expression):
+    """
+    Replaces the custom operators in a .pg expression with Python operators.
+    """
+    for custom_op, py_op in CUSTOM_OPERATORS.items():
+        expression = expression.replace(custom_op, py_op)
+    return expression
+
+
+def parse_token(token):
+    """
+    Parses the Python code a token stands for.
+
+    :param token: A token produced by the Tokenizer.
+    :return: A list of 'ast' nodes (statements or expressions), or None when the
+             token carries text that is not valid Python.
+    """
+    ttype = token["type"]
+    try:
+        if ttype == TokenType.PENGUIN_SAY:
+            # The value is the argument list of print(...), keywords included
+            call = ast.parse(f'_({to_python(token["value"])})', mode="eval").body
+            return call.args + [keyword.value for keyword in call.keywords]
+        if ttype == TokenType.PENGUIN_TAKE:
+            nodes = [ast.Name(id=token["name"], ctx=ast.Store())]
+            if token["prompt"]:
+                nodes.append(ast.parse(to_python(token["prompt"]), mode="eval").body)
+            return nodes
+        if ttype == TokenType.PENGUIN_FLOCK:
+            return [
+                ast.Name(id=token["name"], ctx=ast.Store()),
+                ast.parse(to_python(token["value"]), mode="eval").body
+            ]
+        if ttype == TokenType.RETURN_ICE:
+            if not token["value"]:
+                return []
+            return [ast.parse(to_python(token["value"]), mode="eval").body]
+        if ttype == TokenType.ICE_BUCKET:
+            return ast.parse(to_python(token["value"])).body
+        if ttype in (TokenType.KEEP_WALKING, TokenType.PENGUIN_IF, TokenType.PENGUIN_WHAT_ABOUT):
+            return [ast.parse(to_python(token["condition"]), mode="eval").body]
+        if ttype in ARITHMETIC_TOKENS:
+            return ast.parse(f'{token["target"]} = {to_python(token["expression"])}').body
+    except SyntaxError:
+        return None
+    return []
+
+
+def rewrite_token(token, transformer):
+    """
+    Runs an 'ast.NodeTransformer' over the Python fragment carried by a token.
+
+    :param token: A token produced by the Tokenizer.
+    :param transformer: A NodeTransformer; it must set 'changed = True' when it rewrites anything.
+    :return: A rewritten copy of the token, or the token itself when nothing changed.
+    """
+    ttype = token["type"]
+    if ttype in (TokenType.PENGUIN_SAY, TokenType.PENGUIN_FLOCK):
+        field, mode = "value", "arguments"
+    elif ttype == TokenType.RETURN_ICE:
+        field, mode = "value", "eval"
+    elif ttype == TokenType.PENGUIN_TAKE:
+        field, mode = "prompt", "arguments"
+    elif ttype == TokenType.ICE_BUCKET:
+        field, mode = "value", "exec"
+    elif ttype in (TokenType.KEEP_WALKING, TokenType.PENGUIN_IF, TokenType.PENGUIN_WHAT_ABOUT):
+        field, mode = "condition", "eval"
+    elif ttype in ARITHMETIC_TOKENS:
+        field, mode = "expression", "eval"
+    else:
+        return token
+
+    if not token[field]:
+        return token
+    try:
+        if mode == "arguments":
+            # The field is the argument list of a call ('print(...)', 'penguin_flock(...)')
+            tree = ast.parse(f"_({to_python(token[field])})", mode="eval")
+        else:
+            tree = ast.parse(to_python(token[field]), mode=mode)
+    except SyntaxError:
+        return token
+
+    transformer.changed = False
+    tree = ast.fix_missing_locations(transformer.visit(tree))
+    if not transformer.changed:
+        return token
+    if mode == "arguments":
+        source = ast.unparse(tree.body)[len("_("):-len(")")]
+    elif mode == "eval":
+        source = ast.unparse(tree.body)
+    else:
+        source = "; ".join(ast.unparse(statement) for statement in tree.body)
+    return dict(token, **{field: source})
+
+
+def block_end(tokens, position):
+    """
+    Returns the index one past the last token of the block opened by tokens[position].
+    """
+    indent = tokens[position]["indent"]
+    end = position + 1
+    while end < len(tokens) and tokens[end]["indent"] > indent:
+        end += 1
+    return end
+
+
+def block_depths(tokens):
+    """
+    Returns, for every token, the number of blocks it is nested in (0 at module level).
+    Any token followed by a more indented one opens a block, penguinDo bodies included.
+    """
+    depths = []
+    open_blocks = []    # indents of the block headers that are still open
+    for position, token in enumerate(tokens):
+        while open_blocks and token["indent"] <= open_blocks[-1]:
+            open_blocks.pop()
+        depths.append(len(open_blocks))
+        if position + 1 < len(tokens) and tokens[position + 1]["indent"] > token["indent"]:
+            open_blocks.append(token["indent"])
+    return depths
+
+
+def enclosing_function(scopes, position):
+    """
+    Returns the innermost FunctionInfo from 'scopes' (see function_scopes) whose body
+    contains tokens[position], or None at module level.
+    """
+    enclosing = None
+    for info in scopes:
+        if info.start < position < info.end:
+            enclosing = info
+    return enclosing
+
+
+def function_locals(info, tokens):
+    """
+    Returns the names that are local to a function: its parameters and every name it binds.
+    """
+    names = set(info.params or [])
+    for token in info.body(tokens):
+        nodes = parse_token(token)
+        if nodes:
+            names |= names_in(nodes)[1]
+    return names
+
+
+def loop_membership(tokens, start, end):
+    """
+    Tells, for every token in tokens[start:end], whether it sits inside a keepWalking
+    loop that itself starts within the same range.
+
+    :return: A list of booleans aligned with tokens[start:end].
+    """
+    inside = []
+    open_loops = []     # indents of the keepWalking headers that are still open
+    for token in tokens[start:end]:
+        while open_loops and token["indent"] <= open_loops[-1]:
+            open_loops.pop()
+        inside.append(bool(open_loops))
+        if token["type"] == TokenType.KEEP_WALKING:
+            open_loops.append(token["indent"])
+    return inside
+
+
+def function_params(token):
+    """
+    Returns the parameter names of a penguinDo token, or None when the header uses
+    anything other than plain positional parameters.
+    """
+    try:
+        definition = ast.parse(f'def _f({token["params"]}): pass').body[0]
+    except SyntaxError:
+        return None
+    arguments = definition.args
+    if arguments.vararg or arguments.kwarg or arguments.kwonlyargs or arguments.posonlyargs:
+        return None
+    if arguments.defaults:
+        return None
+    return [arg.arg for arg in arguments.args]
+
+
+def function_scopes(tokens):
+    """
+    Returns a FunctionInfo for every penguinDo definition, in source order.
+    """
+    return [
+        FunctionInfo(token, position, block_end(tokens, position), function_params(token))
+        for position, token in enumerate(tokens)
+        if token["type"] == TokenType.PENGUIN_DO
+    ]
+
+
+def collect_functions(tokens):
+    """
+    Finds every penguinDo definition in the token list.
+
+    :return: A dictionary mapping function names to FunctionInfo objects. Names that
+             are defined more than once are left out, since no single body describes them.
+    """
+    functions = {}
+    duplicates = set()
+    for info in function_scopes(tokens):
+        if info.name in functions:
+            duplicates.add(info.name)
+        functions[info.name] = info
+    for name in duplicates:
+        del functions[name]
+    return functions
+
+
+def names_in(nodes):
+    """
+    Returns the (read, written) name sets of a list of 'ast' nodes.
+    """
+    read, written = set(), set()
+    for node in nodes:
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name):
+                if isinstance(child.ctx, ast.Load):
+                    read.add(child.id)
+                else:
+                    written.add(child.id)
+    return read, written
+
+
+def module_level_writes(tokens):
+    """
+    Returns every name bound by statements outside of penguinDo bodies.
+    """
+    inside = set()
+    for info in function_scopes(tokens):
+        inside.update(range(info.start + 1, info.end))
+    written = set()
+    for position, token in enumerate(tokens):
+        if position in inside:
+            continue
+        nodes = parse_token(token)
+        if nodes:
+            written |= names_in(nodes)[1]
+    return written
+
+
+def find_pure_functions(tokens):
+    """
+    Determines which penguinDo functions are pure: calling them twice with the same
+    arguments always gives the same result and has no observable effect.
+
+    A function is pure when its body
+    - contains no penguinSay, penguinTake or nested penguinDo,
+    - only reads its parameters, its own locals, pure builtins and pure functions,
+    - never stores into attributes or subscripts and never declares globals,
+    - never builds mutable containers that could escape through returnIce.
+
+    :param tokens: The full token list of the program.
+    :return: A set with the names of the pure functions.
+    """
+    functions = collect_functions(tokens)
+    rebound = module_level_writes(tokens)
+    callees = {}
+
+    for name, info in functions.items():
+        if info.params is None:
+            continue
+        calls = _local_calls_if_pure(info, tokens, functions, rebound)
+        if calls is not None:
+            callees[name] = calls
+
+    # A function is only pure if everything it calls is pure as well
+    changed = True
+    while changed:
+        changed = False
+        for name in list(callees):
+            if not callees[name] <= set(callees):
+                del callees[name]
+                changed = True
+
+    return set(callees)
+
+
+def recursive_functions(tokens):
+    """
+    Finds the penguinDo functions that can call themselves, directly or through
+    other penguinDo functions.
+
+    :return: A set of function names.
+    """
+    functions = collect_functions(tokens)
+    calls = {}
+    for name, info in functions.items():
+        calls[name] = set()
+        for token in info.body(tokens):
+            for node in parse_token(token) or []:
+                for child in ast.walk(node):
+                    if (isinstance(child, ast.Call) and isinstance(child.func, ast.Name)
+                            and child.func.id in functions):
+                        calls[name].add(child.func.id)
+
+    recursive = set()
+    for name in functions:
+        seen = set()
+        pending = list(calls[name])
+        while pending:
+            callee = pending.pop()
+            if callee == name:
+                recursive.add(name)
+                break
+            if callee not in seen:
+                seen.add(callee)
+                pending.extend(calls[callee])
+    return recursive
+
+
+def _local_calls_if_pure(info, tokens, functions, rebound):
+    """
+    Checks the body of one function in isolation.
+
+    :return: The set of user functions it calls, or None if the body has side effects.
+    """
+    nodes = []
+    for token in info.body(tokens):
+        if token["type"] in (TokenType.PENGUIN_SAY, TokenType.PENGUIN_TAKE, TokenType.PENGUIN_DO):
+            return None
+        parsed = parse_token(token)
+        if parsed is None:
+            return None
+        nodes.extend(parsed)
+
+    read, written = names_in(nodes)
+    local_names = set(info.params) | written
+    known_functions = set(functions) - rebound - local_names
+    known_builtins = PURE_BUILTINS - rebound - local_names
+    calls = set()
+
+    for node in nodes:
+        for child in ast.walk(node):
+            if isinstance(child, (ast.Attribute, ast.Global, ast.Nonlocal, ast.Yield, ast.YieldFrom,
+                                  ast.Await, ast.Import, ast.ImportFrom, ast.List, ast.Dict, ast.Set,
+                                  ast.ListComp, ast.SetComp, ast.DictComp)):
+                return None
+            if isinstance(child, ast.Subscript) and not isinstance(child.ctx, ast.Load):
+                return None
+            if isinstance(child, ast.Call):
+                if not isinstance(child.func, ast.Name):
+                    return None
+                if child.func.id in known_functions:
+                    calls.add(child.func.id)
+                elif child.func.id not in known_builtins:
+                    return None
+
+    # Every name read must be a parameter, a local, a pure builtin or a pure function
+    if not read <= local_names | known_functions | known_builtins:
+        return None
+    return calls
+
+
+def number_kinds(tokens):
+    """
+    Infers which variables only ever hold ints or floats (bools count as ints).
+
+    A variable qualifies when every binding in its scope is a plain assignment
+    ('x = ...', 'x += ...') of an expression whose kind is known (see expression_kinds),
+    so parameters, penguinTake answers, loop and comprehension targets, imported names
+    and names declared 'global' or 'nonlocal' anywhere never do. A scope holding a
+    statement that cannot be analyzed has no known variables, and neither has the
+    module level of a program with penguinBring or a star import.
+
+    :param tokens: The full token list of the program.
+    :return: A list aligned with 'tokens': for every token, a dictionary mapping the
+             variables its scope can read to a frozenset of kinds (INT, FLOAT or both).
+    """
+    scopes = function_scopes(tokens)
+    owner = [None] * len(tokens)    # innermost function of each token, by scope number
+    positions = {None: []}
+    for number, info in enumerate(scopes):
+        positions[number] = []
+        for position in range(info.start + 1, info.end):
+            owner[position] = number
+    for position, number in enumerate(owner):
+        positions[number].append(position)
+
+    parsed = [parse_token(token) for token in tokens]
+    untrusted, rebound = set(), {info.name for info in scopes}
+    star_import = any(token["type"] == TokenType.PENGUIN_BRING for token in tokens)
+    for info in scopes:
+        rebound.update(info.params or [])
+    for nodes in parsed:
+        for node in nodes or []:
+            for child in ast.walk(node):
+                if isinstance(child, (ast.Global, ast.Nonlocal)):
+                    untrusted.update(child.names)
+                elif isinstance(child, ast.Name) and not isinstance(child.ctx, ast.Load):
+                    rebound.add(child.id)
+                elif isinstance(child, ast.alias):
+                    star_import |= child.name == "*"
+                    rebound.add((child.asname or child.name).split(".")[0])
+    builtins = frozenset() if star_import else NUMBER_BUILTINS - rebound
+
+    kinds_by_scope = {}
+    for number in positions:
+        info = None if number is None else scopes[number]
+        assignments, other = {}, set(info.params or []) if info else set()
+        analyzable = not (info is None and star_import)
+        for position in positions[number]:
+            if parsed[position] is None:
+                analyzable = False
+            elif tokens[position]["type"] == TokenType.PENGUIN_DO:
+                other.add(tokens[position]["name"])
+            else:
+                _collect_assignments(parsed[position], assignments, other)
+
+        # Variables of enclosing scopes stay visible unless this scope binds the name
+        outer = {} if info is None else kinds_by_scope[owner[info.start]]
+        visible = {name: kinds for name, kinds in outer.items()
+                   if name not in assignments and name not in other}
+        candidates = set(assignments) - other - untrusted if analyzable else set()
+        kinds = {name: frozenset() for name in candidates}
+        changed = True
+        while changed:
+            changed = False
+            environment = dict(visible, **kinds)
+            for name in list(kinds):
+                found = [expression_kinds(value, environment, builtins) for value in assignments[name]]
+                if None in found:
+                    del kinds[name]
+                    changed = True
+                elif frozenset().union(*found) != kinds[name]:
+                    kinds[name] = frozenset().union(*found)
+                    changed = True
+        kinds_by_scope[number] = dict(visible, **kinds)
+
+    return [kinds_by_scope[number] for number in owner]
+
+
+def expression_kinds(node, environment, builtins=NUMBER_BUILTINS):
+    """
+    Infers the kinds of number an expression can evaluate to.
+
+    :param node: An 'ast' expression.
+    :param environment: Maps variable names to their kinds (see number_kinds).
+    :param builtins: The builtins of NUMBER_BUILTINS the program does not rebind.
+    :return: A frozenset of INT and FLOAT (empty while a variable's kinds are still being
+             inferred), or None when the expression may be something else.
+    """
+    def kinds_of(child):
+        return expression_kinds(child, environment, builtins)
+
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, int):
+            return frozenset([INT])
+        return frozenset([FLOAT]) if isinstance(node.value, float) else None
+    if isinstance(node, ast.Name):
+        return environment.get(node.id)
+    if isinstance(node, ast.BinOp):
+        left, right = kinds_of(node.left), kinds_of(node.right)
+        if left is None or right is None:
+            return None
+        if isinstance(node.op, (ast.Add, ast.Sub, ast.Mult, ast.FloorDiv, ast.Mod)):
+            return frozenset(INT if (a, b) == (INT, INT) else FLOAT for a in left for b in right)
+        if isinstance(node.op, ast.Div):
+            return frozenset([FLOAT]) if left and right else frozenset()
+        if isinstance(node.op, ast.Pow) and FLOAT not in right:
+            # A float exponent could turn a negative base into a complex number
+            if not right:
+                return frozenset()
+            if not isinstance(node.right, ast.Constant):
+                int_power = frozenset([INT, FLOAT])
+            else:
+                int_power = frozenset([INT if node.right.value >= 0 else FLOAT])
+            return (int_power if INT in left else frozenset()) | (left & {FLOAT})
+        if isinstance(node.op, (ast.LShift, ast.RShift, ast.BitAnd, ast.BitOr, ast.BitXor)):
+            return left | right if FLOAT not in left | right else None
+        return None
+    if isinstance(node, ast.UnaryOp):
+        if isinstance(node.op, ast.Not):
+            return frozenset([INT])
+        operand = kinds_of(node.operand)
+        if operand is None or (isinstance(node.op, ast.Invert) and FLOAT in operand):
+            return None
+        return operand
+    if isinstance(node, (ast.IfExp, ast.BoolOp, ast.Compare)):
+        if isinstance(node, ast.IfExp):
+            parts = [kinds_of(node.body), kinds_of(node.orelse)]
+        elif isinstance(node, ast.BoolOp):
+            parts = [kinds_of(value) for value in node.values]
+        else:
+            # Comparisons of numbers give bools; other objects may return anything
+            parts = [kinds_of(node.left)] + [kinds_of(value) for value in node.comparators]
+            return None if None in parts else frozenset([INT])
+        return None if None in parts else frozenset().union(*parts)
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in builtins
+            and not node.keywords and not any(isinstance(arg, ast.Starred) for arg in node.args)):
+        name, arguments = node.func.id, [kinds_of(arg) for arg in node.args]
+        if name in ("int", "len", "ord"):
+            return frozenset([INT])
+        if name == "float":
+            return frozenset([FLOAT])
+        if None in arguments or not arguments:
+            return None
+        if name == "abs" and len(arguments) == 1:
+            return arguments[0]
+        if name == "round" and len(arguments) <= 2:
+            return frozenset([INT]) if len(arguments) == 1 else arguments[0]
+        if name in ("min", "max") and len(arguments) >= 2:
+            return frozenset().union(*arguments)
+    return None
+
+
+def _collect_assignments(nodes, assignments, other):
+    """
+    Records the plain assignments among 'nodes' ('x = value', 'x += value') in
+    'assignments' as name -> [value expressions], and every name bound any other way in 'other'.
+    """
+    for node in nodes:
+        plain = set()
+        for child in ast.walk(node):
+            if isinstance(child, ast.Assign) and all(isinstance(t, ast.Name) for t in child.targets):
+                for target in child.targets:
+                    assignments.setdefault(target.id, []).append(child.value)
+                    plain.add(id(target))
+            elif isinstance(child, ast.AugAssign) and isinstance(child.target, ast.Name):
+                value = ast.BinOp(left=ast.Name(id=child.target.id, ctx=ast.Load()), op=child.op,
+                                  right=child.value)
+                assignments.setdefault(child.target.id, []).append(value)
+                plain.add(id(child.target))
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name) and not isinstance(child.ctx, ast.Load) and id(child) not in plain:
+                other.add(child.id)
+            elif isinstance(child, ast.alias):
+                other.add((child.asname or child.name).split(".")[0])
@@ -0,0 +1,280 @@
+"""
+Purpose:
+Generates a Python 'ast.Module' directly from a list of tokens, as an alternative to the
+text-based CodeGenerator.
+
+Explanation:
+- penguinDo        -> ast.FunctionDef (with the decorators added by optimization passes),
+                      or ast.AsyncFunctionDef for the coroutines of the async target.
+- penguinSay       -> print(...) call, or '_penguin_say(...)' in buffered output mode, with
+                      string concatenations lowered to f-strings like the CodeGenerator does.
+- penguinTake      -> Assignment from 'dynamic_input(...)'.
+- returnIce        -> ast.Return with custom operator replacements.
+- keepWalking      -> ast.While.
+- penguinIf        -> ast.If; penguinWhatAbout and penguinElse extend its 'orelse' chain.
+- breakIce         -> ast.Break; continueWalking -> ast.Continue.
+- iceBucket        -> The statements of the assignment, with custom operator replacements.
+- penguinFlock     -> Assignment from 'penguin_flock(...)'.
+- penguinBring     -> ast.ImportFrom ('from <module> import *').
+
+Blocks are rebuilt from the "indent" field, and every node gets the .pg line 'index' of its
+token as 'lineno', so tracebacks of programs run from the module point at .pg lines.
+The module can be handed to compile() without producing Python source first; ast.unparse
+is only needed when a .py file is requested. Structural mistakes (a penguinElse without a
+penguinIf, an empty block, an expression that is not valid Python) raise SyntaxError
+at build time instead of producing a broken .py file.
+"""
+
+import ast
+import copy
+
+from compiler.code_generator import (
+    CUSTOM_OPERATORS, HELPER_REFERENCES, binds_name, lower_say_concatenation
+)
+from compiler.runtime import RUNTIME_HELPERS, render_helpers
+from compiler.tokens import TokenType
+
+ARITHMETIC_TOKENS = (
+    TokenType.SLIDE_UP,
+    TokenType.SLIDE_DOWN,
+    TokenType.PENGUIN_BOOST,
+    TokenType.GIVE_PENGUINS,
+    TokenType.SNOWBALL,
+)
+
+# Parsed runtime helpers, keyed by helper name
+_HELPER_NODES = {}
+
+
+class AstGenerator:
+    def __init__(self, buffered_output=False):
+        """
+        :param buffered_output: Route penguinSay through the buffered '_penguin_say' helper.
+        """
+        self.buffered_output = buffered_output
+        # Runtime helpers used by the most recently compiled tokens
+        self.helpers = set()
+        # Whether penguinSay concatenations may be lowered (the program does not bind str)
+        self.lower_say = True
+
+    def compile_tokens(self, tokens, bound_names=()):
+        """
+        Builds the statements of a program from a list of tokens.
+
+        :param tokens: Validated (and optionally optimized) tokens.
+        :param bound_names: Names already bound where the code will run (by earlier REPL
+                            entries, for example), besides the ones the tokens bind.
+        :return: An ast.Module holding the program statements, without runtime helpers.
+        :raises SyntaxError: If the tokens do not form a valid Python program.
+        """
+        self.helpers = set()
+        self.lower_say = "str" not in bound_names and not binds_name(tokens, "str")
+        module = ast.Module(body=[], type_ignores=[])
+
+        # Each entry: (indent of the block header, statement list of the block, header token)
+        blocks = [(-1, module.body, None)]
+        # Last if-statement per block, so penguinWhatAbout/penguinElse can extend its chain
+        open_ifs = {}
+
+        for token in tokens:
+            ttype = token["type"]
+            indent = token["indent"]
+            lineno = token["index"]
+
+            # Close every block the token is not indented into
+            while indent <= blocks[-1][0]:
+                self._close_block(blocks.pop())
+            body = blocks[-1][1]
+
+            # -------------------------------------------
+            # penguinWhatAbout / penguinElse extend the previous if-statement
+            # -------------------------------------------
+            if ttype in (TokenType.PENGUIN_WHAT_ABOUT, TokenType.PENGUIN_ELSE):
+                chain_tail = open_ifs.get((id(body), indent))
+                if chain_tail is None or not body or body[-1] is not chain_tail[0]:
+                    raise SyntaxError(f"line {lineno}: {ttype} without a matching penguinIf")
+                head, tail = chain_tail
+                if ttype == TokenType.PENGUIN_ELSE:
+                    del open_ifs[(id(body), indent)]
+                    blocks.append((indent, tail.orelse, token))
+                    continue
+                node = self._located(ast.If(test=self._expression(token["condition"], lineno),
+                                            body=[], orelse=[]), lineno)
+                tail.orelse.append(node)
+                open_ifs[(id(body), indent)] = (head, node)
+                blocks.append((indent, node.body, token))
+                continue
+
+            node = self._statement(token)
+            if node is None:
+                continue     # Unhandled tokens are ignored
+            statements = node if isinstance(node, list) else [node]
+            body.extend(statements)
+
+            if ttype == TokenType.PENGUIN_IF:
+                open_ifs[(id(body), indent)] = (statements[0], statements[0])
+            if ttype in (TokenType.PENGUIN_DO, TokenType.KEEP_WALKING, TokenType.PENGUIN_IF):
+                blocks.append((indent, statements[-1].body, token))
+
+        while len(blocks) > 1:
+            self._close_block(blocks.pop())
+        return module
+
+    def helper_statements(self, names):
+        """
+        Returns fresh copies of the parsed runtime helper statements.
+
+        :param names: Iterable of helper names from compiler.runtime.RUNTIME_HELPERS.
+        """
+        statements = []
+        wanted = set(names)
+        for name in [name for name in RUNTIME_HELPERS if name in wanted]:
+            if name not in _HELPER_NODES:
+                _HELPER_NODES[name] = ast.parse("\n".join(render_helpers([name]))).body
+            statements.extend(copy.deepcopy(_HELPER_NODES[name]))
+        return statements
+
+    def _statement(self, token):
+        """
+        Builds the statement node(s) for a single token, or None for unrecognized tokens.
+        """
+        ttype = token["type"]
+        lineno = token["index"]
+
+        if ttype == TokenType.PENGUIN_DO:
+            self._note_helper_references(token["params"])
+            keyword = "async def" if token.get("async") else "def"
+            definition = self._parse(f'{keyword} {token["name"]}({token["params"]}): pass', lineno).body[0]
+            definition.body = []
+            definition.decorator_list = [
+                self._expression(decorator, lineno) for decorator in token.get("decorators", [])
+            ]
+            return self._located(definition, lineno)
+
+        if ttype == TokenType.PENGUIN_SAY:
+            value = lower_say_concatenation(token["value"]) if self.lower_say else token["value"]
+            if self.buffered_output:
+                self.helpers.add("_penguin_say")
+            function = token.get("function", "_penguin_say" if self.buffered_output else "print")
+            call = self._call(function, value, lineno)
+            if token.get("await"):
+                call = self._located(ast.Await(value=call), lineno)
+            return self._located(ast.Expr(value=call), lineno)
+
+        if ttype == TokenType.PENGUIN_TAKE:
+            if not token.get("await"):
+                self.helpers.add("dynamic_input")
+            call = self._call(token.get("function", "dynamic_input"), token["prompt"], lineno)
+            if token.get("await"):
+                call = self._located(ast.Await(value=call), lineno)
+            assign = self._assign(token["name"], call, lineno)
+            if self.buffered_output:
+                self.helpers.add("_penguin_say")
+                return [self._call_statement("_penguin_flush", "", lineno), assign]
+            return assign
+
+        if ttype == TokenType.RETURN_ICE:
+            value = None
+            if token["value"]:
+                value = self._expression(self._replace_custom_ops(token["value"]), lineno)
+            return self._located(ast.Return(value=value), lineno)
+
+        if ttype == TokenType.BREAKICE:
+            return self._located(ast.Break(), lineno)
+
+        if ttype == TokenType.CONTINUE_WALKING:
+            return self._located(ast.Continue(), lineno)
+
+        if ttype == TokenType.ICE_BUCKET:
+            self._note_helper_references(token["value"])
+            return self._parse(self._replace_custom_ops(token["value"]), lineno).body
+
+        if ttype == TokenType.PENGUIN_FLOCK:
+            self.helpers.add("penguin_flock")
+            call = self._call("penguin_flock", self._replace_custom_ops(token["value"]), lineno)
+            return self._assign(token["name"], call, lineno)
+
+        if ttype == TokenType.PENGUIN_BRING:
+            names = [self._located(ast.alias(name="*"), lineno)]
+            return self._located(ast.ImportFrom(module=token["name"], names=names, level=0), lineno)
+
+        if ttype == TokenType.KEEP_WALKING:
+            test = self._expression(token["condition"], lineno)
+            return self._located(ast.While(test=test, body=[], orelse=[]), lineno)
+
+        if ttype == TokenType.PENGUIN_IF:
+            test = self._expression(token["condition"], lineno)
+            return self._located(ast.If(test=test, body=[], orelse=[]), lineno)
+
+        if ttype in ARITHMETIC_TOKENS:
+            value = self._expression(self._replace_custom_ops(token["expression"]), lineno)
+            return self._assign(token["target"], value, lineno)
+
+        return None
+
+    def _close_block(self, block):
+        """
+        Rejects blocks without statements, which Python cannot compile.
+        """
+        _, body, token = block
+        if not body:
+            raise SyntaxError(f'line {token["index"]}: expected an indented block after {token["type"]}')
+
+    def _parse(self, source, lineno, mode="exec"):
+        """
+        Parses a Python fragment and moves it to the given .pg line.
+        """
+        try:
+            tree = ast.parse(source, mode=mode)
+        except SyntaxError as e:
+            raise SyntaxError(f"line {lineno}: {e.msg}: {source}") from None
+        return ast.increment_lineno(tree, lineno - 1)
+
+    def _expression(self, source, lineno):
+        self._note_helper_references(source)
+        return self._parse(source, lineno, mode="eval").body
+
+    def _call(self, function, arguments, lineno):
+        """
+        Builds 'function(<arguments>)', keeping positional and keyword arguments apart
+        exactly like the text backend's 'function(...)' does.
+        """
+        self._note_helper_references(arguments)
+        call = self._parse(f"_({arguments})", lineno, mode="eval").body
+        call.func = self._located(ast.Name(id=function, ctx=ast.Load()), lineno)
+        return call
+
+    def _call_statement(self, function, arguments, lineno):
+        return self._located(ast.Expr(value=self._call(function, arguments, lineno)), lineno)
+
+    def _assign(self, target_source, value, lineno):
+        target = self._expression(target_source, lineno)
+        for node in ast.walk(target):
+            if hasattr(node, "ctx"):
+                node.ctx = ast.Store()
+        return self._located(ast.Assign(targets=[target], value=value), lineno)
+
+    def _located(self, node, lineno):
+        """
+        Gives a node and all of its children without a position the given .pg line.
+        """
+        for child in ast.walk(node):
+            if "lineno" in child._attributes and not hasattr(child, "lineno"):
+                child.lineno = child.end_lineno = lineno
+                child.col_offset = child.end_col_offset = 0
+        return node
+
+    def _note_helper_references(self, source):
+        """
+        Records the runtime helpers a Python fragment mentions by name (see CodeGenerator._references).
+        """
+        if source:
+            for helper, names in HELPER_REFERENCES.items():
+                if any(name in source for name in names):
+                    self.helpers.add(helper)
+
+    def _replace_custom_ops(self, expression):
+        for custom_op, py_op in CUSTOM_OPERATORS.items():
+            expression = expression.replace(custom_op, py_op)
+        return expression
+
@@ -0,0 +1,247 @@
+"""
+Purpose:
+Turns a program into an asyncio coroutine, so thousands of interactive programs can run
+cooperatively in one event loop instead of one process each.
+
+Explanation:
+- penguinSay  -> 'await _penguin_async_say(...)', which writes the text to the session's
+                 output sink instead of stdout.
+- penguinTake -> 'await _penguin_async_take(...)', which writes the prompt to the sink and
+                 awaits a line from the session's input source.
+- penguinDo   -> 'async def' when the function needs to await: it says, takes or loops,
+                 calls itself (directly or through other functions), or calls an async
+                 function. Every call of an async function is awaited. Other functions stay
+                 plain 'def', so they can still be passed around as values.
+- keepWalking / recursive penguinDo -> The first statement of the body counts a tick and
+                 every 'yield_every' ticks gives the other programs a turn:
+      if _penguin_tick() % <yield_every> == 0: await _penguin_asyncio.sleep(0)
+- The top-level statements become the body of 'async def _penguin_main()' (every name they
+  bind is declared 'global', so functions keep seeing them), and the module ends with
+  '_penguin_run(_penguin_main)' under 'penguinIf(__name__ == "__main__")'.
+
+run_session executes a compiled async program in a namespace of its own with its own input
+source and output sink, so the globals of one session never leak into another.
+
+The pass runs after optimization, the step budget and instrumentation. Programs that
+cannot run as a coroutine are rejected with a SyntaxError: penguinBring (the imported
+functions would not be awaited), statements that cannot be analyzed, async functions used
+as values ('map(fact, xs)' would produce coroutine objects that are never awaited), and
+calls of async functions inside generator expressions or lambdas, which cannot await them.
+"""
+
+import ast
+
+from compiler.analysis import (
+    block_end, function_locals, function_scopes, names_in, parse_token, recursive_functions,
+    rewrite_token,
+)
+from compiler.main_wrapper import MAIN_FUNCTION, MainWrapper
+from compiler.tokens import TokenType
+
+# Tokens that make the function holding them a coroutine
+AWAITING_TOKENS = (TokenType.PENGUIN_SAY, TokenType.PENGUIN_TAKE, TokenType.KEEP_WALKING)
+
+
+class AsyncTarget:
+    def __init__(self, yield_every=1000):
+        """
+        :param yield_every: Loop iterations and recursive calls between two turns given to
+                            the other programs of the event loop.
+        """
+        if yield_every < 1:
+            raise ValueError(f"yield_every must be at least 1, got {yield_every}.")
+        self.yield_every = yield_every
+        self.helpers = set()
+
+    def transform(self, tokens):
+        """
+        Rewrites a program into coroutine form.
+
+        :param tokens: Validated (and optimized) tokens.
+        :return: A new token list.
+        :raises SyntaxError: If the program cannot run as a coroutine.
+        """
+        self.helpers = {"_penguin_async"}
+        for token in tokens:
+            if token["type"] == TokenType.PENGUIN_BRING:
+                raise SyntaxError(f'line {token["index"]}: penguinBring is not supported by the async target')
+            if parse_token(token) is None:
+                raise SyntaxError(f'line {token["index"]}: the statement cannot be made async')
+
+        scopes = function_scopes(tokens)
+        coroutines = self.async_functions(tokens, scopes)
+        recursive = recursive_functions(tokens) & coroutines
+        awaiter = _CallAwaiter(coroutines)
+
+        # Locals of the innermost function around each position shadow async functions
+        shadowed = [set() for _ in tokens]
+        for info in scopes:
+            local_names = function_locals(info, tokens)
+            for position in range(info.start + 1, info.end):
+                shadowed[position] = local_names
+
+        rewritten = []
+        for position, token in enumerate(tokens):
+            ttype = token["type"]
+            if coroutines - shadowed[position]:
+                checker = _CoroutineUseChecker(coroutines - shadowed[position])
+                for node in parse_token(token):
+                    checker.visit(node)
+                if checker.problem:
+                    raise SyntaxError(f'line {token["index"]}: {checker.problem}')
+                awaiter.names = coroutines - shadowed[position]
+                token = rewrite_token(token, awaiter)
+            if ttype == TokenType.PENGUIN_DO and token["name"] in coroutines:
+                token = dict(token, **{"async": True})
+            elif ttype == TokenType.PENGUIN_SAY:
+                token = dict(token, function="_penguin_async_say", **{"await": True})
+            elif ttype == TokenType.PENGUIN_TAKE:
+                token = dict(token, function="_penguin_async_take", **{"await": True})
+            rewritten.append(token)
+
+            yields = ttype == TokenType.KEEP_WALKING or (
+                ttype == TokenType.PENGUIN_DO and token["name"] in recursive)
+            if yields and block_end(tokens, position) > position + 1:
+                rewritten.append({
+                    "type": TokenType.ICE_BUCKET,
+                    "value": f"if _penguin_tick() % {self.yield_every} == 0: await _penguin_asyncio.sleep(0)",
+                    "indent": tokens[position + 1]["indent"],
+                    "index": token["index"]
+                })
+        return self._wrap_main(rewritten)
+
+    def async_functions(self, tokens, scopes=None):
+        """
+        Finds the penguinDo functions that must be coroutines: the ones that say, take,
+        loop or recurse, and the ones that call such a function.
+
+        :return: A set of function names.
+        """
+        scopes = function_scopes(tokens) if scopes is None else scopes
+        coroutines = set(recursive_functions(tokens))
+        calls = {}
+        for info in scopes:
+            body = info.body(tokens)
+            if any(token["type"] in AWAITING_TOKENS for token in body):
+                coroutines.add(info.name)
+            nodes = []
+            for token in body:
+                nodes.extend(parse_token(token) or [])
+            calls[info.name] = names_in(nodes)[0] - function_locals(info, tokens)
+
+        changed = True
+        while changed:
+            changed = False
+            for name, called in calls.items():
+                if name not in coroutines and called & coroutines:
+                    coroutines.add(name)
+                    changed = True
+        return coroutines
+
+    def _wrap_main(self, tokens):
+        """
+        Moves the top-level statements into 'async def _penguin_main()' and ends the module
+        with the call that runs it when the module is started directly.
+        """
+        inside = set()
+        for info in function_scopes(tokens):
+            if info.token["indent"] == 0:
+                inside.update(range(info.start, info.end))
+        main = [token for position, token in enumerate(tokens) if position not in inside]
+        first = main[0]["index"] if main else (tokens[-1]["index"] if tokens else 1)
+        last = main[-1]["index"] if main else first
+
+        bound = MainWrapper().main_bindings(main)
+        if bound is None:
+            raise SyntaxError("'from ... import *' is not supported by the async target")
+        bound |= {token["name"] for token in main if token["type"] == TokenType.PENGUIN_DO}
+
+        wrapped = [token for position, token in enumerate(tokens) if position in inside]
+        wrapped.append({"type": TokenType.PENGUIN_DO, "name": MAIN_FUNCTION, "params": "",
+                        "indent": 0, "index": first, "async": True})
+        if bound:
+            wrapped.append({"type": TokenType.ICE_BUCKET, "value": f'global {", ".join(sorted(bound))}',
+                            "indent": 4, "index": first})
+        wrapped.extend(dict(token, indent=token["indent"] + 4) for token in main)
+        if not main:
+            wrapped.append({"type": TokenType.ICE_BUCKET, "value": "pass", "indent": 4, "index": first})
+        wrapped.append({"type": TokenType.PENGUIN_IF, "condition": '(__name__ == "__main__")',
+                        "indent": 0, "index": last})
+        wrapped.append({"type": TokenType.ICE_BUCKET, "value": f"_penguin_run({MAIN_FUNCTION})",
+                        "indent": 4, "index": last})
+        return wrapped
+
+
+async def run_session(program, read, write, name="penguin_session"):
+    """
+    Runs a program compiled for the async target as one session of a shared event loop.
+
+    :param program: Code object from PenguinBubbleCompiler(target="async").compile_to_code().
+    :param read: Coroutine function returning the next input line (without its newline).
+    :param write: Coroutine function receiving every piece of text the program prints,
+                  penguinTake prompts included.
+    :param name: '__name__' of the session namespace (anything but "__main__").
+    :return: The namespace the session ran in, holding its global variables.
+    """
+    namespace = {"__name__": name}
+    exec(program, namespace)
+    namespace["_penguin_read"] = read
+    namespace["_penguin_write"] = write
+    await namespace[MAIN_FUNCTION]()
+    return namespace
+
+
+class _CallAwaiter(ast.NodeTransformer):
+    """
+    Awaits every call of one of the given functions: 'f(x)' -> 'await f(x)'.
+    """
+
+    def __init__(self, names=()):
+        self.names = set(names)
+        self.changed = False
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if isinstance(node.func, ast.Name) and node.func.id in self.names:
+            self.changed = True
+            return ast.Await(value=node)
+        return node
+
+
+class _CoroutineUseChecker(ast.NodeVisitor):
+    """
+    Finds the first use of an async function that _CallAwaiter cannot await: a reference
+    that is not a direct call, or a call inside a generator expression or a lambda.
+    The description of the problem is left in 'problem'.
+    """
+
+    def __init__(self, names):
+        self.names = names
+        self.problem = None
+        self.inside = []    # generator expressions and lambdas around the visited node
+
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Name) and node.func.id in self.names:
+            if self.inside and self.problem is None:
+                self.problem = (f"'{node.func.id}' is async with the async target and cannot be "
+                                f"called inside a {self.inside[-1]}")
+            for child in node.args + node.keywords:
+                self.visit(child)
+        else:
+            self.generic_visit(node)
+
+    def visit_Name(self, node):
+        if node.id in self.names and isinstance(node.ctx, ast.Load) and self.problem is None:
+            self.problem = (f"'{node.id}' is async with the async target and can only be "
+                            f"called directly, not used as a value")
+
+    def visit_GeneratorExp(self, node):
+        self._visit_inside(node, "generator expression (use a list comprehension)")
+
+    def visit_Lambda(self, node):
+        self._visit_inside(node, "lambda")
+
+    def _visit_inside(self, node, description):
+        self.inside.append(description)
+        self.generic_visit(node)
+        self.inside.pop()
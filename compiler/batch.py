@@ -0,0 +1,450 @@
+"""
+Purpose:
+Compiles and validates large batches of independent .pg files on many machines. A
+coordinator hands out the files over TCP; workers (each a process, on any number of
+nodes) pull batches, compile them and stream the outcome of every file back.
+
+Explanation:
+- Protocol: one JSON object per line over a TCP connection per worker process. The worker
+  says "hello" and receives the compiler options, so every node compiles the same way.
+  It then sends "request" for work and gets a "batch" of jobs (path and source text,
+  so nodes need no shared file system), "wait" or "done". Every file it finishes is sent
+  back as a "result" right away and acknowledged with an "ack".
+- Work stealing: workers pull a new batch when they finished the last one. Batches get
+  smaller as the queue runs low, and once it is empty an idle worker steals the back half
+  of the unfinished files of the busiest worker. The victim learns about it in its next
+  "ack" and skips those files; if it already compiled one, the first result wins.
+- Retries: when a worker disconnects, or sends nothing for 'worker_timeout' seconds, the
+  files it still held go back to the front of the queue. A file whose worker was lost
+  'max_attempts' times is recorded as "lost" instead of being handed out again.
+- Outcomes: a file is "ok" when it compiles and the generated Python compiles too, and
+  "failed" otherwise (with the compiler messages). write_manifest stores every outcome as
+  JSON; with an output directory the generated .py files are written there as well,
+  mirroring the layout of the sources.
+- Throughput grows with the number of worker processes, on this machine
+  (start_local_workers) or on others ('python main.py worker HOST:PORT').
+
+The protocol has no authentication and workers only compile, never run, the programs.
+Run coordinators on a trusted network.
+"""
+
+import collections
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import threading
+import time
+
+from compiler.compiler import PenguinBubbleCompiler
+
+MANIFEST_VERSION = 1
+DEFAULT_PORT = 7373
+
+
+def parse_address(text, default_host="127.0.0.1"):
+    """
+    Parses 'host:port', ':port' or 'port' into a (host, port) tuple.
+    """
+    host, _, port = text.rpartition(":")
+    return (host or default_host), int(port)
+
+
+def collect_files(paths):
+    """
+    Expands directories into the .pg files they contain (recursively, sorted).
+
+    :param paths: Paths of .pg files and directories.
+    :return: A list of absolute paths without duplicates.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, subdirectories, names in os.walk(path):
+                subdirectories.sort()
+                files.extend(os.path.join(directory, name) for name in sorted(names) if name.endswith(".pg"))
+        else:
+            files.append(path)
+    return list(dict.fromkeys(os.path.abspath(path) for path in files))
+
+
+class BatchCoordinator:
+    def __init__(self, paths, compiler_options=None, address=("127.0.0.1", DEFAULT_PORT), batch_size=16,
+                 max_attempts=3, worker_timeout=300.0, poll_interval=0.2, output_dir=None):
+        """
+        :param paths: The .pg files (and directories of .pg files) to compile.
+        :param compiler_options: Keyword arguments for PenguinBubbleCompiler, sent to every worker.
+        :param address: (host, port) to listen on. Port 0 picks a free port.
+        :param batch_size: Largest number of files handed to a worker at once.
+        :param max_attempts: Times a file may be lost with its worker before it is given up.
+        :param worker_timeout: Seconds of silence after which a worker counts as dead.
+        :param poll_interval: Seconds a worker waits before asking again when there is no work.
+        :param output_dir: Directory for the generated .py files. None keeps outcomes only.
+        """
+        files = collect_files(paths)
+        self.root = os.path.commonpath([os.path.dirname(path) for path in files]) if files else os.getcwd()
+        self.files = [os.path.relpath(path, self.root) for path in files]
+        self.known = set(self.files)
+        self.compiler_options = dict(compiler_options or {})
+        self.requested_address = address
+        self.batch_size = max(1, batch_size)
+        self.max_attempts = max(1, max_attempts)
+        self.worker_timeout = worker_timeout
+        self.poll_interval = poll_interval
+        self.output_dir = output_dir
+
+        self.pending = collections.deque(self.files)
+        self.assigned = {}          # worker -> files handed out and not reported yet, in order
+        self.cancelled = {}         # worker -> files stolen from it since its last ack
+        self.losses = collections.Counter()
+        self.results = {}
+        self.workers_seen = 0
+        self.lock = threading.Condition()
+        self.server = None
+        self.address = None
+
+    # -------------------------------------------------------
+    # Serving
+    # -------------------------------------------------------
+    def start(self):
+        """
+        Starts accepting workers in a background thread.
+
+        :return: The (host, port) the coordinator listens on.
+        """
+        self.server = _CoordinatorServer(self.requested_address, _WorkerHandler)
+        self.server.coordinator = self
+        self.address = self.server.server_address[:2]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.address
+
+    def wait(self, timeout=None):
+        """
+        Blocks until every file has an outcome.
+
+        :return: True if all files are done, False if the timeout expired first.
+        """
+        with self.lock:
+            return self.lock.wait_for(self.finished, timeout)
+
+    def close(self):
+        """
+        Stops accepting workers. Connected workers see the connection close and stop.
+        """
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def run(self, local_workers=0, manifest_path=None):
+        """
+        Compiles every file with 'local_workers' processes on this machine plus every
+        remote worker that connects, then writes the manifest. Starts the coordinator
+        unless start() was already called.
+
+        :return: The outcomes, as returned by summary().
+        """
+        host, port = self.address if self.server is not None else self.start()
+        connect_host = "127.0.0.1" if host in ("0.0.0.0", "") else host
+        processes = start_local_workers(connect_host, port, local_workers)
+        try:
+            self.wait()
+        finally:
+            self.close()
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+        if manifest_path:
+            self.write_manifest(manifest_path)
+        return self.summary()
+
+    def finished(self):
+        return len(self.results) == len(self.files)
+
+    # -------------------------------------------------------
+    # Work distribution (called by the connection handlers)
+    # -------------------------------------------------------
+    def register(self, name):
+        """
+        Adds a worker and returns its unique id.
+        """
+        with self.lock:
+            self.workers_seen += 1
+            worker = f"{name or 'worker'}#{self.workers_seen}"
+            self.assigned[worker] = []
+            self.cancelled[worker] = set()
+            return worker
+
+    def unregister(self, worker):
+        """
+        Removes a worker. Files it still held go back to the queue, or are recorded as
+        "lost" once they were lost 'max_attempts' times.
+        """
+        with self.lock:
+            held = [path for path in self.assigned.pop(worker, []) if path not in self.results]
+            self.cancelled.pop(worker, None)
+            for path in reversed(held):
+                self.losses[path] += 1
+                if self.losses[path] >= self.max_attempts:
+                    self.results[path] = {
+                        "status": "lost",
+                        "messages": f"Worker lost {self.losses[path]} time(s) while compiling this file.",
+                        "worker": worker,
+                        "attempts": self.losses[path],
+                    }
+                else:
+                    self.pending.appendleft(path)
+            self.lock.notify_all()
+
+    def next_batch(self, worker):
+        """
+        Picks the next files for a worker: from the queue, or stolen from the busiest worker.
+
+        :return: The reply message for a "request".
+        """
+        with self.lock:
+            if self.finished():
+                return {"type": "done"}
+            # Smaller batches as the queue runs low, so the tail is spread over all workers
+            size = min(self.batch_size, max(1, -(-len(self.pending) // max(1, len(self.assigned)))))
+            batch = [self.pending.popleft() for _ in range(min(size, len(self.pending)))]
+            batch = [path for path in batch if path not in self.results]
+            if not batch:
+                batch = self._steal()
+            if not batch:
+                return {"type": "wait", "seconds": self.poll_interval}
+            self.assigned[worker].extend(batch)
+
+        jobs = []
+        for path in batch:
+            try:
+                with open(os.path.join(self.root, path), "r", encoding="utf-8") as f:
+                    jobs.append({"path": path, "source": f.read()})
+            except (OSError, UnicodeDecodeError) as e:
+                self.record(worker, {"path": path, "ok": False, "messages": f"Cannot read the file: {e}"})
+        return {"type": "batch", "jobs": jobs, "return_output": self.output_dir is not None}
+
+    def _steal(self):
+        """
+        Takes the back half of the unfinished files of the busiest worker (lock held).
+        """
+        victim = max(self.assigned, key=lambda worker: len(self.assigned[worker]), default=None)
+        if victim is None or len(self.assigned[victim]) < 2:
+            return []
+        held = self.assigned[victim]
+        stolen = held[len(held) - len(held) // 2:]
+        del held[len(held) - len(held) // 2:]
+        self.cancelled[victim].update(stolen)
+        return stolen
+
+    def record(self, worker, result):
+        """
+        Stores the outcome of a file; the first result for a file wins.
+
+        :return: The reply message for a "result": an "ack" with the files stolen from the worker.
+        """
+        path = result.get("path")
+        output = None
+        with self.lock:
+            held = self.assigned.get(worker, [])
+            if path in held:
+                held.remove(path)
+            if path in self.known and path not in self.results:
+                self.results[path] = {
+                    "status": "ok" if result.get("ok") else "failed",
+                    "messages": result.get("messages", ""),
+                    "worker": worker,
+                    "attempts": self.losses[path] + 1,
+                    "seconds": result.get("seconds"),
+                }
+                output = result.get("output")
+                self.lock.notify_all()
+            skip = sorted(self.cancelled.get(worker, ()))
+            if worker in self.cancelled:
+                self.cancelled[worker].clear()
+
+        if output is not None and self.output_dir is not None:
+            output_path = os.path.join(self.output_dir, os.path.splitext(path)[0] + ".py")
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(output)
+        return {"type": "ack", "skip": skip}
+
+    # -------------------------------------------------------
+    # Results
+    # -------------------------------------------------------
+    def summary(self):
+        """
+        :return: A dict with the file paths that are "ok", "failed" and "lost", and the
+                 outcome of every file under "files".
+        """
+        with self.lock:
+            files = {path: dict(self.results[path]) for path in self.files if path in self.results}
+        summary = {"ok": [], "failed": [], "lost": [], "files": files}
+        for path, outcome in files.items():
+            summary[outcome["status"]].append(path)
+        return summary
+
+    def write_manifest(self, path):
+        """
+        Writes the outcome of every file as JSON.
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "root": self.root,
+                "options": self.compiler_options,
+                "files": self.summary()["files"],
+            }, f, indent=2, sort_keys=True)
+
+
+class _CoordinatorServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _WorkerHandler(socketserver.StreamRequestHandler):
+    """
+    Serves one worker connection until the worker is done or lost.
+    """
+
+    def handle(self):
+        coordinator = self.server.coordinator
+        self.request.settimeout(coordinator.worker_timeout)
+        worker = None
+        try:
+            hello = _receive(self.rfile)
+            if not hello or hello.get("type") != "hello":
+                return
+            worker = coordinator.register(hello.get("worker"))
+            _send(self.wfile, {"type": "welcome", "worker": worker, "options": coordinator.compiler_options})
+            while True:
+                message = _receive(self.rfile)
+                if message is None:
+                    break
+                if message.get("type") == "request":
+                    reply = coordinator.next_batch(worker)
+                elif message.get("type") == "result":
+                    reply = coordinator.record(worker, message)
+                else:
+                    break
+                _send(self.wfile, reply)
+                if reply["type"] == "done":
+                    break
+        except (OSError, ValueError):
+            pass  # Timed out, disconnected or garbled: the worker is lost
+        finally:
+            if worker is not None:
+                coordinator.unregister(worker)
+
+
+# -------------------------------------------------------
+# Workers
+# -------------------------------------------------------
+def run_worker(host, port, name=None):
+    """
+    Connects to a coordinator and compiles batches until there is no work left.
+
+    :param host: Host name or address of the coordinator.
+    :param port: Port of the coordinator.
+    :param name: Name reported to the coordinator. Defaults to '<hostname>:<pid>'.
+    :return: Number of files this worker compiled.
+    """
+    compiled = 0
+    try:
+        with socket.create_connection((host, port)) as connection, connection.makefile("rwb") as stream:
+            _send(stream, {"type": "hello", "worker": name or f"{socket.gethostname()}:{os.getpid()}"})
+            welcome = _receive(stream)
+            if welcome is None:
+                return compiled
+            compiler = PenguinBubbleCompiler(**welcome["options"])
+            skip = set()
+            while True:
+                _send(stream, {"type": "request"})
+                reply = _receive(stream)
+                if reply is None or reply["type"] == "done":
+                    return compiled
+                if reply["type"] == "wait":
+                    time.sleep(reply["seconds"])
+                    continue
+                for job in reply["jobs"]:
+                    if job["path"] in skip:
+                        continue
+                    _send(stream, compile_job(compiler, job, reply["return_output"]))
+                    compiled += 1
+                    ack = _receive(stream)
+                    if ack is None:
+                        return compiled
+                    skip.update(ack["skip"])
+    except OSError:
+        # The coordinator went away; it finished or will hand our files to other workers
+        return compiled
+
+
+def compile_job(compiler, job, return_output=False):
+    """
+    Compiles one file and checks that the generated Python compiles too.
+
+    :param compiler: The PenguinBubbleCompiler to use.
+    :param job: A dict with the "path" and "source" of the file.
+    :param return_output: Include the generated Python in the result.
+    :return: The "result" message for the coordinator.
+    """
+    start = time.perf_counter()
+    messages = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(messages):
+            compiled = compiler.compile(job["source"])
+        if compiled:
+            compile(compiled, job["path"], "exec")
+    except SyntaxError as e:
+        compiled = ""
+        messages.write(f"Syntax Error in the generated Python: {e}\n")
+    except Exception as e:
+        # A compiler bug must not take the worker (and its other files) down
+        compiled = ""
+        messages.write(f"Internal Error: {type(e).__name__}: {e}\n")
+
+    result = {
+        "type": "result",
+        "path": job["path"],
+        "ok": bool(compiled),
+        "messages": messages.getvalue().strip(),
+        "seconds": round(time.perf_counter() - start, 6),
+    }
+    if return_output and compiled:
+        result["output"] = compiled
+    return result
+
+
+def start_local_workers(host, port, processes):
+    """
+    Starts worker processes on this machine.
+
+    :return: The started multiprocessing.Process objects.
+    """
+    workers = []
+    for _ in range(processes):
+        process = multiprocessing.Process(target=run_worker, args=(host, port), daemon=True)
+        process.start()
+        workers.append(process)
+    return workers
+
+
+def _send(stream, message):
+    stream.write(json.dumps(message).encode("utf-8") + b"\n")
+    stream.flush()
+
+
+def _receive(stream):
+    """
+    Reads one message; returns None when the connection is closed.
+    """
+    line = stream.readline()
+    if not line:
+        return None
+    return json.loads(line)
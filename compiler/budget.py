@@ -0,0 +1,244 @@
+"""
+Purpose:
+Adds an execution budget to the token list, so a runaway loop or recursion stops with
+a clear error instead of hanging the program.
+
+Explanation:
+- The program may run at most 'limit' steps. A step is one iteration of a keepWalking
+  loop or one call of a recursive penguinDo function (one that calls itself, directly or
+  through other penguinDo functions).
+- keepWalking / recursive penguinDo -> The first statement of the body becomes
+      if _penguin_next(_penguin_steps) > <limit>: _penguin_budget_exceeded(<limit>, <line>, '<where>')
+  '_penguin_steps' is a shared range iterator and '_penguin_next' the builtin next, so
+  the common path is one C call and one comparison with a constant. Calling next() is
+  cheaper than calling the iterator's bound '__next__'.
+- A penguinDo whose own body holds such loops binds both to locals at function entry,
+  the way the local_aliases optimization binds builtins:
+      _penguin_local_next, _penguin_local_steps = _penguin_next, _penguin_steps
+  and its loops check 'if _penguin_local_next(_penguin_local_steps) > <limit>: ...'.
+- Leaf loops in a penguinDo (no nested keepWalking, no output or input, and no calls
+  except to pure builtins) cannot reach another check while they run, so they count
+  down a local int instead of calling next():
+      _penguin_local_left = _penguin_reserve(<limit>)
+      while ...:
+          _penguin_local_left = _penguin_local_left - 1 or _penguin_budget_exceeded(...)
+  and hand the steps they did not use back with '_penguin_release(<limit>, _penguin_local_left)'
+  after the loop and before every returnIce inside it. The count stays exact.
+- When the budget runs out, '_penguin_budget_exceeded' raises PenguinBudgetExceeded
+  (a RuntimeError) naming the .pg line 'index' of the loop or function.
+
+The pass runs after the optimization passes: tail calls turned into loops are guarded as
+loops, and inlined calls are not counted. Loops written as Python statements inside an
+iceBucket are not guarded.
+"""
+
+import ast
+
+from compiler.analysis import (
+    PURE_BUILTINS,
+    block_end,
+    enclosing_function,
+    function_locals,
+    function_scopes,
+    module_level_writes,
+    parse_token,
+    recursive_functions,
+)
+from compiler.tokens import TokenType
+
+# Global names of the counter and of next(), and the locals a function binds them to
+GLOBAL_COUNTER = ("_penguin_next", "_penguin_steps")
+LOCAL_COUNTER = ("_penguin_local_next", "_penguin_local_steps")
+
+# Local countdown of the steps a leaf loop may still take
+LOCAL_LEFT = "_penguin_local_left"
+
+# Tokens that may reach another budget check, or wait on the outside world, inside a loop
+NON_LEAF_TOKENS = (
+    TokenType.KEEP_WALKING,
+    TokenType.PENGUIN_DO,
+    TokenType.PENGUIN_SAY,
+    TokenType.PENGUIN_TAKE,
+    TokenType.PENGUIN_FLOCK,
+    TokenType.PENGUIN_BRING,
+)
+
+
+class StepBudget:
+    def __init__(self, limit):
+        """
+        :param limit: Number of loop iterations and recursive calls the program may run.
+        """
+        if limit < 1:
+            raise ValueError(f"The step budget must be at least 1, got {limit}.")
+        self.limit = limit
+        self.helpers = set()
+
+    def guard(self, tokens):
+        """
+        Adds the budget checks to a token list.
+
+        :param tokens: Validated (and optimized) tokens.
+        :return: A new token list with a check at the start of every guarded body.
+        """
+        self.helpers = {"_penguin_budget"}
+        recursive = self.recursive_functions(tokens)
+        scopes = function_scopes(tokens)
+        leaves = self.leaf_loops(tokens)
+
+        # Positions of the penguinDo functions whose own body holds a loop checked with next()
+        aliased = set()
+        for position, token in enumerate(tokens):
+            if (token["type"] == TokenType.KEEP_WALKING and position not in leaves
+                    and block_end(tokens, position) > position + 1):
+                scope = enclosing_function(scopes, position)
+                if scope is not None:
+                    aliased.add(scope.start)
+
+        # Where the leaf loops give their unused steps back
+        releases = {}
+        for position in leaves:
+            end = block_end(tokens, position)
+            releases.setdefault(end, []).append(self._release(tokens[position], tokens[position]["indent"]))
+            for inner in range(position + 1, end):
+                if tokens[inner]["type"] == TokenType.RETURN_ICE:
+                    releases.setdefault(inner, []).append(self._release(tokens[inner], tokens[inner]["indent"]))
+
+        guarded = []
+        for position, token in enumerate(tokens):
+            guarded.extend(releases.get(position, []))
+            if position in leaves:
+                guarded.append(self._reserve(token))
+            guarded.append(token)
+            if block_end(tokens, position) == position + 1:
+                continue
+            indent = tokens[position + 1]["indent"]
+            if token["type"] == TokenType.PENGUIN_DO and position in aliased:
+                guarded.append(self._alias(token, indent))
+            if position in leaves:
+                guarded.append(self._countdown(token, indent))
+                continue
+            if token["type"] == TokenType.KEEP_WALKING:
+                where = "keepWalking"
+                scope = enclosing_function(scopes, position)
+                counter = LOCAL_COUNTER if scope is not None else GLOBAL_COUNTER
+            elif token["type"] == TokenType.PENGUIN_DO and token["name"] in recursive:
+                where = f'penguinDo {token["name"]}'
+                counter = LOCAL_COUNTER if position in aliased else GLOBAL_COUNTER
+            else:
+                continue
+            guarded.append(self._check(token, where, indent, counter))
+        guarded.extend(releases.get(len(tokens), []))
+        return guarded
+
+    def leaf_loops(self, tokens):
+        """
+        Finds the keepWalking loops inside penguinDo functions that can count their steps
+        in a local: loops with a body that holds no other loop, no penguinDo, no output or
+        input, and no call except to a pure builtin the program does not rebind. While
+        such a loop runs, no other budget check can run.
+
+        :return: A set of positions of keepWalking tokens.
+        """
+        scopes = function_scopes(tokens)
+        user_functions = {info.name for info in scopes}
+        rebound = module_level_writes(tokens)
+        leaves = set()
+        for position, token in enumerate(tokens):
+            if token["type"] != TokenType.KEEP_WALKING:
+                continue
+            scope = enclosing_function(scopes, position)
+            end = block_end(tokens, position)
+            if scope is None or end == position + 1:
+                continue
+            callables = PURE_BUILTINS - user_functions - rebound - function_locals(scope, tokens)
+            if self._counts_locally(tokens[position:end], callables):
+                leaves.add(position)
+        return leaves
+
+    def _counts_locally(self, loop, callables):
+        """
+        Tells whether a loop (its header and body tokens) only calls 'callables'.
+        """
+        if any(token["type"] in NON_LEAF_TOKENS for token in loop[1:]):
+            return False
+        for token in loop:
+            nodes = parse_token(token)
+            if nodes is None:
+                return False
+            for node in (inner for root in nodes for inner in ast.walk(root)):
+                if isinstance(node, (ast.Lambda, ast.Yield, ast.YieldFrom, ast.Await)):
+                    return False
+                if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name) and node.func.id in callables):
+                    return False
+        return True
+
+    def recursive_functions(self, tokens):
+        """
+        Finds the penguinDo functions that can call themselves, directly or through
+        other penguinDo functions.
+
+        :return: A set of function names.
+        """
+        return recursive_functions(tokens)
+
+    def _alias(self, header, indent):
+        """
+        Builds the statement that binds the counter to locals at the entry of a penguinDo.
+        """
+        return {
+            "type": TokenType.ICE_BUCKET,
+            "value": f'{", ".join(LOCAL_COUNTER)} = {", ".join(GLOBAL_COUNTER)}',
+            "indent": indent,
+            "index": header["index"]
+        }
+
+    def _check(self, header, where, indent, counter=GLOBAL_COUNTER):
+        """
+        Builds the budget check for the body of a keepWalking or penguinDo token.
+
+        :param counter: The names of next() and of the counter (global or local).
+        """
+        line = header["index"]
+        return {
+            "type": TokenType.ICE_BUCKET,
+            "value": f"if {counter[0]}({counter[1]}) > {self.limit}: "
+                     f"_penguin_budget_exceeded({self.limit}, {line}, {where!r})",
+            "indent": indent,
+            "index": line
+        }
+
+    def _reserve(self, header):
+        """
+        Builds the statement in front of a leaf loop that takes the steps left in the budget.
+        """
+        return {
+            "type": TokenType.ICE_BUCKET,
+            "value": f"{LOCAL_LEFT} = _penguin_reserve({self.limit})",
+            "indent": header["indent"],
+            "index": header["index"]
+        }
+
+    def _countdown(self, header, indent):
+        """
+        Builds the budget check for the body of a leaf loop.
+        """
+        line = header["index"]
+        return {
+            "type": TokenType.ICE_BUCKET,
+            "value": f"{LOCAL_LEFT} = {LOCAL_LEFT} - 1 or "
+                     f"_penguin_budget_exceeded({self.limit}, {line}, 'keepWalking')",
+            "indent": indent,
+            "index": line
+        }
+
+    def _release(self, token, indent):
+        """
+        Builds the statement that gives the steps a leaf loop did not use back to the budget.
+        """
+        return {
+            "type": TokenType.ICE_BUCKET,
+            "value": f"_penguin_release({self.limit}, {LOCAL_LEFT})",
+            "indent": indent,
+            "index": token["index"]
+        }
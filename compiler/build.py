@@ -0,0 +1,306 @@
+"""
+Purpose:
+Builds multi-file PenguinBubble programs. Discovers the modules a program brings in with
+penguinBring, compiles independent modules in parallel in dependency order, and skips
+modules whose source and dependencies did not change since the previous build.
+
+Explanation:
+- Module resolution: 'penguinBring(shapes.circle)' refers to 'shapes/circle.pg' under the
+  root directory (by default the directory of the first entry file), the same place Python
+  looks for 'shapes.circle' when the compiled entry program runs. Every module compiles
+  to a .py file next to its .pg file.
+- wrap_main only applies to modules that no other module brings in. A wrapped module
+  binds its variables when it runs as the main program, so a module imported by
+  penguinBring keeps its top-level statements at module level, where its functions
+  find the variables they read.
+- Build keys: the key of a module hashes its source, its compiler options, and the keys
+  of the modules it brings in, so a change in any module below it triggers a rebuild.
+- Manifest: the keys of the last successful build of every module are stored as JSON
+  ('.penguin_build.json' in the root directory by default). A module is rebuilt when its
+  key differs from the manifest entry or its .py file is missing.
+- Scheduling: a module is handed to the worker pool as soon as every module it brings in
+  is built. When a module fails to compile, the modules that depend on it are not built.
+- Bringing in a module that does not exist, or modules that bring each other in,
+  raises BuildError before anything is compiled.
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from compiler.compiler import PenguinBubbleCompiler
+from compiler.tokenizer import Tokenizer
+from compiler.tokens import TokenType
+
+MANIFEST_NAME = ".penguin_build.json"
+MANIFEST_VERSION = 1
+
+
+class BuildError(Exception):
+    """
+    Raised when the module graph of a program cannot be built.
+    """
+
+
+class ModuleInfo:
+    """
+    A .pg module of the program together with the modules it brings in.
+    """
+
+    def __init__(self, name, source_path, source, dependencies):
+        self.name = name
+        self.source_path = source_path
+        self.output_path = os.path.splitext(source_path)[0] + ".py"
+        self.source_hash = hashlib.sha256(source.encode("utf-8")).hexdigest()
+        self.dependencies = dependencies    # module names, in penguinBring order
+        self.key = None                     # set by ProjectBuilder.compute_keys
+
+
+class ProjectBuilder:
+    def __init__(self, root, compiler_options=None, jobs=None, manifest_path=None):
+        """
+        :param root: Directory that module names are resolved against.
+        :param compiler_options: Keyword arguments for PenguinBubbleCompiler.
+        :param jobs: Worker processes used to compile modules. Defaults to the CPU count.
+        :param manifest_path: Location of the build manifest. Defaults to
+                              '.penguin_build.json' in the root directory.
+        """
+        self.root = os.path.abspath(root)
+        self.compiler_options = dict(compiler_options or {})
+        self.jobs = jobs or os.cpu_count() or 1
+        self.manifest_path = manifest_path or os.path.join(self.root, MANIFEST_NAME)
+        self.tokenizer = Tokenizer()
+
+    def discover(self, entry_files):
+        """
+        Reads the entry files and every module they bring in, directly or indirectly.
+
+        :param entry_files: Paths of the .pg files to build.
+        :return: A dict of module name -> ModuleInfo.
+        :raises BuildError: If an entry file lies outside the root or a module is missing.
+        """
+        modules = {}
+        pending = [(self._module_name(path), os.path.abspath(path), None) for path in entry_files]
+        while pending:
+            name, source_path, brought_from = pending.pop()
+            if name in modules:
+                continue
+            if not os.path.isfile(source_path):
+                if brought_from is None:
+                    raise BuildError(f"The source file '{source_path}' does not exist.")
+                raise BuildError(f"{brought_from}: module '{name}' not found (expected '{source_path}').")
+
+            with open(source_path, "r", encoding="utf-8") as f:
+                source = f.read()
+            dependencies = []
+            for token in self.tokenizer.tokenize(source):
+                if token["type"] == TokenType.PENGUIN_BRING and token["name"] not in dependencies:
+                    dependencies.append(token["name"])
+                    location = f'{source_path}, line {token["index"]}'
+                    pending.append((token["name"], self._module_path(token["name"]), location))
+            modules[name] = ModuleInfo(name, source_path, source, dependencies)
+        return modules
+
+    def build_order(self, modules):
+        """
+        Orders the modules so every module comes after the modules it brings in.
+
+        :raises BuildError: If modules bring each other in.
+        """
+        waiting = {name: set(info.dependencies) for name, info in modules.items()}
+        order = []
+        ready = sorted(name for name, deps in waiting.items() if not deps)
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            del waiting[name]
+            for other, deps in waiting.items():
+                if name in deps:
+                    deps.discard(name)
+                    if not deps:
+                        ready.append(other)
+        if waiting:
+            raise BuildError(f"Modules bring each other in: {', '.join(sorted(waiting))}.")
+        return order
+
+    def compute_keys(self, modules, order):
+        """
+        Sets the build key of every module (see the module docstring).
+        """
+        brought_in = self._brought_in(modules)
+        for name in order:
+            info = modules[name]
+            options = json.dumps(self._module_options(name, brought_in), sort_keys=True)
+            digest = hashlib.sha256()
+            digest.update(info.source_hash.encode("ascii"))
+            digest.update(options.encode("utf-8"))
+            for dependency in sorted(info.dependencies):
+                digest.update(f"{dependency}={modules[dependency].key}".encode("utf-8"))
+            info.key = digest.hexdigest()
+
+    def build(self, entry_files, force=False):
+        """
+        Builds the entry files and the modules they bring in.
+
+        :param entry_files: Paths of the .pg files to build.
+        :param force: Rebuild every module, ignoring the manifest.
+        :return: A dict with the module names that were "built", were "up_to_date",
+                 "failed" to compile, or were "blocked" by a failed dependency, and the
+                 compiler "errors" per failed module.
+        :raises BuildError: If the module graph is invalid.
+        """
+        modules = self.discover(entry_files)
+        order = self.build_order(modules)
+        self.compute_keys(modules, order)
+
+        manifest = self._load_manifest()
+        stale = [
+            name for name in order
+            if force
+            or manifest.get(name, {}).get("key") != modules[name].key
+            or not os.path.isfile(modules[name].output_path)
+        ]
+        result = {
+            "built": [],
+            "up_to_date": [name for name in order if name not in stale],
+            "failed": [],
+            "blocked": [],
+            "errors": {},
+        }
+
+        for name, ok, messages in self._compile_modules(modules, stale, result):
+            if ok:
+                result["built"].append(name)
+                info = modules[name]
+                manifest[name] = {
+                    "source": os.path.relpath(info.source_path, self.root),
+                    "output": os.path.relpath(info.output_path, self.root),
+                    "key": info.key,
+                    "dependencies": info.dependencies,
+                }
+            else:
+                result["failed"].append(name)
+                result["errors"][name] = messages
+                manifest.pop(name, None)
+
+        self._save_manifest(manifest)
+        return result
+
+    def _compile_modules(self, modules, stale, result):
+        """
+        Compiles the stale modules, starting each one once the stale modules it brings
+        in are built. Yields (name, ok, messages) per compiled module.
+        """
+        waiting = {name: {dep for dep in modules[name].dependencies if dep in stale} for name in stale}
+        brought_in = self._brought_in(modules)
+        jobs = {
+            name: (modules[name].source_path, modules[name].output_path, self._module_options(name, brought_in))
+            for name in stale
+        }
+
+        def take_ready():
+            ready = [name for name in stale if name in waiting and not waiting[name]]
+            for name in ready:
+                del waiting[name]
+            return ready
+
+        def finish(name, ok):
+            if not ok:
+                self._block_dependents(name, waiting, result["blocked"])
+            for deps in waiting.values():
+                deps.discard(name)
+
+        if self.jobs <= 1 or len(stale) <= 1:
+            ready = take_ready()
+            while ready:
+                for name in ready:
+                    ok, messages = _compile_module(jobs[name])
+                    finish(name, ok)
+                    yield name, ok, messages
+                ready = take_ready()
+            return
+
+        with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+            running = {pool.submit(_compile_module, jobs[name]): name for name in take_ready()}
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    ok, messages = future.result()
+                    finish(name, ok)
+                    yield name, ok, messages
+                for name in take_ready():
+                    running[pool.submit(_compile_module, jobs[name])] = name
+
+    def _brought_in(self, modules):
+        """
+        Returns the names of the modules that another module brings in.
+        """
+        return {dependency for info in modules.values() for dependency in info.dependencies}
+
+    def _module_options(self, name, brought_in):
+        """
+        Returns the compiler options of a module: the builder's options, without wrap_main
+        for modules that are brought in (see the module docstring).
+        """
+        if name in brought_in and self.compiler_options.get("wrap_main"):
+            return dict(self.compiler_options, wrap_main=False)
+        return self.compiler_options
+
+    def _block_dependents(self, failed, waiting, blocked):
+        """
+        Drops every waiting module that depends on a failed module, directly or indirectly.
+        """
+        for name in [name for name, deps in waiting.items() if failed in deps]:
+            if name in waiting:
+                del waiting[name]
+                blocked.append(name)
+                self._block_dependents(name, waiting, blocked)
+
+    def _module_name(self, path):
+        relative = os.path.relpath(os.path.abspath(path), self.root)
+        if relative.startswith(os.pardir):
+            raise BuildError(f"The source file '{path}' is outside the build root '{self.root}'.")
+        return os.path.splitext(relative)[0].replace(os.sep, ".")
+
+    def _module_path(self, name):
+        return os.path.join(self.root, *name.split(".")) + ".pg"
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get("version") != MANIFEST_VERSION:
+            return {}
+        return manifest.get("modules", {})
+
+    def _save_manifest(self, modules):
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "modules": modules}, f, indent=2, sort_keys=True)
+
+
+def _compile_module(job):
+    """
+    Worker entry point: compiles one .pg file and writes its .py file.
+
+    :param job: A (source path, output path, compiler options) tuple.
+    :return: (ok, messages printed by the compiler).
+    """
+    source_path, output_path, options = job
+    with open(source_path, "r", encoding="utf-8") as f:
+        code = f.read()
+
+    messages = io.StringIO()
+    with contextlib.redirect_stdout(messages):
+        compiled = PenguinBubbleCompiler(**options).compile(code)
+    if not compiled:
+        return False, messages.getvalue().strip()
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(compiled)
+    return True, messages.getvalue().strip()
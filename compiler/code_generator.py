@@ -4,7 +4,10 @@ Generates Python code from a list of tokens, handling syntax, structure, and ind
 
 Explanation:
 - penguinDo        -> Generates Python function definitions (def ...).
-- penguinSay       -> Translates to Python 'print(...)' statements.
+- penguinSay       -> Translates to Python 'print(...)' statements, or to the buffered
+                      '_penguin_say(...)' helper in buffered output mode. Arguments that
+                      concatenate string literals and str(...) calls become f-strings
+                      (see lower_say_concatenation).
 - penguinTake      -> Maps to 'dynamic_input(...)' for user input.
 - returnIce        -> Compiles to Python 'return ...' with custom operator replacements.
 - keepWalking      -> Converts to Python 'while <condition>:' loops.
@@ -12,138 +15,431 @@ Explanation:
 - penguinWhatAbout -> Maps to Python 'elif <condition>:'.
 - penguinElse      -> Converts to Python 'else:' blocks.
 - breakIce         -> Produces Python 'break'.
+- continueWalking  -> Produces Python 'continue' (only emitted by optimization passes).
+- penguinFlock     -> Creates a flock (list) with 'penguin_flock(...)'; the custom arithmetic
+                      operators work element-wise on flocks.
+- penguinBring     -> Imports the functions and variables of another compiled .pg module
+                      ('from <module> import *').
 - slideUp, slideDown, penguinBoost, givePenguins, snowball -> Custom arithmetic operations.
 
+Each token type is translated by an emitter looked up in the 'emitters' registry, a
+dictionary built once per class, so dispatch costs the same for any number of token types.
+register_emitter adds emitters for new token types or replaces existing ones.
+
 Additional Functionality:
 Handles custom operators (e.g., slideUp, snowball) by replacing them with equivalent Python operators.
+Records the runtime helpers the generated lines rely on in 'helpers': the ones the
+translated statements call, and any helper named in an expression (HELPER_REFERENCES).
+
+Translation Cache:
+Generated and templated programs repeat the same statements many times. Each token is
+translated once per distinct content: a bounded LRU cache maps the fields of a token
+(everything but its line 'index', so including its indent) to the translated lines and the
+helpers they use. The cache lives as long as the CodeGenerator, so it also serves later
+compile_tokens calls (REPL entries, batch workers). cache_info() reports hits and misses.
 """
 
+import ast
+import functools
+
 from compiler.tokens import TokenType
 
+# Flock built-ins callable from .pg expressions; they live in the penguin_flock runtime helper
+FLOCK_BUILTINS = ("flockSum", "flockMin", "flockMax")
+
+# Runtime helpers that expressions and iceBucket statements may call by name
+HELPER_REFERENCES = {
+    "dynamic_input": ("dynamic_input",),
+    "penguin_flock": ("penguin_flock",) + FLOCK_BUILTINS,
+}
+
+# Prefix of penguinSay/penguinTake calls, by the "await" field of the token (async target)
+AWAIT_PREFIX = {False: "", True: "await "}
+
+# Python keyword of each block header token
+BLOCK_KEYWORDS = {
+    TokenType.KEEP_WALKING: "while",
+    TokenType.PENGUIN_IF: "if",
+    TokenType.PENGUIN_WHAT_ABOUT: "elif",
+    TokenType.PENGUIN_ELSE: "else :",
+}
+
+# Custom operators and the Python operators they compile to
+CUSTOM_OPERATORS = {
+    "slideUp": "+",
+    "slideDown": "-",
+    "penguinBoost": "*",
+    "givePenguins": "/",
+    "snowball": "**"
+}
+
+
+def lower_say_concatenation(value):
+    """
+    Rewrites the penguinSay arguments that concatenate string literals and str(...) calls
+    into f-strings, which build the text in one step instead of one '+' at a time:
+    '"Result: " + str(result)' becomes "f'Result: {result!s}'". The '!s' conversion calls
+    str() exactly like the original, so the output is the same.
+
+    :param value: The text of a penguinSay value (its print arguments).
+    :return: The rewritten arguments, or 'value' itself when nothing can be lowered.
+    """
+    if "+" not in value or "str(" not in value:
+        return value
+    try:
+        call = ast.parse(f"_({value})", mode="eval").body
+    except SyntaxError:
+        return value
+
+    lowered_any = False
+    for position, argument in enumerate(call.args):
+        joined = _concatenation_to_fstring(argument)
+        if joined is not None:
+            call.args[position] = joined
+            lowered_any = True
+    if not lowered_any:
+        return value
+
+    lowered = ast.unparse(call)[len("_("):-len(")")]
+    # Keep the original when the f-string does not read back as the same tree
+    try:
+        if ast.dump(ast.parse(f"_({lowered})", mode="eval").body) != ast.dump(call):
+            return value
+    except SyntaxError:
+        return value
+    return lowered
+
+
+def _concatenation_to_fstring(node):
+    """
+    Turns a '+' chain of string literals and str(<expression>) calls with at least one call
+    into an ast.JoinedStr, or returns None.
+    """
+    operands = []
+    while isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        operands.append(node.right)
+        node = node.left
+    operands.append(node)
+    if len(operands) < 2:
+        return None
+
+    parts = []
+    for operand in reversed(operands):
+        if isinstance(operand, ast.Constant) and isinstance(operand.value, str):
+            if parts and isinstance(parts[-1], ast.Constant):
+                parts[-1] = ast.Constant(value=parts[-1].value + operand.value)
+            elif operand.value:
+                parts.append(ast.Constant(value=operand.value))
+        elif (isinstance(operand, ast.Call) and isinstance(operand.func, ast.Name)
+              and operand.func.id == "str" and len(operand.args) == 1 and not operand.keywords
+              and not isinstance(operand.args[0], ast.Starred)):
+            parts.append(ast.FormattedValue(value=operand.args[0], conversion=ord("s"), format_spec=None))
+        else:
+            return None
+    if not any(isinstance(part, ast.FormattedValue) for part in parts):
+        return None
+    return ast.JoinedStr(values=parts)
+
+
+def binds_name(tokens, name):
+    """
+    Tells whether a program might bind 'name' itself (as a variable, function, parameter
+    or import), so the builtin of that name cannot be relied on. Statements that cannot
+    be parsed, and penguinBring star imports, count as binding it.
+    """
+    for token in tokens:
+        ttype = token["type"]
+        if ttype == TokenType.PENGUIN_BRING:
+            return True
+        if ttype == TokenType.PENGUIN_DO:
+            if token.get("name") == name or name in token.get("params", ""):
+                return True
+        elif ttype in (TokenType.PENGUIN_TAKE, TokenType.PENGUIN_FLOCK):
+            if token.get("name") == name:
+                return True
+        elif ttype == TokenType.ICE_BUCKET or "target" in token:
+            text = token.get("value", "") if ttype == TokenType.ICE_BUCKET else token["target"]
+            if name not in text:
+                continue
+            try:
+                tree = ast.parse(text)
+            except SyntaxError:
+                return True
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Name) and node.id == name and not isinstance(node.ctx, ast.Load):
+                    return True
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and node.name == name:
+                    return True
+                if isinstance(node, ast.arg) and node.arg == name:
+                    return True
+                if isinstance(node, ast.alias) and (node.asname or node.name) == name:
+                    return True
+                if isinstance(node, (ast.Global, ast.Nonlocal)) and name in node.names:
+                    return True
+    return False
+
+
 class CodeGenerator:
-    def __init__(self):
+    def __init__(self, buffered_output=False, cache_size=4096):
+        """
+        :param buffered_output: Collect penguinSay output in a buffer that is written in large
+                                chunks, before every penguinTake prompt, and at exit.
+        :param cache_size: Most distinct statements kept in the translation cache; 0 disables it.
+        """
         # Tracks current indentation level and defines indentation as four spaces
         self.indentation_level = 0
         self.indentation_str = "    "
+        self.buffered_output = buffered_output
+        # Runtime helpers used by the most recently compiled tokens
+        self.helpers = set()
+        # Whether penguinSay concatenations may be lowered (the program does not bind str)
+        self.lower_say = True
+        # The emitters registered when the generator was created, by token type
+        self.emitters = dict(type(self).emitters)
+        self._translate = functools.lru_cache(maxsize=cache_size)(self._translate_token)
+
+    def cache_info(self):
+        """
+        Returns the translation cache statistics: hits, misses, maxsize and currsize
+        (see functools.lru_cache), plus 'hit_rate', the share of cached translations.
+        """
+        info = self._translate.cache_info()._asdict()
+        lookups = info["hits"] + info["misses"]
+        info["hit_rate"] = info["hits"] / lookups if lookups else 0.0
+        return info
+
+    def clear_cache(self):
+        """
+        Empties the translation cache and resets its statistics.
+        """
+        self._translate.cache_clear()
 
-    def compile_tokens(self, tokens):
+    def compile_tokens(self, tokens, bound_names=()):
         """
         Compiles a list of tokens into Python code.
         Returns a list of strings where each string represents a line of Python code.
+
+        :param bound_names: Names already bound where the code will run (by earlier REPL
+                            entries, for example), besides the ones the tokens bind.
         """
         compiled_code = []
+        self.helpers = set()
+        # penguinSay concatenations rely on the builtin str
+        lower_say = "str" not in bound_names and not binds_name(tokens, "str")
 
         for token in tokens:
-            ttype = token["type"]
-
-            # -------------------------------------------
-            # 1) Function Definition (penguinDo -> def)
-            # Example: def function_name(params):
-            # -------------------------------------------
-            if ttype == TokenType.PENGUIN_DO:
-                line = f'def {token["name"]}({token["params"]}):'
-                compiled_code.append((token["indent"] * " ") + line)
-
-            # -------------------------------------------
-            # 2) Print Statements (penguinSay -> print)
-            # Example: print("Hello World")
-            # -------------------------------------------
-            elif ttype == TokenType.PENGUIN_SAY:
-                line = f'print({token["value"]})'
-                compiled_code.append((token["indent"] * " ") + line)
-
-            # -------------------------------------------
-            # 3) Input Handling (penguinTake -> dynamic_input)
-            # Example: variable = dynamic_input("Enter value:")
-            # -------------------------------------------
-            elif ttype == TokenType.PENGUIN_TAKE:
-                line = f'{token["name"]} = dynamic_input({token["prompt"]})'
-                compiled_code.append((token["indent"] * " ") + line)
-
-            # -------------------------------------------
-            # 4) Return Statements (returnIce -> return)
-            # Example: return x + y
-            # -------------------------------------------
-            elif ttype == TokenType.RETURN_ICE:
-                expression = self._replace_custom_ops(token["value"])
-                line = f'return {expression}'
-                compiled_code.append((token["indent"] * " ") + line)
-
-            # -------------------------------------------
-            # 5) Break Statements (breakIce -> break)
-            # Example: break
-            # -------------------------------------------
-            elif ttype == TokenType.BREAKICE:
-                compiled_code.append((token["indent"] * " ") + "break")
-
-            # -------------------------------------------
-            # 6) Variable Assignment (iceBucket)
-            # Example: variable = value
-            # -------------------------------------------
-            elif ttype == TokenType.ICE_BUCKET:
-                expression = self._replace_custom_ops(token["value"])
-                line = expression
-                compiled_code.append((token["indent"] * " ") + line)
-
-            # -------------------------------------------
-            # 7) Control Structures (while/if/elif/else)
-            # - keepWalking -> while <condition>:
-            # - penguinIf   -> if <condition>:
-            # - penguinWhatAbout -> elif <condition>:
-            # - penguinElse -> else:
-            # -------------------------------------------
-            elif ttype in [TokenType.KEEP_WALKING, TokenType.PENGUIN_IF, TokenType.PENGUIN_WHAT_ABOUT, TokenType.PENGUIN_ELSE]:
-                keyword_map = {
-                    TokenType.KEEP_WALKING: "while",
-                    TokenType.PENGUIN_IF: "if",
-                    TokenType.PENGUIN_WHAT_ABOUT: "elif",
-                    TokenType.PENGUIN_ELSE: "else :"
-                }
-                keyword = keyword_map[ttype]
-                condition = token.get("condition", "").strip()
-                header_line = f'{keyword} {condition}:'.rstrip(":")
-                if ttype != TokenType.PENGUIN_ELSE:
-                    header_line += ":"
-                compiled_code.append((token["indent"] * " ") + header_line)
-
-            # -------------------------------------------
-            # 8) Arithmetic Operations
-            # Custom operators replaced with Python equivalents.
-            # Example: result = num1 + num2
-            # -------------------------------------------
-            elif ttype in [
-                TokenType.SLIDE_UP,
-                TokenType.SLIDE_DOWN,
-                TokenType.PENGUIN_BOOST,
-                TokenType.GIVE_PENGUINS,
-                TokenType.SNOWBALL
-            ]:
-                expression = self._replace_custom_ops(token["expression"])
-                line = f'{token["target"]} = {expression}'
-                compiled_code.append((token["indent"] * " ") + line)
-
-            # -------------------------------------------
-            # 9) Ignore Unrecognized Tokens
-            # -------------------------------------------
-            else:
-                pass  # Unhandled tokens are ignored
+            # The cache key is every field of the token except its line number
+            key = tuple(
+                (field, tuple(value) if type(value) is list else value)
+                for field, value in token.items() if field != "index"
+            )
+            try:
+                lines, helpers = self._translate(key, lower_say)
+            except TypeError:
+                # A field holding a value that cannot be hashed is translated without the cache
+                lines, helpers = self._translate_token(key, lower_say)
+            compiled_code.extend(lines)
+            self.helpers |= helpers
 
         return compiled_code
 
+    def _translate_token(self, key, lower_say):
+        """
+        Translates one token, given as the (field, value) pairs of its cache key, with the
+        emitter registered for its type. Tokens without an emitter produce no lines.
+
+        :param lower_say: Whether penguinSay concatenations may become f-strings (part of
+                          the cache key; emitters read it from 'self.lower_say').
+        :return: (tuple of Python lines, frozenset of the runtime helpers they use).
+        """
+        token = dict(key)
+        helpers = set()
+        lines = ()
+        emitter = self.emitters.get(token["type"])
+        if emitter is not None:
+            self.lower_say = lower_say
+            prefix = token["indent"] * " "
+            lines = tuple(prefix + line for line in emitter(self, token, helpers))
+
+        # Helpers such as flockSum may be called in any expression
+        for helper, names in HELPER_REFERENCES.items():
+            if helper not in helpers and self._references(token, names):
+                helpers.add(helper)
+
+        return lines, frozenset(helpers)
+
+    # -------------------------------------------
+    # Emitters
+    # Each returns the Python lines of one token, without its indentation, and adds
+    # the runtime helpers those lines call to 'helpers'.
+    # -------------------------------------------
+
+    def _emit_function(self, token, helpers):
+        """
+        penguinDo -> def function_name(params):
+        Decorators added by optimization passes come first.
+        The async target marks coroutines with an "async" field (async def).
+        """
+        lines = [f'@{decorator}' for decorator in token.get("decorators", ())]
+        keyword = "async def" if token.get("async") else "def"
+        lines.append(f'{keyword} {token["name"]}({token["params"]}):')
+        return lines
+
+    def _emit_say(self, token, helpers):
+        """
+        penguinSay -> print("Hello World")
+        Buffered mode: _penguin_say("Hello World")
+        "Total: " + str(total) is printed as f'Total: {total!s}'
+        A "function" field (a local alias set by optimization) replaces print
+        An "await" field (async target) awaits the call
+        """
+        value = lower_say_concatenation(token["value"]) if self.lower_say else token["value"]
+        if self.buffered_output:
+            helpers.add("_penguin_say")
+        function = token.get("function", "_penguin_say" if self.buffered_output else "print")
+        return [f'{AWAIT_PREFIX[bool(token.get("await"))]}{function}({value})']
+
+    def _emit_take(self, token, helpers):
+        """
+        penguinTake -> variable = dynamic_input("Enter value:")
+        Buffered mode flushes pending output before the prompt.
+        """
+        lines = []
+        if self.buffered_output:
+            lines.append("_penguin_flush()")
+            helpers.add("_penguin_say")
+        if not token.get("await"):
+            helpers.add("dynamic_input")
+        function = token.get("function", "dynamic_input")
+        lines.append(f'{token["name"]} = {AWAIT_PREFIX[bool(token.get("await"))]}{function}({token["prompt"]})')
+        return lines
+
+    def _emit_return(self, token, helpers):
+        """
+        returnIce -> return x + y
+        """
+        return [f'return {self._replace_custom_ops(token["value"])}']
+
+    def _emit_break(self, token, helpers):
+        """
+        breakIce -> break
+        """
+        return ["break"]
+
+    def _emit_continue(self, token, helpers):
+        """
+        continueWalking -> continue
+        Only produced by optimization passes (e.g. tail-call elimination).
+        """
+        return ["continue"]
+
+    def _emit_ice_bucket(self, token, helpers):
+        """
+        iceBucket -> variable = value (any Python statement)
+        """
+        return [self._replace_custom_ops(token["value"])]
+
+    def _emit_flock(self, token, helpers):
+        """
+        penguinFlock -> scores = penguin_flock([3, 5, 8])
+        """
+        helpers.add("penguin_flock")
+        return [f'{token["name"]} = penguin_flock({self._replace_custom_ops(token["value"])})']
+
+    def _emit_bring(self, token, helpers):
+        """
+        penguinBring -> from geometry import *
+        """
+        return [f'from {token["name"]} import *']
+
+    def _emit_block_header(self, token, helpers):
+        """
+        keepWalking -> while <condition>:
+        penguinIf -> if <condition>:
+        penguinWhatAbout -> elif <condition>:
+        penguinElse -> else:
+        """
+        keyword = BLOCK_KEYWORDS[token["type"]]
+        condition = token.get("condition", "").strip()
+        header_line = f'{keyword} {condition}:'.rstrip(":")
+        if token["type"] != TokenType.PENGUIN_ELSE:
+            header_line += ":"
+        return [header_line]
+
+    def _emit_arithmetic(self, token, helpers):
+        """
+        slideUp, slideDown, penguinBoost, givePenguins, snowball -> result = num1 + num2
+        Custom operators replaced with Python equivalents.
+        """
+        return [f'{token["target"]} = {self._replace_custom_ops(token["expression"])}']
+
+    # Token type -> emitter, built once (see register_emitter)
+    emitters = {
+        TokenType.PENGUIN_DO: _emit_function,
+        TokenType.PENGUIN_SAY: _emit_say,
+        TokenType.PENGUIN_TAKE: _emit_take,
+        TokenType.RETURN_ICE: _emit_return,
+        TokenType.BREAKICE: _emit_break,
+        TokenType.CONTINUE_WALKING: _emit_continue,
+        TokenType.ICE_BUCKET: _emit_ice_bucket,
+        TokenType.PENGUIN_FLOCK: _emit_flock,
+        TokenType.PENGUIN_BRING: _emit_bring,
+        TokenType.KEEP_WALKING: _emit_block_header,
+        TokenType.PENGUIN_IF: _emit_block_header,
+        TokenType.PENGUIN_WHAT_ABOUT: _emit_block_header,
+        TokenType.PENGUIN_ELSE: _emit_block_header,
+        TokenType.SLIDE_UP: _emit_arithmetic,
+        TokenType.SLIDE_DOWN: _emit_arithmetic,
+        TokenType.PENGUIN_BOOST: _emit_arithmetic,
+        TokenType.GIVE_PENGUINS: _emit_arithmetic,
+        TokenType.SNOWBALL: _emit_arithmetic,
+    }
+
+    @classmethod
+    def register_emitter(cls, token_type, emitter=None):
+        """
+        Registers the emitter of a token type, adding a new statement or replacing the
+        translation of an existing one. Can be used as a decorator:
+
+            @CodeGenerator.register_emitter("penguinDance")
+            def emit_dance(generator, token, helpers):
+                return [f'print("dancing", {token["value"]})']
+
+        An emitter is called as emitter(generator, token, helpers) and returns the Python
+        lines of the token without indentation; it adds the names of the runtime helpers
+        those lines call to the 'helpers' set. Registering on a subclass leaves the
+        CodeGenerator itself unchanged. Generators created before the registration keep
+        the emitters they started with.
+
+        :param token_type: The "type" of the tokens the emitter translates.
+        :param emitter: The emitter; omit it to use register_emitter as a decorator.
+        :return: The emitter.
+        """
+        if emitter is None:
+            return lambda function: cls.register_emitter(token_type, function)
+        if "emitters" not in cls.__dict__:
+            cls.emitters = dict(cls.emitters)
+        cls.emitters[token_type] = emitter
+        return emitter
+
+    def _references(self, token, names):
+        """
+        Checks whether any text field of the token mentions one of the names. A plain text
+        search may find a name that is not a call, which only keeps a helper that was
+        not needed; it never misses one.
+        """
+        for field in ("value", "condition", "expression", "prompt", "params"):
+            text = token.get(field)
+            if text and any(name in text for name in names):
+                return True
+        return False
+
     def _replace_custom_ops(self, expression):
         """
         Replaces custom operators (slideUp, slideDown, penguinBoost, givePenguins, snowball)
         in the expression string with their equivalent Python operators (+, -, *, /, **).
         """
-        replacements = {
-            "slideUp": "+",
-            "slideDown": "-",
-            "penguinBoost": "*",
-            "givePenguins": "/",
-            "snowball": "**"
-        }
-
-        for custom_op, py_op in replacements.items():
+        for custom_op, py_op in CUSTOM_OPERATORS.items():
             expression = expression.replace(custom_op, py_op)
 
         return expression
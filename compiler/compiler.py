@@ -7,35 +7,253 @@ transforming .pg source code into Python code.
 Explanation:
 1. The Tokenizer converts the raw .pg source code into a structured list of tokens.
 2. The Parser validates the tokens to ensure syntax correctness.
-3. The CodeGenerator translates the validated tokens into equivalent Python code.
-4. The compiler injects a 'dynamic_input' function at the top of the generated Python code
-   to handle user input dynamically with appropriate type conversion.
+3. The Optimizer applies the optimization passes enabled through the constructor options.
+   With a step budget, StepBudget then adds budget checks to loops and recursive functions,
+   and in instrumented mode the Instrumenter adds per-function and per-loop counters.
+   With wrap_main, the MainWrapper then moves the top-level statements into a function.
+   The Outliner moves blocks nested deeper than outline_depth into helper functions, and
+   with target="async", the AsyncTarget finally turns the program into a coroutine.
+4. The CodeGenerator translates the validated tokens into equivalent Python code.
+5. The compiler injects the runtime helpers the program uses at the top of the generated
+   Python code: the ones the optimization passes request and the ones the generated code
+   calls ('dynamic_input' only for programs with a penguinTake, for example). Helpers
+   nothing refers to are left out.
+
+Profile-guided optimization (compiler.pgo) takes two builds. With pgo_collect, the program
+is instrumented with branch counters as well, and its profile records a digest of the
+source. With pgo_profile, the Optimizer orders branches and picks the functions to inline
+and memoize from that profile, as long as the digest matches the source being compiled.
+
+With minimal_output, compile() leaves out the blank lines between helpers and statements,
+so generated modules are as small as possible.
+
+With backend="ast", step 4 uses the AstGenerator instead: it builds an 'ast.Module' straight
+from the tokens. compile_to_code() hands that module to Python's compile() without any
+generated source text, and compile() only calls ast.unparse when Python source is requested.
 """
 
-from compiler.tokenizer import Tokenizer
+import ast
+
+from compiler.tokenizer import PARALLEL_MIN_SIZE, Tokenizer
 from compiler.parser import Parser
+from compiler.optimizer import Optimizer
+from compiler.budget import StepBudget
+from compiler.instrument import Instrumenter
+from compiler.pgo import Profile, source_digest
+from compiler.main_wrapper import MainWrapper
+from compiler.outline import Outliner
+from compiler.async_target import AsyncTarget
 from compiler.code_generator import CodeGenerator
+from compiler.ast_backend import AstGenerator
+from compiler.runtime import render_helpers
 
 class PenguinBubbleCompiler:
-    def __init__(self):
-        # Initialize the Tokenizer, Parser, and CodeGenerator components
+    def __init__(self, tail_calls=True, inline=False, inline_threshold=10,
+                 memoize=False, memo_cache_size=1024, memo_stats=False, buffered_output=False,
+                 backend="source", tokenize_workers=1, parallel_threshold=PARALLEL_MIN_SIZE,
+                 instrument=False, profile_path=None, hoist_invariants=False, step_budget=None,
+                 wrap_main=False, local_aliases=False, alias_threshold=3, minimal_output=False,
+                 pgo_collect=False, pgo_profile=None, pgo_hot_calls=1000, translation_cache_size=4096,
+                 target="script", yield_every=1000, outline_depth=16, strength_reduction=False):
+        """
+        :param tail_calls: Rewrite self tail calls in penguinDo functions into loops.
+        :param inline: Inline calls to small, non-recursive, single-returnIce functions.
+        :param inline_threshold: Largest returned expression (in expression nodes) that gets inlined.
+        :param memoize: Wrap pure penguinDo functions in a bounded memoization cache.
+        :param memo_cache_size: Maximum number of cached results per memoized function.
+        :param memo_stats: Print memoization cache statistics to stderr when the program exits.
+        :param buffered_output: Buffer penguinSay output and write it in large chunks, flushing
+                                before every penguinTake prompt and at exit.
+        :param backend: "source" generates Python text with the CodeGenerator, "ast" builds
+                        Python 'ast' nodes with the AstGenerator.
+        :param tokenize_workers: Worker processes used to tokenize large sources.
+        :param parallel_threshold: Source size, in characters, from which tokenization runs
+                                   in parallel (only when tokenize_workers > 1 and the
+                                   machine has more than one CPU).
+        :param hoist_invariants: Move loop-invariant assignments and subexpressions out of
+                                 keepWalking loops.
+        :param local_aliases: Bind the builtins and functions that penguinDo loops call to
+                              local aliases at function entry.
+        :param alias_threshold: Fewest statements inside the loops of a function for it to
+                                get local aliases.
+        :param instrument: Count calls, time and loop iterations per .pg line and report
+                           them when the compiled program exits.
+        :param profile_path: File the instrumented program writes its JSON profile to.
+        :param step_budget: Number of loop iterations and recursive penguinDo calls the compiled
+                            program may run before it raises PenguinBudgetExceeded. None
+                            (the default) adds no checks.
+        :param wrap_main: Run the top-level statements inside a generated '_penguin_main()'
+                          function, so the variables of the main program are fast locals.
+        :param minimal_output: Leave blank lines out of the Python source returned by compile().
+        :param pgo_collect: Build the training program of profile-guided optimization: the
+                            instrumented program, also counting branches. Turns off inline
+                            and memoize, so the profile describes the original functions.
+        :param pgo_profile: Profile (or path of the JSON profile) written by a pgo_collect
+                            build of the same source; guides inlining, memoization and the
+                            order of penguinIf/penguinWhatAbout branches.
+        :param pgo_hot_calls: Fewest profiled calls for a function to be inlined or memoized.
+        :param translation_cache_size: Most distinct statements the CodeGenerator keeps translated
+                                       (see CodeGenerator.cache_info); 0 disables the cache.
+        :param target: "script" generates a regular program. "async" generates a program whose
+                       main part is the coroutine '_penguin_main' (see compiler.async_target),
+                       which penguinSay/penguinTake I/O is awaited in and which many sessions
+                       can run in one event loop. The async target turns off memoize,
+                       local_aliases, buffered_output and wrap_main.
+        :param yield_every: Async target only: loop iterations and recursive calls between two
+                            turns given to the other coroutines of the event loop.
+        :param outline_depth: Deepest block nesting kept in place; deeper blocks are moved into
+                              generated helper functions (see compiler.outline), so the
+                              generated Python stays within the nesting limits of Python.
+                              None leaves every block in place.
+        :param strength_reduction: Replace small int powers ('n ** 2' -> 'n * n') and divisions
+                                   by a power of two ('x / 4.0' -> 'x * 0.25') with cheaper
+                                   arithmetic wherever the result is exactly the same.
+        :raises OSError: If the pgo_profile file cannot be read.
+        :raises ValueError: If the backend or target is unknown, pgo_profile is not a valid
+                            profile, or the async target is combined with instrumentation.
+        """
+        if backend not in ("source", "ast"):
+            raise ValueError(f"Unknown backend '{backend}'. Expected 'source' or 'ast'.")
+        if target not in ("script", "async"):
+            raise ValueError(f"Unknown target '{target}'. Expected 'script' or 'async'.")
+        if target == "async":
+            if instrument or pgo_collect:
+                raise ValueError("The async target cannot be instrumented.")
+            # Memoized coroutines and aliased calls could not be awaited correctly
+            memoize = local_aliases = buffered_output = wrap_main = False
+        if pgo_collect:
+            instrument = True
+            inline = memoize = False
+        if isinstance(pgo_profile, str):
+            pgo_profile = Profile.load(pgo_profile)
+
+        # Initialize the Tokenizer, Parser, Optimizer, and CodeGenerator components
         self.tokenizer = Tokenizer()
         self.parser = Parser()
-        self.code_generator = CodeGenerator()
+        self.optimizer = Optimizer(
+            tail_calls=tail_calls,
+            inline=inline,
+            inline_threshold=inline_threshold,
+            memoize=memoize,
+            memo_cache_size=memo_cache_size,
+            memo_stats=memo_stats,
+            hoist_invariants=hoist_invariants,
+            strength_reduction=strength_reduction,
+            local_aliases=local_aliases,
+            alias_threshold=alias_threshold,
+            buffered_output=buffered_output,
+            hot_calls=pgo_hot_calls
+        )
+        self.budget = None if step_budget is None else StepBudget(step_budget)
+        self.instrumenter = Instrumenter(profile_path=profile_path, branches=pgo_collect)
+        self.instrument = instrument
+        self.pgo_collect = pgo_collect
+        self.pgo_profile = pgo_profile
+        self.main_wrapper = MainWrapper() if wrap_main else None
+        self.outliner = None if outline_depth is None else Outliner(outline_depth)
+        self.async_target = AsyncTarget(yield_every) if target == "async" else None
+        self.code_generator = CodeGenerator(buffered_output=buffered_output,
+                                            cache_size=translation_cache_size)
+        self.ast_generator = AstGenerator(buffered_output=buffered_output)
+        self.backend = backend
+        self.tokenize_workers = tokenize_workers
+        self.parallel_threshold = parallel_threshold
+        self.minimal_output = minimal_output
+        # Runtime helpers the most recently compiled program relies on
+        self.helpers = set()
 
-    def compile(self, code):
+    def compile(self, code, skip_helpers=(), bound_names=()):
         """
         Orchestrates the compilation process from .pg code to Python code.
 
         :param code: The raw .pg source code.
+        :param skip_helpers: Runtime helpers that are already defined where the code will run
+                             (the REPL namespace, for example) and must not be injected again.
+        :param bound_names: Names already bound where the code will run (the REPL namespace,
+                            for example); the program cannot rely on builtins of those names.
         :return: The compiled Python code as a string.
         """
+        tokens = self._prepare_tokens(code)
+        if tokens is None:
+            return ""
+
+        # With the ast backend, Python source is only produced here, on request
+        if self.backend == "ast":
+            module = self._build_module(tokens, skip_helpers, bound_names)
+            if module is None:
+                return ""
+            source = ast.unparse(module)
+            # Blank lines may only be dropped when no string literal spans several lines
+            if self.minimal_output and "'''" not in source and '"""' not in source:
+                source = "\n".join(line for line in source.split("\n") if line)
+            return source
+
+        # -------------------------------------------------------
+        # Step 4: Prepare the compiled Python code
+        # Initialize a list to hold all lines of the final Python code
+        # -------------------------------------------------------
+        compiled_code = []
+
+        # -------------------------------------------------------
+        # Step 5: Generate Python code from validated tokens
+        # Translate tokens into equivalent Python statements
+        # -------------------------------------------------------
+        program_code = self.code_generator.compile_tokens(tokens, bound_names)
+
+        # -------------------------------------------------------
+        # Step 6: Inject the runtime helpers
+        # Only the helpers requested by the optimization passes and the ones the
+        # generated code calls are added at the top of the Python code; dynamic_input,
+        # for example, is only needed by programs with a penguinTake.
+        # -------------------------------------------------------
+        self.helpers = self._pass_helpers() | self.code_generator.helpers
+        compiled_code.extend(render_helpers(self.helpers - set(skip_helpers),
+                                            blank_lines=not self.minimal_output))
+        compiled_code.extend(program_code)
+
+        # Return the final Python code as a single string
+        return '\n'.join(compiled_code)
+
+    def compile_to_code(self, code, filename="<penguin>", skip_helpers=(), bound_names=()):
+        """
+        Compiles .pg code into a Python code object that can be passed to exec().
+        With the ast backend no Python source text is generated or parsed along the way.
+
+        :param code: The raw .pg source code.
+        :param filename: File name recorded in the code object (shown in tracebacks).
+        :param skip_helpers: Runtime helpers that must not be injected (see compile).
+        :param bound_names: Names already bound where the code will run (see compile).
+        :return: A code object, or None if the program has a syntax error.
+        """
+        if self.backend == "source":
+            compiled = self.compile(code, skip_helpers, bound_names)
+            return compile(compiled, filename, "exec") if compiled else None
+
+        tokens = self._prepare_tokens(code)
+        if tokens is None:
+            return None
+        module = self._build_module(tokens, skip_helpers, bound_names)
+        if module is None:
+            return None
+        return compile(module, filename, "exec")
+
+    def _prepare_tokens(self, code):
+        """
+        Runs the front end shared by both backends: tokenize, validate and optimize.
+
+        :return: The optimized tokens, or None if the program has a syntax error.
+        """
 
         # -------------------------------------------------------
         # Step 1: Tokenize the source code
-        # Converts the raw .pg source code into a list of tokens
+        # Converts the raw .pg source code into a list of tokens.
+        # Sources above the parallel threshold are tokenized in worker processes
+        # (on machines with more than one CPU).
         # -------------------------------------------------------
-        tokens = self.tokenizer.tokenize(code)
+        if self.tokenize_workers > 1:
+            tokens = self.tokenizer.tokenize_parallel(code, self.tokenize_workers, min_size=self.parallel_threshold)
+        else:
+            tokens = self.tokenizer.tokenize(code)
 
         # -------------------------------------------------------
         # Step 2: Parse the tokens to validate their syntax
@@ -44,42 +262,89 @@ class PenguinBubbleCompiler:
         try:
             self.parser.parse(tokens)
         except SyntaxError as e:
-            # Print the syntax error and return an empty string if parsing fails
+            # Print the syntax error and signal the failure to the caller
             print(f"Syntax Error: {e}")
-            return ""
+            return None
 
         # -------------------------------------------------------
-        # Step 3: Prepare the compiled Python code
-        # Initialize a list to hold all lines of the final Python code
+        # Step 3: Run the enabled optimization passes
+        # Passes may request runtime helpers through optimizer.helpers.
+        # A profile only guides them when it was collected from this exact source.
         # -------------------------------------------------------
-        compiled_code = []
+        if self.pgo_collect or self.pgo_profile is not None:
+            digest = source_digest(code)
+            self.instrumenter.source_digest = digest
+            self.optimizer.profile = None
+            if self.pgo_profile is not None:
+                if self.pgo_profile.source == digest:
+                    self.optimizer.profile = self.pgo_profile
+                else:
+                    print("Warning: the profile was collected from a different version of this "
+                          "program; compiling without it.")
+        tokens = self.optimizer.optimize(tokens)
 
         # -------------------------------------------------------
-        # Step 4: Inject the dynamic_input function
-        # This function is added at the top of the Python code to handle
-        # user input with automatic type conversion to int, float, or string
+        # Step 3b: Add the step budget checks (only with a step budget)
         # -------------------------------------------------------
-        dynamic_input_function = [
-            "def dynamic_input(prompt):",
-            "    inp = input(prompt)",
-            "    try:",
-            "        return int(inp)",
-            "    except ValueError:",
-            "        try:",
-            "            return float(inp)",
-            "        except ValueError:",
-            "            return inp",
-            ""
-        ]
-        compiled_code.extend(dynamic_input_function)
+        if self.budget is not None:
+            tokens = self.budget.guard(tokens)
 
-        print(tokens)
+        # -------------------------------------------------------
+        # Step 3c: Add the profiling counters (instrumented mode only)
+        # -------------------------------------------------------
+        self.instrumenter.helpers = set()
+        if self.instrument:
+            tokens = self.instrumenter.instrument(tokens)
 
         # -------------------------------------------------------
-        # Step 5: Generate Python code from validated tokens
-        # Translate tokens into equivalent Python statements
+        # Step 3d: Move the main program into a function (wrap_main only)
         # -------------------------------------------------------
-        compiled_code.extend(self.code_generator.compile_tokens(tokens))
+        if self.main_wrapper is not None:
+            tokens = self.main_wrapper.wrap(tokens)
 
-        # Return the final Python code as a single string
-        return '\n'.join(compiled_code)
+        # -------------------------------------------------------
+        # Step 3e: Move blocks nested too deeply into helper functions
+        # -------------------------------------------------------
+        if self.outliner is not None:
+            tokens = self.outliner.transform(tokens)
+
+        # -------------------------------------------------------
+        # Step 3f: Turn the program into a coroutine (async target only)
+        # -------------------------------------------------------
+        if self.async_target is not None:
+            try:
+                tokens = self.async_target.transform(tokens)
+            except SyntaxError as e:
+                print(f"Syntax Error: {e}")
+                return None
+
+        return tokens
+
+    def _pass_helpers(self):
+        """
+        Returns the runtime helpers requested by the token passes.
+        """
+        helpers = self.optimizer.helpers | self.instrumenter.helpers
+        if self.budget is not None:
+            helpers |= self.budget.helpers
+        if self.outliner is not None:
+            helpers |= self.outliner.helpers
+        if self.async_target is not None:
+            helpers |= self.async_target.helpers
+        return helpers
+
+    def _build_module(self, tokens, skip_helpers=(), bound_names=()):
+        """
+        Builds the complete 'ast.Module' (runtime helpers included) with the AstGenerator.
+
+        :return: The module, or None if the tokens do not form a valid program.
+        """
+        try:
+            module = self.ast_generator.compile_tokens(tokens, bound_names)
+        except SyntaxError as e:
+            print(f"Syntax Error: {e}")
+            return None
+
+        self.helpers = self._pass_helpers() | self.ast_generator.helpers
+        module.body[:0] = self.ast_generator.helper_statements(self.helpers - set(skip_helpers))
+        return module
@@ -0,0 +1,161 @@
+"""
+Purpose:
+Adds profiling counters to the token list for the instrumented build mode.
+
+Explanation:
+- penguinDo   -> Gets the '_penguin_profile_call(<line>, counted=True)' decorator, which
+                 measures the cumulative time of the outermost calls, and its body starts
+                 with '_penguin_calls[<line>][1] += 1', which counts every call. Recursive
+                 calls of a module-level function skip the decorator's wrapper (see
+                 compiler.runtime), so they only pay for the counter.
+                 Functions that already have decorators (memoization) get
+                 '_penguin_profile_call(<line>)', which counts the calls in the wrapper, so
+                 cache hits still count.
+- keepWalking -> Counts its iterations in a plain variable '_penguin_n<line>' (a fast local
+                 inside functions) and adds the count to '_penguin_loops[<line>]' after the
+                 loop and before every returnIce that leaves the loop.
+- penguinIf / penguinWhatAbout / penguinElse -> With 'branches', the first statement of the
+                 branch adds one to '_penguin_branches[<line>]', so the profile records how
+                 often every branch was taken (profile-guided optimization, compiler.pgo).
+- The program starts with '_penguin_profile_start(<path>, <loops>)', which registers the
+  loop counters and the exit hook that prints the report and writes the JSON profile.
+  With 'branches' it also registers the branch counters and the digest of the source, so
+  a profile is never applied to a different version of the program.
+
+Counters are keyed by the .pg line 'index' of the penguinDo or keepWalking token.
+The pass runs after the optimization passes, so it profiles the program that actually
+runs: inlined calls are not counted, and a tail-call loop is reported as a loop on the
+line of its function. The profiling decorator goes first, outside any memoization cache,
+so cache hits still count as calls. Iterations of a loop that is left by an exception
+are not counted.
+"""
+
+from compiler.analysis import block_end, enclosing_function, function_scopes
+from compiler.tokens import TokenType
+
+BRANCH_TOKENS = (TokenType.PENGUIN_IF, TokenType.PENGUIN_WHAT_ABOUT, TokenType.PENGUIN_ELSE)
+
+
+class Instrumenter:
+    def __init__(self, profile_path=None, branches=False):
+        """
+        :param profile_path: File the JSON profile is written to at exit; None only prints the report.
+        :param branches: Also count how often each penguinIf/penguinWhatAbout/penguinElse branch runs.
+        """
+        self.profile_path = profile_path
+        self.branches = branches
+        # Digest of the .pg source, recorded in profiles with branch counters (set by the compiler)
+        self.source_digest = None
+        self.helpers = set()
+
+    def instrument(self, tokens):
+        """
+        Adds the call and loop counters to a token list.
+
+        :param tokens: Validated (and optimized) tokens.
+        :return: A new token list; the tokens that change are copied.
+        """
+        self.helpers = {"_penguin_profile"}
+        scopes = function_scopes(tokens)
+
+        # Loops with a body, by position: (end of the block, enclosing function or None)
+        loops = {}
+        for position, token in enumerate(tokens):
+            if token["type"] != TokenType.KEEP_WALKING:
+                continue
+            end = block_end(tokens, position)
+            if end > position + 1:
+                loops[position] = (end, enclosing_function(scopes, position))
+
+        # Branches with a body, by position (only when branches are counted)
+        branches = set()
+        if self.branches:
+            branches = {
+                position for position, token in enumerate(tokens)
+                if token["type"] in BRANCH_TOKENS and block_end(tokens, position) > position + 1
+            }
+
+        # Counter updates to insert before each position, inner loops first
+        flushes = {}
+        for position in sorted(loops, reverse=True):
+            end, _ = loops[position]
+            flushes.setdefault(end, []).append(self._flush(tokens[position], tokens[position]["indent"]))
+
+        instrumented = []
+        for position, token in enumerate(tokens):
+            ttype = token["type"]
+            instrumented.extend(flushes.get(position, []))
+
+            if ttype == TokenType.RETURN_ICE:
+                # Leaving the function also leaves every loop around the returnIce
+                scope = enclosing_function(scopes, position)
+                for start in sorted(loops, reverse=True):
+                    end, loop_scope = loops[start]
+                    if start < position < end and loop_scope is scope:
+                        instrumented.append(self._flush(tokens[start], token["indent"]))
+
+            counted = False
+            if ttype == TokenType.PENGUIN_DO:
+                counted = not token.get("decorators") and block_end(tokens, position) > position + 1
+                decorator = f'_penguin_profile_call({token["index"]}{", counted=True" if counted else ""})'
+                token = dict(token, decorators=[decorator] + token.get("decorators", []))
+
+            if position in loops:
+                instrumented.append(self._counter(token, "= 0", token["indent"]))
+                instrumented.append(token)
+                instrumented.append(self._counter(token, "+= 1", tokens[position + 1]["indent"]))
+                continue
+            instrumented.append(token)
+            if counted:
+                instrumented.append({
+                    "type": TokenType.ICE_BUCKET,
+                    "value": f'_penguin_calls[{token["index"]}][1] += 1',
+                    "indent": tokens[position + 1]["indent"],
+                    "index": token["index"]
+                })
+            if position in branches:
+                instrumented.append({
+                    "type": TokenType.ICE_BUCKET,
+                    "value": f'_penguin_branches[{token["index"]}] += 1',
+                    "indent": tokens[position + 1]["indent"],
+                    "index": token["index"]
+                })
+        instrumented.extend(flushes.get(len(tokens), []))
+
+        functions = {
+            tokens[position]["index"]: None if scope is None else scope.name
+            for position, (_, scope) in loops.items()
+        }
+        arguments = f"{self.profile_path!r}, {functions!r}"
+        if self.branches:
+            lines = sorted(tokens[position]["index"] for position in branches)
+            arguments += f", {lines!r}, {self.source_digest!r}"
+        start = {
+            "type": TokenType.ICE_BUCKET,
+            "value": f"_penguin_profile_start({arguments})",
+            "indent": 0,
+            "index": tokens[0]["index"] if tokens else 1
+        }
+        return [start] + instrumented
+
+    def _counter(self, loop, update, indent):
+        """
+        Builds '_penguin_n<line> <update>' for a keepWalking token.
+        """
+        return {
+            "type": TokenType.ICE_BUCKET,
+            "value": f'_penguin_n{loop["index"]} {update}',
+            "indent": indent,
+            "index": loop["index"]
+        }
+
+    def _flush(self, loop, indent):
+        """
+        Builds the statement that adds the iterations of a loop to its profile counter.
+        """
+        return {
+            "type": TokenType.ICE_BUCKET,
+            "value": f'_penguin_loops[{loop["index"]}] += _penguin_n{loop["index"]}',
+            "indent": indent,
+            "index": loop["index"]
+        }
@@ -0,0 +1,124 @@
+"""
+Purpose:
+Moves the top-level statements of a program into a generated function, so the variables
+of the main program are fast local variables instead of module globals.
+
+Explanation:
+- The top-level statements, in their original order, become the body of '_penguin_main()'.
+  penguinDo definitions and penguinBring imports stay at module level, ahead of it.
+- The program ends with 'penguinIf(__name__ == "__main__")' calling '_penguin_main()', so
+  importing the compiled module only defines its functions, without the variables they
+  read. Wrapped programs are meant to be run; 'main.py build' therefore only wraps the
+  modules that no other module brings in (see compiler.build).
+- Variables of the main program that penguinDo functions use as globals (read without
+  binding them, or declare 'global') are declared 'global' at the start of
+  '_penguin_main', so the functions keep seeing them. Every other variable becomes local.
+- Programs whose meaning would change are returned unchanged: a penguinDo inside a
+  top-level block, a function name defined twice or assigned at top level, a
+  'from ... import *' in an iceBucket, or a statement that cannot be analyzed.
+
+The pass runs last, after optimization, budget checks and instrumentation, so the
+statements those passes add to the main program become local too.
+"""
+
+import ast
+
+from compiler.analysis import function_locals, function_scopes, names_in, parse_token
+from compiler.tokens import TokenType
+
+MAIN_FUNCTION = "_penguin_main"
+
+
+class MainWrapper:
+    def wrap(self, tokens):
+        """
+        Wraps the top-level statements of a program in '_penguin_main()'.
+
+        :param tokens: Validated (and optimized) tokens.
+        :return: A new token list, or 'tokens' itself when the program cannot be wrapped.
+        """
+        scopes = function_scopes(tokens)
+        inside = set()
+        for info in scopes:
+            inside.update(range(info.start + 1, info.end))
+        functions = [info for info in scopes if info.start not in inside]
+        names = [info.name for info in functions]
+        if len(set(names)) != len(names) or any(info.token["indent"] for info in functions):
+            return tokens
+
+        module_level = (TokenType.PENGUIN_DO, TokenType.PENGUIN_BRING)
+        main_positions = [
+            position for position, token in enumerate(tokens)
+            if position not in inside and token["type"] not in module_level
+        ]
+        if not main_positions:
+            return tokens
+
+        bound = self.main_bindings([tokens[position] for position in main_positions])
+        if bound is None or bound & set(names):
+            return tokens
+        used = self.function_globals(functions, tokens)
+        if used is None:
+            return tokens
+        shared = sorted(bound & used)
+
+        first = tokens[main_positions[0]]["index"]
+        last = tokens[main_positions[-1]]["index"]
+        main_set = set(main_positions)
+        wrapped = [token for position, token in enumerate(tokens) if position not in main_set]
+        wrapped.append({"type": TokenType.PENGUIN_DO, "name": MAIN_FUNCTION, "params": "",
+                        "indent": 0, "index": first})
+        if shared:
+            wrapped.append({"type": TokenType.ICE_BUCKET, "value": f'global {", ".join(shared)}',
+                            "indent": 4, "index": first})
+        wrapped.extend(dict(tokens[position], indent=tokens[position]["indent"] + 4)
+                       for position in main_positions)
+        wrapped.append({"type": TokenType.PENGUIN_IF, "condition": '(__name__ == "__main__")',
+                        "indent": 0, "index": last})
+        wrapped.append({"type": TokenType.ICE_BUCKET, "value": f"{MAIN_FUNCTION}()",
+                        "indent": 4, "index": last})
+        return wrapped
+
+    def main_bindings(self, tokens):
+        """
+        Returns every name the main program binds, or None if a statement cannot be
+        analyzed or cannot move into a function.
+        """
+        bound = set()
+        for token in tokens:
+            nodes = parse_token(token)
+            if nodes is None:
+                return None
+            bound |= names_in(nodes)[1]
+            for node in nodes:
+                for child in ast.walk(node):
+                    if isinstance(child, (ast.Import, ast.ImportFrom)):
+                        if any(alias.name == "*" for alias in child.names):
+                            return None
+                        bound.update((alias.asname or alias.name).split(".")[0] for alias in child.names)
+                    elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                        bound.add(child.name)
+        return bound
+
+    def function_globals(self, functions, tokens):
+        """
+        Returns the names the penguinDo functions may use as module globals: names they
+        read without binding them, and names they declare 'global'. Nested functions are
+        included, so the result can be larger than needed but never misses a global.
+        Returns None if a function body cannot be analyzed.
+        """
+        used = set()
+        for info in functions:
+            nodes = []
+            for token in info.body(tokens):
+                parsed = parse_token(token)
+                if parsed is None:
+                    return None
+                nodes.extend(parsed)
+            read = names_in(nodes)[0]
+            used |= read - function_locals(info, tokens)
+            for node in nodes:
+                for child in ast.walk(node):
+                    if isinstance(child, ast.Global):
+                        used.update(child.names)
+        return used
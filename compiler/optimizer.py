@@ -0,0 +1,920 @@
+"""
+Purpose:
+Runs optional optimization passes over the validated token list before code generation.
+
+Explanation:
+- tail_calls -> Rewrites 'returnIce f(...)' inside f into a loop that rebinds the
+                parameters, so self-recursion runs in constant stack space.
+- inline     -> Replaces calls to small single-'returnIce' functions with the returned
+                expression, substituting the arguments for the parameters.
+- hoist_invariants -> Moves loop-invariant assignments and subexpressions out of
+                keepWalking loops whose calls are all side-effect free.
+- memoize    -> Wraps pure penguinDo functions in a bounded memoization cache
+                (see compiler.analysis.find_pure_functions for the purity rules).
+- local_aliases -> Binds the builtins, runtime helpers and penguinDo functions that the
+                loops of a function call to local variables at function entry.
+- strength_reduction -> Replaces small int powers with multiplications and divisions by a
+                power of two with multiplications by its reciprocal, where the result
+                is exactly the same.
+- profile    -> Profile-guided mode (see compiler.pgo): branch chains are ordered by how
+                often each branch was taken, only hot functions are inlined, and hot
+                recursive pure functions are memoized.
+
+Passes never modify the tokens they receive. A rewritten token is a copy, so the
+token list returned by the Tokenizer stays usable for error reporting.
+The runtime helpers a pass relies on are collected in 'helpers' so the compiler
+can inject them into the generated program.
+"""
+
+import ast
+import builtins
+import copy
+import math
+from collections import Counter
+
+from compiler.analysis import (
+    ARITHMETIC_TOKENS,
+    FLOAT,
+    INT,
+    PURE_BUILTINS,
+    block_end,
+    collect_functions,
+    enclosing_function,
+    expression_kinds,
+    find_pure_functions,
+    function_locals,
+    function_scopes,
+    loop_membership,
+    module_level_writes,
+    names_in,
+    number_kinds,
+    parse_token,
+    recursive_functions,
+    rewrite_token,
+    to_python,
+)
+from compiler.code_generator import FLOCK_BUILTINS
+from compiler.pgo import reorder_branches
+from compiler.tokens import TokenType
+
+# Expression nodes that evaluate without side effects (calls are checked separately)
+PURE_EXPRESSION_NODES = (
+    ast.Name, ast.Constant, ast.BinOp, ast.UnaryOp, ast.Compare, ast.BoolOp, ast.IfExp,
+    ast.Tuple, ast.Subscript, ast.Slice, ast.Call, ast.keyword,
+    ast.operator, ast.unaryop, ast.cmpop, ast.boolop, ast.expr_context,
+)
+
+# Statements that may rebind names or scopes in ways names_in does not see
+SCOPE_STATEMENTS = (
+    ast.Global, ast.Nonlocal, ast.Import, ast.ImportFrom, ast.FunctionDef, ast.AsyncFunctionDef,
+    ast.ClassDef, ast.Lambda, ast.Yield, ast.YieldFrom, ast.Await, ast.Delete,
+)
+
+
+class Optimizer:
+    def __init__(self, tail_calls=True, inline=False, inline_threshold=10,
+                 memoize=False, memo_cache_size=1024, memo_stats=False, hoist_invariants=False,
+                 local_aliases=False, alias_threshold=3, buffered_output=False,
+                 profile=None, hot_calls=1000, strength_reduction=False):
+        """
+        :param tail_calls: Turn self tail calls of penguinDo functions into loops.
+        :param inline: Inline calls to small single-returnIce functions.
+        :param inline_threshold: Largest returned expression, in expression nodes, that gets inlined.
+        :param hoist_invariants: Move loop-invariant code out of keepWalking loops.
+        :param memoize: Wrap pure penguinDo functions in a memoization cache.
+        :param memo_cache_size: Maximum number of results cached per function.
+        :param memo_stats: Print cache hit/miss statistics to stderr at exit.
+        :param local_aliases: Bind the global callables that loops call to local aliases.
+        :param alias_threshold: Fewest statements inside the loops of a function for it to get aliases.
+        :param buffered_output: penguinSay prints through '_penguin_say' instead of print
+                                (the callable local_aliases binds for it).
+        :param profile: A compiler.pgo.Profile of a training run. Enables branch ordering and
+                        decides which functions are inlined and memoized.
+        :param hot_calls: Fewest profiled calls for a function to count as hot.
+        :param strength_reduction: Replace int powers and divisions by powers of two with
+                                   cheaper multiplications giving exactly the same result.
+        """
+        self.tail_calls = tail_calls
+        self.inline = inline
+        self.inline_threshold = inline_threshold
+        self.memoize = memoize
+        self.memo_cache_size = memo_cache_size
+        self.memo_stats = memo_stats
+        self.hoist_invariants = hoist_invariants
+        self.local_aliases = local_aliases
+        self.alias_threshold = alias_threshold
+        self.say_function = "_penguin_say" if buffered_output else "print"
+        self.profile = profile
+        self.hot_calls = hot_calls
+        self.strength_reduction = strength_reduction
+        self.helpers = set()
+
+    def optimize(self, tokens):
+        """
+        Applies every enabled pass to the token list.
+
+        :param tokens: Validated tokens from the Parser.
+        :return: The optimized token list.
+        """
+        self.helpers = set()
+
+        if self.profile is not None:
+            tokens = reorder_branches(tokens, self.profile)
+        if self.tail_calls:
+            tokens = self.eliminate_tail_calls(tokens)
+        if self.inline or self.profile is not None:
+            tokens = self.inline_small_functions(tokens)
+        if self.hoist_invariants:
+            tokens = self.hoist_loop_invariants(tokens)
+        if self.strength_reduction:
+            tokens = self.reduce_strength(tokens)
+        if self.memoize or self.profile is not None:
+            tokens = self.memoize_pure_functions(tokens)
+        if self.local_aliases:
+            tokens = self.alias_global_callables(tokens)
+
+        return tokens
+
+    def memoize_pure_functions(self, tokens):
+        """
+        Adds a '_penguin_memoize' decorator to every pure penguinDo function.
+        Arguments are checked for hashability at call time; unhashable calls
+        bypass the cache and run the function directly.
+        With a profile, only the pure functions that are hot and recursive are memoized.
+        """
+        pure = find_pure_functions(tokens)
+        functions = collect_functions(tokens)
+        if self.profile is not None:
+            recursive = recursive_functions(tokens)
+            pure = [name for name in pure if name in recursive and self._is_hot(functions[name], tokens)]
+        if not pure:
+            return tokens
+
+        decorator = f"_penguin_memoize({self.memo_cache_size}"
+        decorator += ", report=True)" if self.memo_stats else ")"
+
+        optimized = list(tokens)
+        for name in pure:
+            position = functions[name].start
+            token = optimized[position]
+            optimized[position] = dict(token, decorators=token.get("decorators", []) + [decorator])
+
+        self.helpers.add("_penguin_memoize")
+        return optimized
+
+    def eliminate_tail_calls(self, tokens):
+        """
+        Rewrites self tail calls into loops that rebind the parameters:
+
+            def total(n, acc):                  def total(n, acc):
+                if n == 0:                          while True:
+                    return acc          ->              if n == 0:
+                return total(n - 1, acc + n)                return acc
+                                                        n, acc = n - 1, acc + n
+                                                        continue
+
+        Tail calls nested inside a keepWalking loop stay real calls, because 'continue'
+        would restart the inner loop instead of the function.
+        """
+        functions = collect_functions(tokens)
+        rebound = module_level_writes(tokens)
+        optimized = list(tokens)
+
+        # Rewrite from the end so earlier function positions stay valid
+        for info in sorted(functions.values(), key=lambda f: f.start, reverse=True):
+            if info.params is None or info.name in rebound:
+                continue
+            rewritten = self._loop_tail_calls(info, optimized)
+            if rewritten is not None:
+                optimized[info.start + 1:info.end] = rewritten
+
+        return optimized
+
+    def _loop_tail_calls(self, info, tokens):
+        """
+        Builds the loop-based body of one function, or returns None if it has no
+        self tail call that can be rewritten.
+        """
+        body = info.body(tokens)
+        if not body:
+            return None
+        in_loop = loop_membership(tokens, info.start + 1, info.end)
+
+        tail_calls = {}
+        for offset, token in enumerate(body):
+            ttype = token["type"]
+            if ttype == TokenType.PENGUIN_DO:
+                return None     # closures would observe the rebound parameters
+            if ttype == TokenType.BREAKICE and not in_loop[offset]:
+                return None     # a stray breakIce must not start breaking the new loop
+            if ttype == TokenType.RETURN_ICE and not in_loop[offset]:
+                arguments = self._self_call_arguments(token, info)
+                if arguments is not None:
+                    tail_calls[offset] = arguments
+        if not tail_calls:
+            return None
+
+        body_indent = body[0]["indent"]
+        shift = body_indent - info.token["indent"]
+        rewritten = [{
+            "type": TokenType.KEEP_WALKING,
+            "condition": "True",
+            "indent": body_indent,
+            "index": info.token["index"]
+        }]
+        for offset, token in enumerate(body):
+            indent = token["indent"] + shift
+            if offset not in tail_calls:
+                rewritten.append(dict(token, indent=indent))
+                continue
+            if info.params:
+                rebind = f'{", ".join(info.params)} = {", ".join(tail_calls[offset])}'
+                rewritten.append({
+                    "type": TokenType.ICE_BUCKET,
+                    "value": rebind,
+                    "indent": indent,
+                    "index": token["index"]
+                })
+            rewritten.append({
+                "type": TokenType.CONTINUE_WALKING,
+                "indent": indent,
+                "index": token["index"]
+            })
+
+        # Falling off the end of the loop body must still leave the function
+        last = rewritten[-1]
+        if last["indent"] != body_indent + shift or last["type"] not in (TokenType.RETURN_ICE,
+                                                                       TokenType.CONTINUE_WALKING):
+            rewritten.append({
+                "type": TokenType.RETURN_ICE,
+                "value": "None",
+                "indent": body_indent + shift,
+                "index": body[-1]["index"]
+            })
+        return rewritten
+
+    def _self_call_arguments(self, token, info):
+        """
+        Returns the argument sources of 'returnIce name(...)' when it calls the
+        function itself with one positional argument per parameter, else None.
+        """
+        try:
+            value = ast.parse(to_python(token["value"]), mode="eval").body
+        except SyntaxError:
+            return None
+        if not (isinstance(value, ast.Call) and isinstance(value.func, ast.Name)
+                and value.func.id == info.name):
+            return None
+        if value.keywords or len(value.args) != len(info.params):
+            return None
+        if any(isinstance(argument, ast.Starred) for argument in value.args):
+            return None
+        return [ast.unparse(argument) for argument in value.args]
+
+    def inline_small_functions(self, tokens):
+        """
+        Replaces calls such as 'addOperation(num1, num2)' with '(num1 + num2)' when
+        addOperation is a penguinDo whose whole body is a single small returnIce.
+
+        A function is inlined only when
+        - its returned expression has at most 'inline_threshold' expression nodes,
+        - it reads nothing but its parameters and pure builtins (so it is not recursive),
+        - every parameter is used, and its name is never rebound.
+        A call is inlined only when all arguments are plain names or constants, so
+        duplicating or reordering their evaluation cannot change the program, and the
+        caller does not shadow the function or the builtins it uses.
+        With a profile, only hot functions are inlined.
+        """
+        functions = collect_functions(tokens)
+        rebound = module_level_writes(tokens)
+        candidates = {}
+        for name, info in functions.items():
+            if name in rebound:
+                continue
+            if self.profile is not None and not self._is_hot(info, tokens):
+                continue
+            template = self._inline_template(info, tokens, rebound)
+            if template is not None:
+                candidates[name] = template
+        if not candidates:
+            return tokens
+
+        scopes = function_scopes(tokens)
+        scope_locals = {}
+        optimized = list(tokens)
+        for position, token in enumerate(tokens):
+            if token["type"] == TokenType.PENGUIN_DO:
+                continue
+            scope = enclosing_function(scopes, position)
+            if scope is None:
+                shadowed = set()
+            else:
+                if scope.start not in scope_locals:
+                    scope_locals[scope.start] = function_locals(scope, tokens)
+                shadowed = scope_locals[scope.start]
+            usable = {
+                name: template for name, template in candidates.items()
+                if name not in shadowed and not template[2] & shadowed
+            }
+            if usable:
+                optimized[position] = rewrite_token(token, _CallInliner(usable))
+
+        return optimized
+
+    def _is_hot(self, info, tokens):
+        """
+        Tells whether the profile counts at least 'hot_calls' calls of a function.
+        """
+        return self.profile.is_hot(tokens[info.start]["index"], self.hot_calls)
+
+    def _inline_template(self, info, tokens, rebound):
+        """
+        Returns (params, expression node, builtins used) for an inlinable function, else None.
+        """
+        body = info.body(tokens)
+        if info.params is None or len(body) != 1 or body[0]["type"] != TokenType.RETURN_ICE:
+            return None
+        if not body[0]["value"]:
+            return None
+        try:
+            expression = ast.parse(to_python(body[0]["value"]), mode="eval").body
+        except SyntaxError:
+            return None
+
+        size = sum(isinstance(node, ast.expr) for node in ast.walk(expression))
+        if size > self.inline_threshold:
+            return None
+        for node in ast.walk(expression):
+            if isinstance(node, (ast.Attribute, ast.Lambda, ast.NamedExpr, ast.Await, ast.Yield,
+                                 ast.YieldFrom, ast.ListComp, ast.SetComp, ast.DictComp,
+                                 ast.GeneratorExp)):
+                return None
+            if isinstance(node, ast.Call) and not isinstance(node.func, ast.Name):
+                return None
+
+        read, _ = names_in([expression])
+        params = set(info.params)
+        builtins_used = read - params
+        if builtins_used - (PURE_BUILTINS - rebound):
+            return None
+        if not params <= read:
+            return None
+        return info.params, expression, builtins_used
+
+    def hoist_loop_invariants(self, tokens):
+        """
+        Moves work that gives the same result on every iteration out of keepWalking loops:
+
+            while i < n * 2:                        _penguin_inv1 = n * 2
+                limit = top * 2                     if i < _penguin_inv1:
+                total = total + limit * i   ->          limit = top * 2
+                i = i + 1                               while i < _penguin_inv1:
+                                                            total = total + limit * i
+                                                            i = i + 1
+
+        A loop is only touched when every call in it goes to a pure builtin, a pure
+        penguinDo function (see find_pure_functions) or print, and it stores into no
+        subscript or attribute, so nothing the loop does can change a hoisted value.
+        An augmented assignment ('a += [1]') changes a list in place, and with it every
+        other name for the same list, so it counts as a store too unless its target
+        only ever holds numbers (see compiler.analysis.number_kinds).
+        An expression is hoisted when it is pure, reads no name the loop writes, and is
+        evaluated on every iteration before any output; hoisting then can only change
+        which of two errors is reported, never what the program prints.
+        The hoisted statements sit behind an 'if <condition>:' guard, so they do not run
+        when the loop would not have run at all.
+
+        A whole assignment 'name = <invariant>' moves out when the loop writes 'name'
+        nowhere else and reads it only as an operand, so one value can safely serve
+        every iteration. Other invariant operands of arithmetic and comparisons are
+        computed once into '_penguin_inv<N>' temporaries.
+        """
+        pure = find_pure_functions(tokens)
+        rebound = module_level_writes(tokens)
+        user_functions = {info.name for info in function_scopes(tokens)}
+        self._invariant_count = 0
+        # Kinds at the loop headers stay valid: rewriting a loop never moves the tokens in front of it
+        kinds = number_kinds(tokens)
+
+        optimized = list(tokens)
+        loops = [position for position, token in enumerate(tokens) if token["type"] == TokenType.KEEP_WALKING]
+        # Inner loops first; rewriting a loop never moves the tokens in front of it
+        for position in reversed(loops):
+            scope = enclosing_function(function_scopes(optimized), position)
+            unavailable = rebound | (function_locals(scope, optimized) if scope is not None else set())
+            callables = ((PURE_BUILTINS - user_functions) | pure) - unavailable
+            effect_free = callables | ({"print"} - user_functions - unavailable)
+
+            end = block_end(optimized, position)
+            rewritten = self._hoist_from_loop(optimized, position, end, callables, effect_free, kinds[position])
+            if rewritten is not None:
+                optimized[position:end] = rewritten
+
+        return optimized
+
+    def _hoist_from_loop(self, tokens, position, end, callables, effect_free, numbers):
+        """
+        Builds the tokens that replace a keepWalking loop and its body (tokens[position:end]),
+        or returns None when nothing can be hoisted.
+
+        :param callables: Functions that may appear in hoisted expressions.
+        :param effect_free: Functions the loop may call at all.
+        :param numbers: The number kinds of the variables the loop can read.
+        """
+        loop = tokens[position]
+        body = tokens[position + 1:end]
+        if not body:
+            return None
+        if (end < len(tokens) and tokens[end]["indent"] == loop["indent"]
+                and tokens[end]["type"] in (TokenType.PENGUIN_WHAT_ABOUT, TokenType.PENGUIN_ELSE)):
+            return None     # the guard would capture the branch
+
+        try:
+            condition = ast.parse(to_python(loop["condition"]), mode="eval").body
+        except SyntaxError:
+            return None
+        parsed = []
+        for token in body:
+            nodes = parse_token(token)
+            if nodes is None or token["type"] == TokenType.PENGUIN_DO:
+                return None
+            parsed.append(nodes)
+        if not self._is_pure(condition, callables):
+            return None
+        if self._may_mutate([node for nodes in parsed for node in nodes], effect_free, numbers):
+            return None
+
+        writes = Counter(
+            child.id for nodes in parsed for node in nodes for child in ast.walk(node)
+            if isinstance(child, ast.Name) and not isinstance(child.ctx, ast.Load)
+        )
+
+        def is_invariant(node):
+            return self._is_pure(node, callables) and not names_in([node])[0] & set(writes)
+
+        temps = {}
+
+        # The condition runs at least once, so its invariant operands go right before the loop
+        extractor = _InvariantExtractor(is_invariant, temps, self._new_invariant)
+        new_condition = extractor.visit(condition)
+        preheader = [self._temp_token(name, node, loop, loop["indent"]) for name, node in extractor.hoisted]
+        condition_source = ast.unparse(new_condition) if extractor.hoisted else loop["condition"]
+
+        # Statements at the top of the body run on every iteration until the first block,
+        # output, or jump; only those can give up work to the guarded preheader
+        body_indent = body[0]["indent"]
+        hoisted = []
+        removed = set()
+        rewritten_body = list(body)
+        read = names_in([condition])[0]
+        for offset, token in enumerate(body):
+            ttype = token["type"]
+            nodes = parsed[offset]
+            extractor = _InvariantExtractor(is_invariant, temps, self._new_invariant)
+
+            if ttype in (TokenType.KEEP_WALKING, TokenType.PENGUIN_IF, TokenType.PENGUIN_SAY):
+                # Evaluated on every iteration, but nothing after it is
+                rewritten_body[offset] = rewrite_token(token, extractor)
+                hoisted.extend(self._temp_token(name, node, token, body_indent) for name, node in extractor.hoisted)
+                break
+            if ttype != TokenType.ICE_BUCKET and ttype not in ARITHMETIC_TOKENS:
+                break
+            if not all(isinstance(node, (ast.Assign, ast.AugAssign)) for node in nodes):
+                break
+
+            target = self._invariant_assignment(nodes, writes, read, is_invariant)
+            if target is not None and self._used_only_as_operand(target, body, parsed):
+                hoisted.append(token)
+                removed.add(offset)
+                del writes[target]
+            else:
+                rewritten_body[offset] = rewrite_token(token, extractor)
+                hoisted.extend(self._temp_token(name, node, token, body_indent) for name, node in extractor.hoisted)
+            read |= names_in(nodes)[0]
+
+        remaining = [token for offset, token in enumerate(rewritten_body) if offset not in removed]
+        if not remaining or not (hoisted or preheader):
+            return None
+
+        if not hoisted:
+            return preheader + [dict(loop, condition=condition_source)] + remaining
+
+        shift = body_indent - loop["indent"]
+        guard = {
+            "type": TokenType.PENGUIN_IF,
+            "condition": condition_source,
+            "indent": loop["indent"],
+            "index": loop["index"]
+        }
+        return (
+            preheader + [guard] + hoisted
+            + [dict(loop, condition=condition_source, indent=body_indent)]
+            + [dict(token, indent=token["indent"] + shift) for token in remaining]
+        )
+
+    def _new_invariant(self):
+        self._invariant_count += 1
+        return f"_penguin_inv{self._invariant_count}"
+
+    def _temp_token(self, name, node, origin, indent):
+        return {
+            "type": TokenType.ICE_BUCKET,
+            "value": f"{name} = {ast.unparse(node)}",
+            "indent": indent,
+            "index": origin["index"]
+        }
+
+    def _is_pure(self, node, callables):
+        """
+        Tells whether evaluating an expression has no side effects.
+        """
+        for child in ast.walk(node):
+            if not isinstance(child, PURE_EXPRESSION_NODES):
+                return False
+            if isinstance(child, ast.Call) and not (isinstance(child.func, ast.Name)
+                                                    and child.func.id in callables):
+                return False
+        return True
+
+    def _may_mutate(self, nodes, effect_free, numbers):
+        """
+        Tells whether statements might change an object or a scope behind the names they write.
+
+        :param numbers: Variables known to hold only numbers, whose augmented assignments
+                        just rebind the name.
+        """
+        for node in nodes:
+            for child in ast.walk(node):
+                if isinstance(child, SCOPE_STATEMENTS):
+                    return True
+                if isinstance(child, (ast.Attribute, ast.Subscript)) and not isinstance(child.ctx, ast.Load):
+                    return True
+                if isinstance(child, ast.AugAssign) and not numbers.get(getattr(child.target, "id", None)):
+                    return True
+                if isinstance(child, ast.Call) and not (isinstance(child.func, ast.Name)
+                                                        and child.func.id in effect_free):
+                    return True
+        return False
+
+    def _invariant_assignment(self, nodes, writes, read, is_invariant):
+        """
+        Returns the target of 'name = <invariant>' when the loop assigns 'name' only there
+        and nothing before it in the iteration reads 'name', else None.
+        """
+        if len(nodes) != 1 or not isinstance(nodes[0], ast.Assign) or len(nodes[0].targets) != 1:
+            return None
+        target = nodes[0].targets[0]
+        if not isinstance(target, ast.Name) or writes[target.id] != 1 or target.id in read:
+            return None
+        if not is_invariant(nodes[0].value):
+            return None
+        return target.id
+
+    def _used_only_as_operand(self, name, body, parsed):
+        """
+        Tells whether the loop reads 'name' only in places that cannot keep a reference to
+        its value: operands, subscripts, conditions, printed values and returned values.
+        """
+        for token, nodes in zip(body, parsed):
+            for root in nodes:
+                exempt = set()
+                if token["type"] in (TokenType.PENGUIN_SAY, TokenType.RETURN_ICE, TokenType.KEEP_WALKING,
+                                     TokenType.PENGUIN_IF, TokenType.PENGUIN_WHAT_ABOUT):
+                    exempt.add(id(root))
+                    if token["type"] == TokenType.PENGUIN_SAY and isinstance(root, ast.Tuple):
+                        exempt.update(id(element) for element in root.elts)
+                if isinstance(root, ast.Name) and root.id == name and id(root) not in exempt:
+                    return False
+                for parent in ast.walk(root):
+                    if isinstance(parent, (ast.BinOp, ast.UnaryOp, ast.Compare, ast.Subscript, ast.AugAssign)):
+                        continue
+                    for child in ast.iter_child_nodes(parent):
+                        if (isinstance(child, ast.Name) and child.id == name
+                                and isinstance(child.ctx, ast.Load) and id(child) not in exempt):
+                            return False
+        return True
+
+
+    def reduce_strength(self, tokens):
+        """
+        Replaces arithmetic with cheaper arithmetic that gives exactly the same result:
+
+            n ** 2      ->  n * n           (and n ** 3, n ** 4) when n only ever holds ints
+            x / 4.0     ->  x * 0.25        when x is an int or a float
+            x / 4       ->  x * 0.25        when x only ever holds floats
+
+        The kinds of number a variable holds come from compiler.analysis.number_kinds.
+        Int products are exact, while 'float ** 2' may round differently from 'x * x' and
+        raises OverflowError where 'x * x' gives inf, so float powers stay as they are.
+        Dividing by 2**k and multiplying by 2**-k round the same exact value, and an int
+        operand is converted to float the same way by both; the int divisor needs a float
+        dividend, because 'int / 4' also works for ints too large for a float.
+        Operands of other types (flocks, complex numbers, strings) are never touched.
+        """
+        kinds = number_kinds(tokens)
+        optimized = list(tokens)
+        for position, token in enumerate(tokens):
+            if kinds[position]:
+                optimized[position] = rewrite_token(token, _StrengthReducer(kinds[position]))
+        return optimized
+
+    def alias_global_callables(self, tokens):
+        """
+        Looks up the global callables that the loops of a function call once, at function
+        entry, so every iteration reads a fast local instead of a global or builtin:
+
+            def show(items):                     def show(items):
+                i = 0                                _penguin_local_len, _penguin_local_print = len, print
+                while i < len(items):     ->         i = 0
+                    print(items[i])                  while i < _penguin_local_len(items):
+                    i = i + 1                            _penguin_local_print(items[i])
+                                                         i = i + 1
+
+        Only names that mean the same thing for the whole call are aliased (see
+        _global_callables): builtins, runtime helpers, and penguinDo functions defined before
+        the main program starts, as long as the program never rebinds them at module level
+        or through 'global'. Names the function binds itself are locals and stay untouched.
+        Functions with nested penguinDo definitions, with parameters other than plain
+        positional ones, or with statements that cannot be parsed are skipped, as are
+        functions whose loops hold fewer than 'alias_threshold' statements.
+        penguinSay and penguinTake use the alias through their "function" field.
+        """
+        symbols = self._global_callables(tokens)
+        optimized = list(tokens)
+        # Last function first, so inserting a binding never moves a function still to do
+        for info in reversed(function_scopes(tokens)):
+            if info.params is None or info.token["indent"] != 0:
+                continue
+            body = info.body(tokens)
+            if any(token["type"] == TokenType.PENGUIN_DO for token in body):
+                continue
+            parsed = [parse_token(token) for token in body]
+            if any(nodes is None for nodes in parsed):
+                continue
+            in_loop = loop_membership(tokens, info.start + 1, info.end)
+            if sum(in_loop) < self.alias_threshold:
+                continue
+            # Loop conditions run on every iteration too
+            in_loop = [looped or token["type"] == TokenType.KEEP_WALKING for token, looped in zip(body, in_loop)]
+
+            local_names = function_locals(info, tokens)
+            called = set()
+            for token, nodes, looped in zip(body, parsed, in_loop):
+                if not looped:
+                    continue
+                if token["type"] == TokenType.PENGUIN_SAY:
+                    called.add(self.say_function)
+                elif token["type"] == TokenType.PENGUIN_TAKE:
+                    called.add("dynamic_input")
+                for node in nodes:
+                    called.update(
+                        child.func.id for child in ast.walk(node)
+                        if isinstance(child, ast.Call) and isinstance(child.func, ast.Name)
+                    )
+            names = sorted(name for name in called if name in symbols and name not in local_names)
+            if not names:
+                continue
+
+            aliases = {name: f"_penguin_local_{name.removeprefix('_penguin_').lstrip('_')}" for name in names}
+            renamer = _CallRenamer(aliases)
+            for position in range(info.start + 1, info.end):
+                token = rewrite_token(optimized[position], renamer)
+                if token["type"] == TokenType.PENGUIN_SAY and self.say_function in aliases:
+                    token = dict(token, function=aliases[self.say_function])
+                elif token["type"] == TokenType.PENGUIN_TAKE and "dynamic_input" in aliases:
+                    token = dict(token, function=aliases["dynamic_input"])
+                optimized[position] = token
+
+            binding = {
+                "type": TokenType.ICE_BUCKET,
+                "value": f'{", ".join(aliases.values())} = {", ".join(names)}',
+                "indent": tokens[info.start + 1]["indent"],
+                "index": info.token["index"]
+            }
+            optimized[info.start + 1:info.start + 1] = [binding]
+        return optimized
+
+    def _global_callables(self, tokens):
+        """
+        Builds the symbol table of the callables that can be aliased, by kind:
+        "builtin", "helper" (runtime helpers, always defined before the program) or
+        "function" (a penguinDo defined once, at top level, before the first statement of
+        the main program). A penguinDo shadows the builtin of the same name; names that
+        the program rebinds at module level or declares 'global' anywhere are left out.
+        """
+        symbols = {
+            name: "builtin" for name, value in vars(builtins).items()
+            if not name.startswith("_") and callable(value)
+        }
+        symbols.update(dict.fromkeys(("dynamic_input", "_penguin_say") + FLOCK_BUILTINS, "helper"))
+
+        main_start = next(
+            (position for position, token in enumerate(tokens)
+             if token["indent"] == 0 and token["type"] not in (TokenType.PENGUIN_DO, TokenType.PENGUIN_BRING)),
+            len(tokens)
+        )
+        functions = collect_functions(tokens)
+        for info in function_scopes(tokens):
+            defined_once = info.name in functions and functions[info.name].start == info.start
+            if defined_once and info.token["indent"] == 0 and info.start < main_start:
+                symbols[info.name] = "function"
+            else:
+                symbols.pop(info.name, None)
+
+        rebound = set(module_level_writes(tokens))
+        for token in tokens:
+            for node in parse_token(token) or []:
+                for child in ast.walk(node):
+                    if isinstance(child, (ast.Global, ast.Nonlocal)):
+                        rebound.update(child.names)
+        for name in rebound:
+            symbols.pop(name, None)
+        return symbols
+
+
+class _CallRenamer(ast.NodeTransformer):
+    """
+    Points calls of aliased global callables at their local alias.
+    """
+
+    def __init__(self, aliases):
+        self.aliases = aliases
+        self.changed = False
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if isinstance(node.func, ast.Name) and node.func.id in self.aliases:
+            node.func = ast.copy_location(ast.Name(id=self.aliases[node.func.id], ctx=ast.Load()), node.func)
+            self.changed = True
+        return node
+
+
+class _CallInliner(ast.NodeTransformer):
+    """
+    Substitutes calls to inlinable functions with their returned expression.
+    """
+
+    def __init__(self, templates):
+        self.templates = templates
+        self.changed = False
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if not isinstance(node.func, ast.Name) or node.func.id not in self.templates:
+            return node
+        params, expression, _ = self.templates[node.func.id]
+        if node.keywords or len(node.args) != len(params):
+            return node
+        if not all(isinstance(argument, (ast.Name, ast.Constant)) for argument in node.args):
+            return node
+
+        substitutions = dict(zip(params, node.args))
+        self.changed = True
+        return _ParameterSubstituter(substitutions).visit(copy.deepcopy(expression))
+
+
+class _ParameterSubstituter(ast.NodeTransformer):
+    """
+    Replaces parameter names in an inlined expression with the call arguments.
+    """
+
+    def __init__(self, substitutions):
+        self.substitutions = substitutions
+
+    def visit_Name(self, node):
+        if node.id in self.substitutions:
+            return copy.deepcopy(self.substitutions[node.id])
+        return node
+
+
+class _InvariantExtractor(ast.NodeTransformer):
+    """
+    Replaces loop-invariant operands of arithmetic and comparisons with temporaries.
+    Parts of an expression that do not always run (later 'and'/'or' operands, the branches
+    of 'x if c else y', later links of chained comparisons, comprehensions) are left alone.
+    """
+
+    def __init__(self, is_invariant, temps, new_name):
+        self.is_invariant = is_invariant
+        self.temps = temps              # ast.dump of an expression -> temporary name
+        self.new_name = new_name
+        self.hoisted = []               # (name, expression) of the temporaries created here
+        self.changed = False
+
+    def _operand(self, node):
+        if isinstance(node, (ast.Name, ast.Constant)) or not self.is_invariant(node):
+            return self.visit(node)
+        if not any(isinstance(child, ast.Name) for child in ast.walk(node)):
+            return node     # constant expressions are folded by Python already
+        key = ast.dump(node)
+        if key not in self.temps:
+            self.temps[key] = self.new_name()
+            self.hoisted.append((self.temps[key], node))
+        self.changed = True
+        return ast.Name(id=self.temps[key], ctx=ast.Load())
+
+    def visit_BinOp(self, node):
+        node.left = self._operand(node.left)
+        node.right = self._operand(node.right)
+        return node
+
+    def visit_UnaryOp(self, node):
+        node.operand = self._operand(node.operand)
+        return node
+
+    def visit_AugAssign(self, node):
+        node.value = self._operand(node.value)
+        return node
+
+    def visit_Compare(self, node):
+        node.left = self._operand(node.left)
+        node.comparators[0] = self._operand(node.comparators[0])
+        return node
+
+    def visit_BoolOp(self, node):
+        node.values[0] = self.visit(node.values[0])
+        return node
+
+    def visit_IfExp(self, node):
+        node.test = self.visit(node.test)
+        return node
+
+    def _leave_alone(self, node):
+        return node
+
+    visit_Lambda = visit_ListComp = visit_SetComp = visit_DictComp = visit_GeneratorExp = _leave_alone
+
+
+def _reciprocal(divisor, float_dividend):
+    """
+    Returns 1 / divisor when divisor is a constant power of two whose reciprocal is exactly
+    representable (an int divisor only counts for float dividends), else None.
+    """
+    if not isinstance(divisor, ast.Constant) or isinstance(divisor.value, bool):
+        return None
+    value = divisor.value
+    if isinstance(value, int) and float_dividend and value:
+        value = float(value)
+    if not isinstance(value, float) or not math.isfinite(value) or value == 0:
+        return None
+    reciprocal = 1.0 / value
+    if math.frexp(value)[0] not in (0.5, -0.5) or reciprocal == 0 or reciprocal * value != 1.0:
+        return None
+    return reciprocal
+
+
+class _StrengthReducer(ast.NodeTransformer):
+    """
+    Rewrites int powers and divisions by powers of two (see Optimizer.reduce_strength).
+    """
+
+    # Largest exponent written out as a chain of multiplications
+    MAX_EXPONENT = 4
+
+    def __init__(self, kinds):
+        self.kinds = kinds
+        self.changed = False
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Pow) and self._int_name(node.left) and self._small_exponent(node.right):
+            product = node.left
+            for _ in range(node.right.value - 1):
+                product = ast.BinOp(left=product, op=ast.Mult(), right=ast.Name(id=node.left.id, ctx=ast.Load()))
+            self.changed = True
+            return ast.copy_location(product, node)
+        if isinstance(node.op, ast.Div):
+            reciprocal = self._reciprocal(node.left, node.right)
+            if reciprocal is not None:
+                self.changed = True
+                return ast.copy_location(ast.BinOp(left=node.left, op=ast.Mult(),
+                                                   right=ast.Constant(value=reciprocal)), node)
+        return node
+
+    def visit_AugAssign(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Div):
+            reciprocal = self._reciprocal(ast.Name(id=node.target.id, ctx=ast.Load()), node.value) \
+                if isinstance(node.target, ast.Name) else None
+            if reciprocal is not None:
+                node.op, node.value = ast.Mult(), ast.Constant(value=reciprocal)
+                self.changed = True
+        return node
+
+    def visit_Lambda(self, node):
+        # Lambda parameters may shadow the variables whose kinds are known
+        return node
+
+    def _int_name(self, node):
+        return isinstance(node, ast.Name) and self.kinds.get(node.id) == frozenset([INT])
+
+    def _small_exponent(self, node):
+        return (isinstance(node, ast.Constant) and type(node.value) is int
+                and 2 <= node.value <= self.MAX_EXPONENT)
+
+    def _reciprocal(self, dividend, divisor):
+        # Calls count as unknown: the builtins may be rebound where the kinds do not tell
+        kinds = expression_kinds(dividend, self.kinds, builtins=frozenset())
+        if not kinds or not kinds <= {INT, FLOAT}:
+            return None
+        return _reciprocal(divisor, kinds == frozenset([FLOAT]))
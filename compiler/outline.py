@@ -0,0 +1,274 @@
+"""
+Purpose:
+Moves deeply nested blocks into generated helper functions, so machine-generated programs
+with deep penguinIf/keepWalking nesting still compile. Python refuses code nested in more
+than 20 loops ("too many statically nested blocks") or 100 indentation levels.
+
+Explanation:
+- Every token has a depth: the number of blocks around it (a penguinDo body is a block).
+  When a block header sits at depth max_depth - 1 and its body nests deeper than
+  max_depth, the whole body moves into a module-level function '_penguin_block_<n>' and
+  is replaced by a call. The body of that function starts at depth 1 again, and it is
+  outlined in turn when it is still too deep. When a body has to stay in place, the
+  blocks inside it are tried instead.
+- Inside a penguinDo, the function receives the local variables the body reads or writes
+  as parameters and returns the ones it writes, which the call assigns back:
+      a, total = _penguin_block_1(a, b, total)
+  Variables of enclosing functions are passed in as well; names declared 'global' are
+  declared 'global' in the helper too. At module level the body writes its variables
+  through a 'global' declaration instead.
+- A local that may still be unbound at the call is passed as
+  'locals().get("x", _penguin_unbound)'; the helper and the caller 'del' it again when it
+  comes back as the '_penguin_unbound' sentinel, so reading it still raises UnboundLocalError.
+- breakIce / continueWalking leaving the body and returnIce inside it make the helper
+  return '(flow, result, variables...)'; the call is followed by
+      if _penguin_flow == 1: break
+      if _penguin_flow == 2: continue
+      if _penguin_flow == 3: return _penguin_result
+  for the kinds of exits the body has (1 break, 2 continue, 3 return, 0 falls through).
+
+A body is left where it is when moving it could change its meaning: it defines a function
+or a lambda (closures would see copies of the variables), declares names 'global' or
+'nonlocal', deletes names, yields, returns or breaks from an iceBucket statement, calls
+locals()/vars()/eval()/exec()/dir(), or holds a statement that cannot be analyzed.
+
+The pass runs after optimization, the step budget, instrumentation and wrap_main, and
+before the async target, which turns the helpers into coroutines where needed.
+"""
+
+import ast
+import itertools
+
+from compiler.analysis import (
+    block_depths, block_end, function_scopes, loop_membership, names_in, parse_token,
+)
+from compiler.tokens import TokenType
+
+# Statements and expressions that keep a body from being outlined
+UNMOVABLE_NODES = (
+    ast.Global, ast.Nonlocal, ast.Delete, ast.Return, ast.Break, ast.Continue, ast.Yield,
+    ast.YieldFrom, ast.Await, ast.Lambda, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef,
+    ast.Import, ast.ImportFrom,
+)
+
+# Builtins that look at the variables of the calling frame
+FRAME_BUILTINS = frozenset(["locals", "vars", "eval", "exec", "dir"])
+
+# Value of '_penguin_flow' for each way of leaving an outlined body
+FLOW_CODES = {"break": 1, "continue": 2, "return": 3}
+
+
+class Outliner:
+    def __init__(self, max_depth=16):
+        """
+        :param max_depth: Deepest block nesting left in place. Python allows 20 nested loops
+                          per function; wrap_main and the async target add one level.
+        """
+        if max_depth < 2:
+            raise ValueError(f"max_depth must be at least 2, got {max_depth}.")
+        self.max_depth = max_depth
+        self.helpers = set()
+        # Helper names keep counting across programs, so REPL entries never reuse one
+        self._numbers = itertools.count(1)
+
+    def transform(self, tokens):
+        """
+        Outlines the blocks of a program that nest deeper than max_depth.
+
+        :param tokens: Validated (and optimized) tokens.
+        :return: A new token list with the helper functions first, or 'tokens' itself
+                 when nothing nests too deeply.
+        """
+        self.helpers = set()
+        if max(block_depths(tokens), default=0) <= self.max_depth:
+            return tokens
+        outlined = []
+        program = self._outline(tokens, outlined)
+        return outlined + program
+
+    def _outline(self, tokens, outlined):
+        """
+        Replaces the too deep bodies of a token list by calls; the helper functions are
+        appended to 'outlined'.
+        """
+        depths = block_depths(tokens)
+        scopes = function_scopes(tokens)
+        scope_names = {}    # penguinDo position -> its (local, global, nonlocal) names
+        result = []
+        position = 0
+        while position < len(tokens):
+            result.append(tokens[position])
+            # Headers deeper than max_depth - 1 are only reached inside bodies left in place
+            if depths[position] >= self.max_depth - 1:
+                end = block_end(tokens, position)
+                if end > position + 1 and max(depths[position + 1:end]) > self.max_depth:
+                    call = self._outline_body(tokens, position + 1, end, scopes, scope_names, outlined)
+                    if call is not None:
+                        result.extend(call)
+                        position = end
+                        continue
+            position += 1
+        return result
+
+    def _outline_body(self, tokens, start, end, scopes, scope_names, outlined):
+        """
+        Moves tokens[start:end] (the body of a block) into a new helper function.
+
+        :return: The tokens that call the helper, or None when the body must stay in place.
+        """
+        body = tokens[start:end]
+        nodes = []
+        for token in body:
+            if token["type"] in (TokenType.PENGUIN_DO, TokenType.PENGUIN_BRING):
+                return None
+            parsed = parse_token(token)
+            if parsed is None:
+                return None
+            for node in parsed:
+                if any(isinstance(child, UNMOVABLE_NODES) for child in ast.walk(node)):
+                    return None
+            nodes.extend(parsed)
+        read, written = names_in(nodes)
+        # penguinSay/penguinTake may call a local alias (local_aliases) instead of print
+        read |= {token["function"] for token in body if "function" in token}
+        if read & FRAME_BUILTINS:
+            return None
+
+        exits = set()
+        in_loop = loop_membership(tokens, start, end)
+        for offset, token in enumerate(body):
+            if token["type"] == TokenType.RETURN_ICE:
+                exits.add("return")
+            elif token["type"] == TokenType.BREAKICE and not in_loop[offset]:
+                exits.add("break")
+            elif token["type"] == TokenType.CONTINUE_WALKING and not in_loop[offset]:
+                exits.add("continue")
+
+        enclosing = [info for info in scopes if info.start < start < info.end]
+        if enclosing:
+            local_names, global_names, nonlocal_names = self._scope_names(enclosing[-1], tokens, scopes, scope_names)
+            if (read | written) & nonlocal_names:
+                return None
+            outer_names = set()
+            for info in enclosing[:-1]:
+                outer_names |= self._scope_names(info, tokens, scopes, scope_names)[0]
+            outer_names -= local_names | global_names
+            params = sorted((read | written) & (local_names | outer_names))
+            returned = sorted(written & local_names)
+            declared = sorted(written & global_names)
+            bound = self._bound_before(enclosing[-1], tokens, start) | outer_names
+        else:
+            if "return" in exits:
+                return None
+            params, returned, declared, bound = [], [], sorted(written), set()
+        unbound = [variable for variable in params if variable not in bound]
+        if unbound:
+            self.helpers.add("_penguin_outline")
+
+        name = f"_penguin_block_{next(self._numbers)}"
+        header = tokens[start - 1]
+        level = body[0]["indent"]
+        values = [self._value(variable, bound) for variable in returned]
+        results = ", ".join((["_penguin_flow", "_penguin_result"] if exits else []) + returned)
+
+        def statement(value, indent, index, ttype=TokenType.ICE_BUCKET):
+            return {"type": ttype, "value": value, "indent": indent, "index": index}
+
+        helper = [{"type": TokenType.PENGUIN_DO, "name": name, "params": ", ".join(params),
+                   "indent": 0, "index": header["index"]}]
+        if declared:
+            helper.append(statement(f'global {", ".join(declared)}', 4, header["index"]))
+        for variable in unbound:
+            helper.append(statement(f"if {variable} is _penguin_unbound: del {variable}", 4, header["index"]))
+        for offset, token in enumerate(body):
+            indent = token["indent"] - level + 4
+            exit_kind = None
+            if token["type"] == TokenType.RETURN_ICE:
+                exit_kind, result = "return", f'({token["value"]})' if token["value"] else "None"
+            elif token["type"] in (TokenType.BREAKICE, TokenType.CONTINUE_WALKING) and not in_loop[offset]:
+                exit_kind, result = ("break" if token["type"] == TokenType.BREAKICE else "continue"), "None"
+            if exit_kind is None:
+                helper.append(dict(token, indent=indent))
+            else:
+                value = ", ".join([str(FLOW_CODES[exit_kind]), result] + values)
+                helper.append(statement(value, indent, token["index"], TokenType.RETURN_ICE))
+        ends_with_return = helper[-1]["type"] == TokenType.RETURN_ICE and helper[-1]["indent"] == 4
+        if (exits or values) and not ends_with_return:
+            value = ", ".join((["0", "None"] if exits else []) + values)
+            helper.append(statement(value, 4, body[-1]["index"], TokenType.RETURN_ICE))
+        outlined.extend(self._outline(helper, outlined))
+
+        arguments = ", ".join(self._value(variable, bound) for variable in params)
+        call = f"{name}({arguments})"
+        lines = [f"{results} = {call}" if results else call]
+        lines.extend(f"if {variable} is _penguin_unbound: del {variable}"
+                     for variable in returned if variable not in bound)
+        if "break" in exits:
+            lines.append("if _penguin_flow == 1: break")
+        if "continue" in exits:
+            lines.append("if _penguin_flow == 2: continue")
+        if "return" in exits:
+            lines.append("if _penguin_flow == 3: return _penguin_result")
+        return [statement(line, level, header["index"]) for line in lines]
+
+    def _value(self, variable, bound):
+        """
+        Returns the expression that reads a variable, or '_penguin_unbound' when it is unbound.
+        """
+        return variable if variable in bound else f'locals().get("{variable}", _penguin_unbound)'
+
+    def _scope_names(self, info, tokens, scopes, cache):
+        """
+        Returns the (local, global, nonlocal) names of a penguinDo, leaving out the
+        statements of the functions nested in it. Results are kept in 'cache'.
+        """
+        if info.start in cache:
+            return cache[info.start]
+        nested = set()
+        for other in scopes:
+            if info.start < other.start < info.end:
+                nested.update(range(other.start + 1, other.end))
+        local_names = set(info.params or [])
+        global_names, nonlocal_names = set(), set()
+        for position in range(info.start + 1, info.end):
+            if position in nested:
+                continue
+            token = tokens[position]
+            if token["type"] == TokenType.PENGUIN_DO:
+                local_names.add(token["name"])
+                continue
+            for node in parse_token(token) or []:
+                for child in ast.walk(node):
+                    if isinstance(child, ast.Name):
+                        if not isinstance(child.ctx, ast.Load):
+                            local_names.add(child.id)
+                    elif isinstance(child, ast.Global):
+                        global_names.update(child.names)
+                    elif isinstance(child, ast.Nonlocal):
+                        nonlocal_names.update(child.names)
+        cache[info.start] = (local_names - global_names - nonlocal_names, global_names, nonlocal_names)
+        return cache[info.start]
+
+    def _bound_before(self, info, tokens, start):
+        """
+        Returns the local names that are certainly bound when tokens[start] runs: the
+        parameters of the function and the names assigned by the simple statements that
+        always run before it (at its own level or the level of a block around it).
+        """
+        bound, deleted = set(), set()
+        level = tokens[start]["indent"]
+        for position in range(start - 1, info.start, -1):
+            token = tokens[position]
+            if token["indent"] > level:
+                continue    # inside an earlier block, which may not have run
+            level = token["indent"]
+            if block_end(tokens, position) > position + 1:
+                continue
+            for node in parse_token(token) or []:
+                for child in ast.walk(node):
+                    if isinstance(child, ast.Name) and child.id not in bound | deleted:
+                        if isinstance(child.ctx, ast.Del):
+                            deleted.add(child.id)
+                        elif isinstance(child.ctx, ast.Store):
+                            bound.add(child.id)
+        return (bound | set(info.params or [])) - deleted
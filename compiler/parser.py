@@ -1,97 +1,100 @@
 from compiler.tokens import TokenType
 
+
+def _require(fields, message):
+    """
+    Builds a validator that raises SyntaxError(message) when a token lacks one of the fields.
+    'message' may use '{type}' for the token type.
+    """
+    def validate(token):
+        if any(field not in token for field in fields):
+            raise SyntaxError(message.format(type=token["type"]))
+    return validate
+
+
+def _validate_bring(token):
+    """
+    penguinBring requires "name" (a dotted module name) and top-level placement.
+    """
+    if "name" not in token:
+        raise SyntaxError("Missing 'name' in penguinBring statement.")
+    if not all(part.isidentifier() for part in token["name"].split(".")):
+        raise SyntaxError(f"Invalid module name '{token['name']}' in penguinBring statement.")
+    if token.get("indent", 0) != 0:
+        raise SyntaxError("penguinBring is only allowed at the top level of a file.")
+
+
+_validate_arithmetic = _require(("target", "expression"), "Missing 'target' or 'expression' in arithmetic operation.")
+_validate_condition = _require(("condition",), "Missing 'condition' in {type} statement.")
+
+
 class Parser:
+    # Token type -> validator, built once (see register_validator).
+    # Token types without a validator (breakIce, penguinElse, ...) need no fields.
+    validators = {
+        # Requires: "value"
+        TokenType.PENGUIN_SAY: _require(("value",), "Missing 'value' in penguinSay statement."),
+        # Requires: "name", "prompt"
+        TokenType.PENGUIN_TAKE: _require(("name", "prompt"), "Missing 'name' or 'prompt' in penguinTake statement."),
+        # Requires: "name", "params"
+        TokenType.PENGUIN_DO: _require(("name", "params"), "Incomplete function definition (penguinDo)."),
+        # Condition-based tokens require: "condition"
+        TokenType.KEEP_WALKING: _validate_condition,
+        TokenType.PENGUIN_IF: _validate_condition,
+        TokenType.PENGUIN_WHAT_ABOUT: _validate_condition,
+        # Requires: "value"
+        TokenType.RETURN_ICE: _require(("value",), "Missing 'value' in returnIce statement."),
+        TokenType.ICE_BUCKET: _require(("value",), "Missing 'value' in iceBucket statement."),
+        # Requires: "name", "value"
+        TokenType.PENGUIN_FLOCK: _require(("name", "value"), "Missing 'name' or 'value' in penguinFlock statement."),
+        # Requires: "name" (a dotted module name), top-level placement
+        TokenType.PENGUIN_BRING: _validate_bring,
+        # Arithmetic operations require: "target", "expression"
+        TokenType.SLIDE_UP: _validate_arithmetic,
+        TokenType.SLIDE_DOWN: _validate_arithmetic,
+        TokenType.PENGUIN_BOOST: _validate_arithmetic,
+        TokenType.GIVE_PENGUINS: _validate_arithmetic,
+        TokenType.SNOWBALL: _validate_arithmetic,
+    }
+
     def __init__(self):
-        pass  # No initialization needed for now
+        # The validators registered when the parser was created, by token type
+        self.validators = dict(type(self).validators)
+
+    @classmethod
+    def register_validator(cls, token_type, validator=None):
+        """
+        Registers the validator of a token type, for new statements or to replace the checks
+        of an existing one. A validator is called with the token and raises SyntaxError when
+        the token is invalid. Can be used as a decorator, like CodeGenerator.register_emitter.
+        Parsers created before the registration keep the validators they started with.
+
+        :param token_type: The "type" of the tokens the validator checks.
+        :param validator: The validator; omit it to use register_validator as a decorator.
+        :return: The validator.
+        """
+        if validator is None:
+            return lambda function: cls.register_validator(token_type, function)
+        if "validators" not in cls.__dict__:
+            cls.validators = dict(cls.validators)
+        cls.validators[token_type] = validator
+        return validator
 
     def parse(self, tokens):
         """
         Parses the list of tokens and validates their syntax.
-        Ensures that required fields are present for each token type.
+        Ensures that required fields are present for each token type, with the validator
+        registered for the type. Tokens of other types are accepted as they are.
         Optionally, this can be extended to construct an Abstract Syntax Tree (AST).
 
         :param tokens: List of tokens to parse.
         :return: Parsed tokens (or AST in an extended implementation).
         """
+        validators = self.validators
         for token in tokens:
-            token_type = token["type"]
-
-            # -------------------------------------------------------
-            # Validate penguinSay token
-            # Requires: "value"
-            # -------------------------------------------------------
-            if token_type == TokenType.PENGUIN_SAY:
-                if "value" not in token:
-                    raise SyntaxError("Missing 'value' in penguinSay statement.")
-
-            # -------------------------------------------------------
-            # Validate penguinTake token
-            # Requires: "name", "prompt"
-            # -------------------------------------------------------
-            elif token_type == TokenType.PENGUIN_TAKE:
-                if "name" not in token or "prompt" not in token:
-                    raise SyntaxError("Missing 'name' or 'prompt' in penguinTake statement.")
-
-            # -------------------------------------------------------
-            # Validate penguinDo token
-            # Requires: "name", "params"
-            # -------------------------------------------------------
-            elif token_type == TokenType.PENGUIN_DO:
-                if "name" not in token or "params" not in token:
-                    raise SyntaxError("Incomplete function definition (penguinDo).")
-
-            # -------------------------------------------------------
-            # Validate condition-based tokens
-            # Includes: keepWalking, penguinIf, penguinWhatAbout
-            # Requires: "condition"
-            # -------------------------------------------------------
-            elif token_type in [TokenType.KEEP_WALKING, TokenType.PENGUIN_IF, TokenType.PENGUIN_WHAT_ABOUT]:
-                if "condition" not in token:
-                    raise SyntaxError(f"Missing 'condition' in {token_type} statement.")
-
-            # -------------------------------------------------------
-            # Validate returnIce token
-            # Requires: "value"
-            # -------------------------------------------------------
-            elif token_type == TokenType.RETURN_ICE:
-                if "value" not in token:
-                    raise SyntaxError("Missing 'value' in returnIce statement.")
-
-            # -------------------------------------------------------
-            # Validate iceBucket token
-            # Requires: "value"
-            # -------------------------------------------------------
-            elif token_type == TokenType.ICE_BUCKET:
-                if "value" not in token:
-                    raise SyntaxError("Missing 'value' in iceBucket statement.")
-
-            # -------------------------------------------------------
-            # Validate arithmetic operations
-            # Includes: slideUp, slideDown, penguinBoost, givePenguins, snowball
-            # Requires: "target", "expression"
-            # -------------------------------------------------------
-            elif token_type in [
-                TokenType.SLIDE_UP,
-                TokenType.SLIDE_DOWN,
-                TokenType.PENGUIN_BOOST,
-                TokenType.GIVE_PENGUINS,
-                TokenType.SNOWBALL,
-            ]:
-                if "target" not in token or "expression" not in token:
-                    raise SyntaxError("Missing 'target' or 'expression' in arithmetic operation.")
-
-            # -------------------------------------------------------
-            # Validate breakIce token
-            # No additional fields required
-            # -------------------------------------------------------
-            elif token_type == TokenType.BREAKICE:
-                pass
-
-            # -------------------------------------------------------
-            # Handle other token types or ignore
-            # -------------------------------------------------------
-            else:
-                pass
+            validator = validators.get(token["type"])
+            if validator is not None:
+                validator(token)
 
         # In this simple implementation, tokens are returned as-is.
         return tokens
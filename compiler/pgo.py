@@ -0,0 +1,177 @@
+"""
+Purpose:
+Profile-guided optimization: reads the profile of a training run and lets it decide which
+penguinDo functions are worth inlining or memoizing, and in which order the branches of
+penguinIf/penguinWhatAbout chains are tested.
+
+Explanation:
+- Collecting ('--pgo-collect'): the program is built in instrumented mode with branch
+  counters (see compiler.instrument). Running it on real input writes a JSON profile with
+  the calls of every penguinDo, the iterations of every keepWalking and the number of times
+  every branch was taken, keyed by the .pg line 'index', plus a digest of the source.
+- Using ('--pgo-use profile.json'): the Optimizer gets the Profile.
+  - Inlining only considers functions called at least 'hot_calls' times. Cold functions
+    keep their definition and their calls.
+  - Memoization goes to pure functions that are hot and call themselves (directly or
+    through others), where a cache can cut whole call trees.
+  - reorder_branches moves the most frequently taken branch of a chain to the front.
+- A profile is only applied to the exact source it was collected from; line numbers of
+  an edited program no longer match.
+
+Branches are only reordered when that cannot change what the program does: every
+condition of the chain compares the same variable with '==' to a different constant, so at
+most one condition is true and evaluating them has no side effects. penguinElse stays last.
+"""
+
+import ast
+import hashlib
+import json
+
+from compiler.analysis import block_end
+from compiler.tokens import TokenType
+
+# Constants that compare equal only to values of their own kind, without side effects
+_CONSTANT_TYPES = (int, float, str, bytes, bool, type(None))
+
+
+def source_digest(code):
+    """
+    Returns the digest that ties a profile to the .pg source it was collected from.
+    """
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+class Profile:
+    """
+    The counters of a profiling run, keyed by .pg line 'index'.
+    """
+
+    def __init__(self, calls=None, loops=None, branches=None, source=None):
+        """
+        :param calls: penguinDo line -> number of calls.
+        :param loops: keepWalking line -> number of iterations.
+        :param branches: penguinIf/penguinWhatAbout/penguinElse line -> times the branch was taken.
+        :param source: Digest of the profiled source (see source_digest).
+        """
+        self.calls = dict(calls or {})
+        self.loops = dict(loops or {})
+        self.branches = dict(branches or {})
+        self.source = source
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a profile written by a program built with '--pgo-collect'.
+
+        :raises OSError: If the file cannot be read.
+        :raises ValueError: If the file is not a profile with branch counters.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except ValueError as e:
+                raise ValueError(f"'{path}' is not a JSON profile: {e}") from None
+        if not isinstance(data, dict) or "branches" not in data or "source" not in data:
+            raise ValueError(f"'{path}' was not written by a program built with --pgo-collect.")
+        try:
+            return cls(
+                calls={entry["line"]: entry["calls"] for entry in data.get("functions", [])},
+                loops={entry["line"]: entry["iterations"] for entry in data.get("loops", [])},
+                branches={entry["line"]: entry["taken"] for entry in data["branches"]},
+                source=data["source"],
+            )
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"'{path}' is not a valid profile: missing {e}.") from None
+
+    def is_hot(self, line, hot_calls):
+        """
+        Tells whether the penguinDo defined on 'line' was called at least 'hot_calls' times.
+        """
+        return self.calls.get(line, 0) >= hot_calls
+
+
+def reorder_branches(tokens, profile):
+    """
+    Orders the branches of every penguinIf/penguinWhatAbout chain whose conditions are
+    mutually exclusive so the branch taken most often is tested first:
+
+        penguinIf(choice == 1)            penguinIf(choice == 3)      <- taken 900 times
+            ...                               ...
+        penguinWhatAbout(choice == 3) ->  penguinIf(choice == 1)      <- taken 10 times
+            ...                               ...
+        penguinElse                       penguinElse
+            ...                               ...
+
+    Branches taken equally often keep their order. Chains nested in a branch are ordered too.
+
+    :param tokens: Validated tokens.
+    :param profile: The Profile with branch counters.
+    :return: A new token list (or 'tokens' itself when no chain changes); moved headers are copies.
+    """
+    reordered = _reorder(tokens, profile)
+    return tokens if reordered == tokens else reordered
+
+
+def _reorder(tokens, profile):
+    result = []
+    position = 0
+    while position < len(tokens):
+        token = tokens[position]
+        if token["type"] != TokenType.PENGUIN_IF:
+            result.append(token)
+            position += 1
+            continue
+
+        # The chain: the penguinIf, every penguinWhatAbout after it, and a final penguinElse
+        branches = [(position, block_end(tokens, position))]
+        while branches[-1][1] < len(tokens):
+            following = tokens[branches[-1][1]]
+            if following["indent"] != token["indent"] or following["type"] not in (
+                    TokenType.PENGUIN_WHAT_ABOUT, TokenType.PENGUIN_ELSE):
+                break
+            start = branches[-1][1]
+            branches.append((start, block_end(tokens, start)))
+            if following["type"] == TokenType.PENGUIN_ELSE:
+                break
+        tested = [branch for branch in branches if tokens[branch[0]]["type"] != TokenType.PENGUIN_ELSE]
+
+        order = tested
+        if len(tested) > 1 and _mutually_exclusive([tokens[start]["condition"] for start, _ in tested]):
+            order = sorted(tested, key=lambda branch: -profile.branches.get(tokens[branch[0]]["index"], 0))
+
+        for rank, (start, end) in enumerate(order + branches[len(tested):]):
+            header = tokens[start]
+            if header["type"] != TokenType.PENGUIN_ELSE:
+                kind = TokenType.PENGUIN_IF if rank == 0 else TokenType.PENGUIN_WHAT_ABOUT
+                if header["type"] != kind:
+                    header = dict(header, type=kind)
+            result.append(header)
+            result.extend(_reorder(tokens[start + 1:end], profile))
+        position = branches[-1][1]
+    return result
+
+
+def _mutually_exclusive(conditions):
+    """
+    Checks that the conditions all compare one variable with '==' to different constants.
+    """
+    subject = None
+    constants = []
+    for condition in conditions:
+        try:
+            test = ast.parse(condition.strip(), mode="eval").body
+        except SyntaxError:
+            return False
+        if not (isinstance(test, ast.Compare) and len(test.ops) == 1 and isinstance(test.ops[0], ast.Eq)):
+            return False
+        left, right = test.left, test.comparators[0]
+        if isinstance(left, ast.Constant):
+            left, right = right, left
+        if not (isinstance(left, ast.Name) and isinstance(right, ast.Constant)):
+            return False
+        if not isinstance(right.value, _CONSTANT_TYPES) or subject not in (None, left.id):
+            return False
+        subject = left.id
+        constants.append(right.value)
+    # 1 == 1.0 == True: constants that compare equal would let two conditions hold at once
+    return len(set(constants)) == len(constants)
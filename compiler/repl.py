@@ -0,0 +1,151 @@
+"""
+Purpose:
+Implements the interactive PenguinBubble prompt ('python main.py repl'), which runs
+statements one entry at a time in a namespace that lives for the whole session.
+
+Explanation:
+- Entries: a statement that does not open a block runs as soon as it is entered. A block
+  header (penguinDo, keepWalking, penguinIf, ...) starts an entry that collects its indented
+  lines, plus any penguinWhatAbout/penguinElse that continues it, until a blank line or the
+  next unindented statement ends it.
+- Only the lines of the finished entry are compiled, with the same compiler options (and
+  optimization passes) as a file. Runtime helpers are injected into the namespace the first
+  time an entry needs them and are skipped afterwards, so dynamic_input, the penguinSay
+  buffer and the step counter keep their state, and penguinDo functions and variables
+  stay defined across entries. The names already in the namespace are passed to the
+  compiler too, so an entry does not rely on a builtin (str) that an earlier entry rebound.
+- Syntax errors are reported and the entry is dropped; run-time errors (and Ctrl+C) print
+  a traceback and the session goes on. Buffered penguinSay output is flushed after
+  every entry.
+
+Optimization passes only see the current entry, so calls to functions defined in
+earlier entries are neither inlined nor treated as pure.
+"""
+
+import traceback
+
+from compiler.analysis import BLOCK_TOKENS
+from compiler.compiler import PenguinBubbleCompiler
+from compiler.runtime import render_helpers
+from compiler.tokenizer import Tokenizer
+from compiler.tokens import TokenType
+
+PROMPT = "pg> "
+CONTINUATION_PROMPT = "... "
+
+
+class PenguinRepl:
+    def __init__(self, compiler_options=None):
+        """
+        :param compiler_options: Keyword arguments for PenguinBubbleCompiler. 'wrap_main'
+                                 and 'target' are ignored: entries must bind their
+                                 variables in the session namespace and run right away.
+        """
+        self.compiler = PenguinBubbleCompiler(**dict(compiler_options or {}, wrap_main=False, target="script"))
+        self.tokenizer = Tokenizer()
+        self.namespace = {"__name__": "__main__"}
+        self.pending = []       # lines of the entry that is still open
+        self.entries = 0        # entries run so far, used in traceback file names
+
+        exec("\n".join(render_helpers(["dynamic_input"])), self.namespace)
+        self.defined_helpers = {"dynamic_input"}
+
+    def feed(self, line):
+        """
+        Adds one line of input, running the current entry once it is complete.
+
+        :param line: A line of .pg source without its trailing newline.
+        :return: True if the entry is still open and more lines are expected.
+        """
+        token = self._token(line)
+        if not self.pending:
+            if token is None:
+                return False
+            if token["indent"] > 0:
+                print("Syntax Error: unexpected indentation at the start of a statement.")
+                return False
+            self.pending.append(line)
+            if token["type"] in BLOCK_TOKENS:
+                return True
+            self.run_pending()
+            return False
+
+        if not line.strip():
+            self.run_pending()
+            return False
+        if token is not None and token["indent"] == 0 and token["type"] not in (
+                TokenType.PENGUIN_WHAT_ABOUT, TokenType.PENGUIN_ELSE):
+            # An unindented statement ends the open block and starts the next entry
+            self.run_pending()
+            return self.feed(line)
+        self.pending.append(line)
+        return True
+
+    def run_pending(self):
+        """
+        Compiles the open entry and runs it in the session namespace.
+
+        :return: True if the entry compiled and ran without an error.
+        """
+        source = "\n".join(self.pending)
+        self.pending = []
+        if not source.strip():
+            return True
+
+        self.entries += 1
+        try:
+            program = self.compiler.compile_to_code(
+                source, filename=f"<entry {self.entries}>", skip_helpers=self.defined_helpers,
+                bound_names=set(self.namespace)
+            )
+        except SyntaxError as e:
+            # The .pg syntax is valid but the generated Python is not
+            print(f"Syntax Error: {e}")
+            return False
+        if program is None:
+            return False
+        self.defined_helpers |= self.compiler.helpers
+
+        try:
+            exec(program, self.namespace)
+        except (Exception, KeyboardInterrupt) as e:
+            # Skip the frame of this method; the traceback starts in the entry
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+            return False
+        finally:
+            flush = self.namespace.get("_penguin_flush")
+            if flush is not None:
+                flush()
+        return True
+
+    def interact(self, read=input):
+        """
+        Reads and runs entries until end of input (Ctrl+D).
+
+        :param read: Function that shows a prompt and returns one line, like input().
+        """
+        try:
+            import readline  # noqa: F401 -- line editing and history for input(), where available
+        except ImportError:
+            pass
+        print("PenguinBubble REPL. End a block with an empty line; Ctrl+D quits.")
+        while True:
+            try:
+                line = read(CONTINUATION_PROMPT if self.pending else PROMPT)
+            except EOFError:
+                self.run_pending()
+                print()
+                return
+            except KeyboardInterrupt:
+                print("\nKeyboardInterrupt")
+                self.pending = []
+                continue
+            self.feed(line)
+
+    def _token(self, line):
+        """
+        Tokenizes a single line; returns None for blank lines and lines without a statement.
+        """
+        tokens = self.tokenizer.tokenize(line)
+        return tokens[0] if tokens else None
+
@@ -0,0 +1,338 @@
+"""
+Purpose:
+Holds the Python source of the runtime helpers that the compiler injects at the top
+of generated programs.
+
+Explanation:
+- dynamic_input     -> Reads user input and converts it to int, float, or string.
+- _penguin_memoize  -> Bounded memoization decorator for pure penguinDo functions,
+                       optionally printing cache statistics to stderr at exit.
+- _penguin_say      -> Buffered replacement for print() used by the buffered output mode.
+                       '_penguin_flush' writes the buffer out; it runs before every
+                       penguinTake prompt, whenever the buffer is full, and at exit.
+- penguin_flock     -> Builds a flock (penguinFlock). Flocks are NumPy arrays when NumPy is
+                       installed and '_PenguinFlock' lists otherwise. '_PenguinFlock' follows
+                       NumPy where programs can tell the difference: the custom arithmetic
+                       operators and comparisons apply element-wise, slices and index or
+                       True/False mask lists give flocks, and using a flock of several
+                       values as a condition raises ValueError. Also defines the bulk
+                       built-ins flockSum, flockMin and flockMax.
+                       NumPy flocks use fixed-width numbers, so integer results that do not
+                       fit in 64 bits wrap around instead of growing like Python ints.
+- _penguin_profile  -> Counters and timers of the instrumented build mode. Functions are
+                       wrapped by '_penguin_profile_call(line)', which counts calls and adds up
+                       the time of the outermost active call only, so recursive calls are
+                       not timed twice (and skip the clock). With 'counted=True' the function
+                       body counts its own calls in '_penguin_calls[line][1]', and while the
+                       outermost call of a module-level function runs, its global name is
+                       bound to the function itself, so recursive calls skip the wrapper
+                       entirely. Loops add their iteration
+                       count to '_penguin_loops[line]', and counted branches (profile-guided
+                       builds) to '_penguin_branches[line]'.
+                       '_penguin_profile_start' registers the loops and branches and, at exit,
+                       prints a report sorted by cost to stderr and writes the JSON profile.
+- _penguin_budget   -> Step counter of the execution budget. Checks count a step with
+                       '_penguin_next(_penguin_steps)'; '_penguin_step()' counts one more
+                       and returns the total. '_penguin_budget_exceeded' raises
+                       PenguinBudgetExceeded with the .pg line that used up the budget.
+- _penguin_async    -> I/O and scheduling of async target programs (compiler.async_target).
+                       '_penguin_async_say' writes the text of a penguinSay to the awaitable
+                       '_penguin_write(text)'; '_penguin_async_take' writes the prompt the
+                       same way, awaits a line from '_penguin_read()' and converts it like
+                       dynamic_input. Both default to the console and are replaced per session
+                       by run_session. '_penguin_tick()' counts loop iterations and recursive
+                       calls for the periodic 'await _penguin_asyncio.sleep(0)'.
+                       '_penguin_run(main)' runs the program when the module is started directly.
+- _penguin_outline  -> '_penguin_unbound', the sentinel that stands for an unbound local variable
+                       passed to or returned from an outlined block (compiler.outline).
+
+Each helper is a list of source lines. Helpers import what they need themselves
+(inside their body or under a '_penguin_' alias) so any subset of them can be
+injected independently.
+"""
+
+DYNAMIC_INPUT = [
+    "def dynamic_input(prompt):",
+    "    inp = input(prompt)",
+    "    try:",
+    "        return int(inp)",
+    "    except ValueError:",
+    "        try:",
+    "            return float(inp)",
+    "        except ValueError:",
+    "            return inp",
+]
+
+PENGUIN_MEMOIZE = [
+    "def _penguin_memoize(maxsize, report=False):",
+    "    import atexit",
+    "    import functools",
+    "    import sys",
+    "    def decorate(func):",
+    "        cached = functools.lru_cache(maxsize=maxsize)(func)",
+    "        def wrapper(*args):",
+    "            try:",
+    "                hash(args)",
+    "            except TypeError:",
+    "                return func(*args)",
+    "            return cached(*args)",
+    "        if report:",
+    "            def print_stats():",
+    "                info = cached.cache_info()",
+    "                print(f'memoize {func.__name__}: hits={info.hits} misses={info.misses} '",
+    "                      f'size={info.currsize}/{info.maxsize}', file=sys.stderr)",
+    "            atexit.register(print_stats)",
+    "        wrapper.__name__ = func.__name__",
+    "        wrapper.cache_info = cached.cache_info",
+    "        return wrapper",
+    "    return decorate",
+]
+
+PENGUIN_SAY = [
+    "import atexit as _penguin_atexit",
+    "import sys as _penguin_sys",
+    "_penguin_buffer = []",
+    "def _penguin_flush():",
+    "    if _penguin_buffer:",
+    "        _penguin_sys.stdout.write(''.join(_penguin_buffer))",
+    "        _penguin_buffer.clear()",
+    "    _penguin_sys.stdout.flush()",
+    "def _penguin_say(value='', *more, **options):",
+    "    if more or options:",
+    "        _penguin_flush()",
+    "        print(value, *more, **options)",
+    "        return",
+    "    _penguin_buffer.append(f'{value!s}\\n')",
+    "    if len(_penguin_buffer) >= 4096:",
+    "        _penguin_flush()",
+    "_penguin_atexit.register(_penguin_flush)",
+]
+
+PENGUIN_FLOCK = [
+    "import operator as _penguin_operator",
+    "try:",
+    "    import numpy as _penguin_numpy",
+    "except ImportError:",
+    "    _penguin_numpy = None",
+    "class _PenguinFlock(list):",
+    "    def _each(self, other, op, reverse=False):",
+    "        if isinstance(other, (list, tuple)):",
+    "            if len(other) != len(self):",
+    "                raise ValueError(f'flock sizes differ: {len(self)} and {len(other)}')",
+    "            pairs = zip(other, self) if reverse else zip(self, other)",
+    "            return _PenguinFlock(op(a, b) for a, b in pairs)",
+    "        if reverse:",
+    "            return _PenguinFlock(op(other, a) for a in self)",
+    "        return _PenguinFlock(op(a, other) for a in self)",
+    "    def __add__(self, other): return self._each(other, _penguin_operator.add)",
+    "    def __radd__(self, other): return self._each(other, _penguin_operator.add, True)",
+    "    def __sub__(self, other): return self._each(other, _penguin_operator.sub)",
+    "    def __rsub__(self, other): return self._each(other, _penguin_operator.sub, True)",
+    "    def __mul__(self, other): return self._each(other, _penguin_operator.mul)",
+    "    def __rmul__(self, other): return self._each(other, _penguin_operator.mul, True)",
+    "    def __truediv__(self, other): return self._each(other, _penguin_operator.truediv)",
+    "    def __rtruediv__(self, other): return self._each(other, _penguin_operator.truediv, True)",
+    "    def __pow__(self, other): return self._each(other, _penguin_operator.pow)",
+    "    def __rpow__(self, other): return self._each(other, _penguin_operator.pow, True)",
+    "    def __floordiv__(self, other): return self._each(other, _penguin_operator.floordiv)",
+    "    def __rfloordiv__(self, other): return self._each(other, _penguin_operator.floordiv, True)",
+    "    def __mod__(self, other): return self._each(other, _penguin_operator.mod)",
+    "    def __rmod__(self, other): return self._each(other, _penguin_operator.mod, True)",
+    "    def __neg__(self): return _PenguinFlock(-a for a in self)",
+    "    def __abs__(self): return _PenguinFlock(abs(a) for a in self)",
+    "    __iadd__, __isub__, __imul__ = __add__, __sub__, __mul__",
+    "    __itruediv__, __ipow__ = __truediv__, __pow__",
+    "    __ifloordiv__, __imod__ = __floordiv__, __mod__",
+    "    def __eq__(self, other): return self._each(other, _penguin_operator.eq)",
+    "    def __ne__(self, other): return self._each(other, _penguin_operator.ne)",
+    "    def __lt__(self, other): return self._each(other, _penguin_operator.lt)",
+    "    def __le__(self, other): return self._each(other, _penguin_operator.le)",
+    "    def __gt__(self, other): return self._each(other, _penguin_operator.gt)",
+    "    def __ge__(self, other): return self._each(other, _penguin_operator.ge)",
+    "    __hash__ = None",
+    "    def __bool__(self):",
+    "        if len(self) != 1:",
+    "            raise ValueError('the truth value of a flock with more than one element is ambiguous, '",
+    "                             'use any() or all()')",
+    "        return bool(self[0])",
+    "    def __getitem__(self, index):",
+    "        if isinstance(index, slice):",
+    "            return _PenguinFlock(list.__getitem__(self, index))",
+    "        if isinstance(index, list):",
+    "            if len(index) and all(isinstance(keep, bool) for keep in index):",
+    "                if len(index) != len(self):",
+    "                    raise IndexError(f'mask of {len(index)} values for a flock of {len(self)}')",
+    "                return _PenguinFlock(a for a, keep in zip(self, index) if keep)",
+    "            return _PenguinFlock(list.__getitem__(self, i) for i in index)",
+    "        return list.__getitem__(self, index)",
+    "def penguin_flock(values=()):",
+    "    if _penguin_numpy is None:",
+    "        return _PenguinFlock(values)",
+    "    if isinstance(values, range):",
+    "        return _penguin_numpy.arange(values.start, values.stop, values.step)",
+    "    if not isinstance(values, (list, tuple, _penguin_numpy.ndarray)):",
+    "        values = list(values)",
+    "    return _penguin_numpy.array(values)",
+    "def _penguin_flock_reduce(flock, method, fallback):",
+    "    if _penguin_numpy is not None and isinstance(flock, _penguin_numpy.ndarray):",
+    "        return getattr(flock, method)().item()",
+    "    return fallback(flock)",
+    "def flockSum(flock):",
+    "    return _penguin_flock_reduce(flock, 'sum', sum)",
+    "def flockMin(flock):",
+    "    return _penguin_flock_reduce(flock, 'min', min)",
+    "def flockMax(flock):",
+    "    return _penguin_flock_reduce(flock, 'max', max)",
+]
+
+PENGUIN_PROFILE = [
+    "import atexit as _penguin_atexit",
+    "import functools as _penguin_functools",
+    "import sys as _penguin_sys",
+    "import time as _penguin_time",
+    "_penguin_calls = {}",
+    "_penguin_loops = {}",
+    "_penguin_branches = {}",
+    "def _penguin_profile_call(line, counted=False):",
+    "    def decorate(func):",
+    "        stats = _penguin_calls[line] = [func.__name__, 0, 0, 0]",
+    "        clock = _penguin_time.perf_counter_ns",
+    "        name = func.__name__",
+    "        scope = func.__globals__ if counted and func.__qualname__ == name else None",
+    "        def wrapper(*args, **kwargs):",
+    "            if not counted:",
+    "                stats[1] += 1",
+    "            if stats[3]:",
+    "                return func(*args, **kwargs)",
+    "            stats[3] = 1",
+    "            if scope is not None:",
+    "                scope[name] = func",
+    "            start = clock()",
+    "            try:",
+    "                return func(*args, **kwargs)",
+    "            finally:",
+    "                stats[2] += clock() - start",
+    "                stats[3] = 0",
+    "                if scope is not None and scope.get(name) is func:",
+    "                    scope[name] = wrapper",
+    "        return _penguin_functools.update_wrapper(wrapper, func)",
+    "    return decorate",
+    "def _penguin_profile_start(path, loops, branches=None, source=None):",
+    "    _penguin_loops.update(dict.fromkeys(loops, 0))",
+    "    _penguin_branches.update(dict.fromkeys(branches or (), 0))",
+    "    def report():",
+    "        import json",
+    "        functions = sorted(",
+    "            ({'line': line, 'name': name, 'calls': calls, 'seconds': total / 1e9}",
+    "             for line, (name, calls, total, _) in _penguin_calls.items()),",
+    "            key=lambda entry: (-entry['seconds'], entry['line']))",
+    "        loop_entries = sorted(",
+    "            ({'line': line, 'function': loops[line], 'iterations': count}",
+    "             for line, count in _penguin_loops.items()),",
+    "            key=lambda entry: (-entry['iterations'], entry['line']))",
+    "        branch_entries = [{'line': line, 'taken': count} for line, count in sorted(_penguin_branches.items())]",
+    "        err = _penguin_sys.stderr",
+    "        print('penguin profile (by .pg line)', file=err)",
+    "        for entry in functions:",
+    "            per_call = entry['seconds'] / entry['calls'] * 1e6 if entry['calls'] else 0.0",
+    "            print(f\"  line {entry['line']:>5}  penguinDo {entry['name']}: {entry['calls']} calls, \"",
+    "                  f\"{entry['seconds'] * 1e3:.3f} ms total, {per_call:.2f} us/call\", file=err)",
+    "        for entry in loop_entries:",
+    "            where = f\" in {entry['function']}\" if entry['function'] else ''",
+    "            print(f\"  line {entry['line']:>5}  keepWalking{where}: {entry['iterations']} iterations\",",
+    "                  file=err)",
+    "        for entry in branch_entries:",
+    "            print(f\"  line {entry['line']:>5}  branch taken {entry['taken']} times\", file=err)",
+    "        if path:",
+    "            data = {'functions': functions, 'loops': loop_entries}",
+    "            if branches is not None:",
+    "                data.update(branches=branch_entries, source=source)",
+    "            with open(path, 'w', encoding='utf-8') as f:",
+    "                json.dump(data, f, indent=2)",
+    "    _penguin_atexit.register(report)",
+]
+
+PENGUIN_BUDGET = [
+    "import sys as _penguin_sys",
+    "_penguin_steps = iter(range(1, _penguin_sys.maxsize))",
+    "_penguin_step = _penguin_steps.__next__",
+    "_penguin_next = next",
+    "def _penguin_reserve(limit):",
+    "    return limit + 1 - (_penguin_sys.maxsize - 1 - _penguin_steps.__length_hint__())",
+    "def _penguin_release(limit, left):",
+    "    _penguin_steps.__setstate__(limit + 1 - left)",
+    "class PenguinBudgetExceeded(RuntimeError):",
+    "    pass",
+    "def _penguin_budget_exceeded(limit, line, where):",
+    "    raise PenguinBudgetExceeded(f'step budget of {limit} exceeded at .pg line {line} ({where})')",
+]
+
+PENGUIN_ASYNC = [
+    "import asyncio as _penguin_asyncio",
+    "import itertools as _penguin_itertools",
+    "import sys as _penguin_sys",
+    "_penguin_tick = _penguin_itertools.count(1).__next__",
+    "async def _penguin_console_read():",
+    "    line = _penguin_sys.stdin.readline()",
+    "    if not line:",
+    "        raise EOFError('EOF when reading a line')",
+    "    return line.rstrip('\\n')",
+    "async def _penguin_console_write(text):",
+    "    _penguin_sys.stdout.write(text)",
+    "    _penguin_sys.stdout.flush()",
+    "_penguin_read = _penguin_console_read",
+    "_penguin_write = _penguin_console_write",
+    "async def _penguin_async_say(*values, sep=None, end=None, file=None, flush=False):",
+    "    if file is not None:",
+    "        print(*values, sep=sep, end=end, file=file, flush=flush)",
+    "        return",
+    "    text = (' ' if sep is None else sep).join(map(str, values))",
+    "    await _penguin_write(text + ('\\n' if end is None else end))",
+    "async def _penguin_async_take(prompt=''):",
+    "    if prompt:",
+    "        await _penguin_write(str(prompt))",
+    "    inp = await _penguin_read()",
+    "    try:",
+    "        return int(inp)",
+    "    except ValueError:",
+    "        try:",
+    "            return float(inp)",
+    "        except ValueError:",
+    "            return inp",
+    "def _penguin_run(main):",
+    "    _penguin_asyncio.run(main())",
+]
+
+PENGUIN_OUTLINE = [
+    "_penguin_unbound = object()",
+]
+
+# Helpers in the order they are emitted
+RUNTIME_HELPERS = {
+    "dynamic_input": DYNAMIC_INPUT,
+    "_penguin_memoize": PENGUIN_MEMOIZE,
+    "_penguin_say": PENGUIN_SAY,
+    "penguin_flock": PENGUIN_FLOCK,
+    "_penguin_profile": PENGUIN_PROFILE,
+    "_penguin_budget": PENGUIN_BUDGET,
+    "_penguin_async": PENGUIN_ASYNC,
+    "_penguin_outline": PENGUIN_OUTLINE,
+}
+
+
+def render_helpers(names, blank_lines=True):
+    """
+    Returns the source lines of the requested helpers, each followed by a blank line.
+
+    :param names: Iterable of helper names from RUNTIME_HELPERS.
+    :param blank_lines: Separate the helpers with blank lines (leave them out for minimal output).
+    :return: A list of Python source lines.
+    """
+    wanted = set(names)
+    lines = []
+    for name, source in RUNTIME_HELPERS.items():
+        if name in wanted:
+            lines.extend(source)
+            if blank_lines:
+                lines.append("")
+    return lines
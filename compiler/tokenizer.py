@@ -7,22 +7,42 @@ Key Points:
 - No external libraries are used (like re).
 - The tokenizer identifies specific commands and translates them into tokenized
   representations with associated metadata like indentation level and line number.
+- Every line is tokenized on its own, so huge sources can be split into chunks at
+  indent-0 statements and tokenized in parallel worker processes (tokenize_parallel).
+  Small sources, and machines with too few CPUs, are tokenized in this process instead.
+- For the same reason an edit only needs the edited lines to be rescanned (retokenize).
 """
 
+import bisect
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 from compiler.tokens import TokenType
 
+# When tokenize_parallel uses worker processes. Measured with
+# benchmarks/bench_parallel_tokenize.py: tokenize takes about 60 ns per character, the
+# workers spend about 25 ns more pickling their tokens, the parent about 15 ns unpickling
+# them, and starting the pool takes about 15 ms. So 2 workers at best break even, and 3
+# or more only win on sources of about 1,000,000 characters and up.
+PARALLEL_MIN_SIZE = 1000000
+PARALLEL_MIN_WORKERS = 3
+
 class Tokenizer:
     def __init__(self):
         pass  # No initialization needed for now
 
-    def tokenize(self, code):
+    def tokenize(self, code, start_index=0):
         """
         Converts the input code string into a list of tokens. Each token is represented
         as a dictionary containing the type, value, indentation level, and line index.
+
+        :param code: The .pg source code.
+        :param start_index: Number of non-empty lines that precede 'code' in the full source,
+                            so line indices of a chunk match those of the whole file.
         """
         tokens = []
         lines = code.split("\n")
-        index = 0
+        index = start_index
 
         for ln in lines:
             line = ln.rstrip()
@@ -170,6 +190,45 @@ class Tokenizer:
                     "index": index
                 })
 
+            # -------------------------------------------------------
+            # Tokenize penguinFlock command
+            # Example: penguinFlock(scores) [3, 5, 8]
+            # -------------------------------------------------------
+            elif upper_line.startswith("PENGUINFLOCK"):
+                paren_open = stripped_line.find("(")
+                paren_close = stripped_line.find(")")
+
+                # Validate parentheses
+                if paren_open == -1 or paren_close == -1 or paren_close < paren_open:
+                    continue
+
+                tokens.append({
+                    "type": TokenType.PENGUIN_FLOCK,
+                    "name": stripped_line[paren_open + 1:paren_close].strip(),
+                    "value": stripped_line[paren_close + 1:].strip(),
+                    "indent": current_ident,
+                    "index": index
+                })
+
+            # -------------------------------------------------------
+            # Tokenize penguinBring command
+            # Example: penguinBring(geometry)
+            # -------------------------------------------------------
+            elif upper_line.startswith("PENGUINBRING"):
+                paren_open = stripped_line.find("(")
+                paren_close = stripped_line.find(")")
+
+                # Validate parentheses
+                if paren_open == -1 or paren_close == -1 or paren_close < paren_open:
+                    continue
+
+                tokens.append({
+                    "type": TokenType.PENGUIN_BRING,
+                    "name": stripped_line[paren_open + 1:paren_close].strip(),
+                    "indent": current_ident,
+                    "index": index
+                })
+
             # -------------------------------------------------------
             # Tokenize iceBucket command
             # Example: iceBucket value
@@ -185,6 +244,145 @@ class Tokenizer:
 
         return tokens
 
+    def tokenize_parallel(self, code, workers, chunks_per_worker=4, min_size=PARALLEL_MIN_SIZE):
+        """
+        Tokenizes a large source in a pool of worker processes.
+
+        The source is split into about 'workers * chunks_per_worker' chunks. Chunks only
+        end right before an indent-0 statement, so no block is cut in half, and each chunk
+        gets the number of non-empty lines before it as its start index. The result is
+        identical to tokenize(code).
+
+        'workers' is capped at the CPU count. With fewer than PARALLEL_MIN_WORKERS workers
+        left (on a single-CPU machine, for one), or for sources shorter than 'min_size'
+        characters, the source is tokenized in this process instead.
+
+        :param code: The .pg source code.
+        :param workers: Number of worker processes.
+        :param chunks_per_worker: Chunks handed to each worker, to balance uneven chunks.
+        :param min_size: Smallest source, in characters, worth sending to worker processes.
+        :return: The list of tokens.
+        """
+        workers = min(workers, os.cpu_count() or 1)
+        if workers < PARALLEL_MIN_WORKERS or len(code) < min_size:
+            return self.tokenize(code)
+        return self._tokenize_in_pool(code, workers, chunks_per_worker)
+
+    def _tokenize_in_pool(self, code, workers, chunks_per_worker):
+        """
+        Splits a source into chunks and tokenizes them in 'workers' processes, whatever
+        the source size and CPU count (see tokenize_parallel).
+        """
+        lines = code.split("\n")
+        jobs = []
+        start_index = 0
+        for start, end in self._chunk_bounds(lines, workers * chunks_per_worker):
+            chunk = lines[start:end]
+            jobs.append(("\n".join(chunk), start_index))
+            start_index += sum(1 for ln in chunk if ln and not ln.isspace())
+
+        if workers <= 1 or len(jobs) <= 1:
+            return self.tokenize(code)
+
+        tokens = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk_tokens in pool.map(_tokenize_chunk, jobs):
+                tokens.extend(chunk_tokens)
+        return tokens
+
+    def line_counts(self, code):
+        """
+        Counts the non-empty lines up to every physical line of a source, so retokenize can
+        take edits in physical line numbers.
+
+        :param code: The .pg source code.
+        :return: A list with one entry more than 'code' has lines: entry k is the number of
+                 non-empty lines among the first k lines (entry 0 is always 0).
+        """
+        counts = [0]
+        for ln in code.split("\n"):
+            counts.append(counts[-1] + (1 if ln.strip() else 0))
+        return counts
+
+    def retokenize(self, tokens, edit, line_counts=None):
+        """
+        Updates the tokens of a source in place after some of its lines changed, for editors
+        that retokenize on every keystroke.
+
+        Only the new text of the edited lines is scanned. Tokens before the edit are left
+        alone, and tokens after it keep their dictionaries: only their 'index' is shifted,
+        and only when the edit changed the number of non-empty lines. The result is
+        identical to tokenizing the edited source from scratch.
+
+        :param tokens: Tokens of the source before the edit, as returned by tokenize.
+                       The list and the tokens after the edit are modified.
+        :param edit: A dict describing the edit: the lines "first" to "last" (inclusive) were
+                     replaced by "text" (split at newlines, like tokenize does). Use
+                     last = first - 1 to insert lines before line "first".
+                     "first" and "last" are in 'index' numbering (non-empty lines, starting
+                     at 1). With "first_line" and "last_line" instead, they are physical line
+                     numbers of the source (starting at 1), which also lets an edit add or
+                     remove blank lines; this needs 'line_counts'.
+        :param line_counts: The line_counts of the source before the edit, required for
+                            physical line numbers. Updated in place to match the edited source.
+        :return: The updated token list (the same list object).
+        :raises ValueError: If the line range is invalid.
+        """
+        text = edit["text"]
+        if "first_line" in edit:
+            if line_counts is None:
+                raise ValueError("An edit in physical line numbers needs the line_counts of the source.")
+            first_line, last_line = edit["first_line"], edit["last_line"]
+            if first_line < 1 or last_line < first_line - 1 or last_line >= len(line_counts):
+                raise ValueError(f"Invalid line range {first_line}..{last_line} in edit.")
+            first, last = line_counts[first_line - 1] + 1, line_counts[last_line]
+        else:
+            first, last = edit["first"], edit["last"]
+        if first < 1 or last < first - 1:
+            raise ValueError(f"Invalid line range {first}..{last} in edit.")
+
+        # Tokens are ordered by index, so the edited range is found by bisection
+        start = bisect.bisect_left(tokens, first, key=lambda token: token["index"])
+        end = bisect.bisect_right(tokens, last, start, key=lambda token: token["index"])
+
+        replaced = self.tokenize(text, start_index=first - 1)
+        shift = sum(1 for ln in text.split("\n") if ln.strip()) - (last - first + 1)
+
+        tokens[start:end] = replaced
+        if shift:
+            for position in range(start + len(replaced), len(tokens)):
+                tokens[position]["index"] += shift
+
+        if "first_line" in edit:
+            counts = self.line_counts(text)
+            line_counts[first_line:last_line + 1] = [count + first - 1 for count in counts[1:]]
+            if shift:
+                for position in range(first_line + len(counts) - 1, len(line_counts)):
+                    line_counts[position] += shift
+        return tokens
+
+    def _chunk_bounds(self, lines, chunk_count):
+        """
+        Splits the line list into at most 'chunk_count' (start, end) ranges of similar size.
+        Every range after the first starts at a non-empty line without indentation.
+        """
+        target = max(1, len(lines) // max(1, chunk_count))
+        bounds = []
+        start = 0
+        while start < len(lines):
+            end = min(start + target, len(lines))
+            while end < len(lines) and not self._starts_statement(lines[end]):
+                end += 1
+            bounds.append((start, end))
+            start = end
+        return bounds
+
+    def _starts_statement(self, line):
+        """
+        Tells whether a line is a non-empty line at indentation level 0.
+        """
+        return bool(line) and not line[0].isspace()
+
     def _extract_function_def(self, header_str):
         """
         Helper function to extract function name and parameters from a header string.
@@ -211,3 +409,13 @@ class Tokenizer:
                     params = ", ".join(parts[1:])
 
         return name, params
+
+
+def _tokenize_chunk(job):
+    """
+    Worker entry point for Tokenizer.tokenize_parallel.
+
+    :param job: A (chunk source, start index) tuple.
+    """
+    code, start_index = job
+    return Tokenizer().tokenize(code, start_index)
@@ -18,4 +18,13 @@ class TokenType:
     PENGUIN_BOOST = "penguinBoost"         
     GIVE_PENGUINS = "givePenguins"         
     SNOWBALL = "snowball"                  
-    ICE_BUCKET= "iceBucket"
\ No newline at end of file
+    ICE_BUCKET= "iceBucket"
+
+    # Collections
+    PENGUIN_FLOCK = "penguinFlock"
+
+    # Modules
+    PENGUIN_BRING = "penguinBring"
+
+    # Compiler-internal tokens (produced by optimization passes, never by the Tokenizer)
+    CONTINUE_WALKING = "continueWalking"
@@ -35,18 +35,18 @@ while (True):
     num2 = dynamic_input("Enter the second number: ")
     if (choice == 1):
         result = addOperation(num1, num2)
-        print("Result: " + str(result))
+        print(f'Result: {result!s}')
     elif (choice == 2):
         result = subOperation(num1, num2)
-        print("Result: " + str(result))
+        print(f'Result: {result!s}')
     elif (choice == 3):
         result = mulOperation(num1, num2)
-        print("Result: " + str(result))
+        print(f'Result: {result!s}')
     elif (choice == 4):
         result = divOperation(num1, num2)
-        print("Result: " + str(result))
+        print(f'Result: {result!s}')
     elif (choice == 5):
         result = powOperation(num1, num2)
-        print("Result: " + str(result))
+        print(f'Result: {result!s}')
     else : 
         print("Invalid choice. Please try again.")
\ No newline at end of file
@@ -25,10 +25,10 @@ while (True):
     if (choice == 1):
         temp = dynamic_input("Enter temperature in Celsius: ")
         result = celsiusToFahrenheit(temp)
-        print(str(temp) + "°C is " + str(result) + "°F")
+        print(f'{temp!s}°C is {result!s}°F')
     elif (choice == 2):
         temp = dynamic_input("Enter temperature in Fahrenheit: ")
         result = fahrenheitToCelsius(temp)
-        print(str(temp) + "°F is " + str(result) + "°C")
+        print(f'{temp!s}°F is {result!s}°C')
     else : 
         print("Invalid choice! Try again.")
\ No newline at end of file
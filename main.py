@@ -11,6 +11,65 @@ Explanation:
   - source_file: Path to the .pg file to compile.
   - -o / --output: Optional argument to specify the output .py file.
     Defaults to the same basename as the input but with a .py extension.
+  - --no-tail-calls: Keeps self tail calls as real recursion instead of loops.
+  - --inline: Inlines calls to small single-returnIce penguinDo functions.
+    --inline-threshold sets the largest returned expression that gets inlined.
+  - --hoist-invariants: Moves loop-invariant work out of keepWalking loops.
+  - --strength-reduction: Replaces small int powers and divisions by powers of two with
+    multiplications wherever the result is exactly the same.
+  - --local-aliases: Binds the builtins and functions that penguinDo loops call to local
+    aliases at function entry (functions whose loops hold at least --alias-threshold statements).
+  - --buffered-output: Buffers penguinSay output and writes it in large chunks.
+  - --memoize: Wraps pure penguinDo functions in a bounded memoization cache.
+    --memo-size sets the cache size and --memo-stats prints cache statistics at exit.
+  - --backend: "source" (default) generates Python text; "ast" builds Python ast nodes.
+  - --target async: Generates an asyncio coroutine instead of a script (compiler.async_target):
+    penguinTake and penguinSay await an input source and an output sink, and loops give other
+    programs a turn every --yield-every iterations. compiler.async_target.run_session runs
+    many such programs in one event loop, each in its own namespace.
+  - --outline-depth N: Moves blocks nested deeper than N levels into generated helper functions
+    (compiler.outline), so deeply nested programs stay within Python's nesting limits.
+    Defaults to 16; 0 turns outlining off.
+  - --tokenize-workers: Tokenizes sources larger than --parallel-threshold characters
+    in that many worker processes (at most one per CPU; fewer than 3 tokenize serially).
+  - --instrument: Adds call counters, timers and loop counters keyed by .pg line. The compiled
+    program prints a report sorted by cost to stderr at exit and writes a JSON profile
+    (--profile-output, default <source_file>.profile.json).
+  - --pgo-collect / --pgo-use PROFILE: Profile-guided optimization. --pgo-collect builds an
+    instrumented program that also counts how often each branch is taken; running it on
+    typical input writes the profile. --pgo-use builds the same source with that profile:
+    functions called at least --pgo-hot-calls times are inlined or memoized, and the most
+    frequent branch of a penguinIf/penguinWhatAbout chain is tested first.
+  - --step-budget N: Stops the compiled program with PenguinBudgetExceeded once it has run
+    N loop iterations and recursive penguinDo calls; the error names the .pg line.
+  - --wrap-main: Runs the top-level statements inside a generated function, so the
+    variables of the main program are fast locals (variables that penguinDo functions use
+    stay global). 'build' only wraps the modules that no other module brings in.
+  - --minimal-output: Leaves blank lines out of the generated Python file.
+  - --run: Executes the compiled program right away instead of writing a .py file.
+    With the ast backend no Python source is generated at all.
+- Multi-file programs (python main.py build <entry.pg> ...):
+  - Builds the entry files and every module they bring in with penguinBring, using
+    compiler.build.ProjectBuilder. Independent modules compile in parallel (-j / --jobs),
+    and modules whose source and dependencies are unchanged since the last build are
+    skipped, based on the manifest (--manifest, default .penguin_build.json).
+  - --root sets the directory module names are resolved against; --force rebuilds everything.
+  - Accepts the same compiler options as single-file compilation.
+- Batch compilation on many machines (python main.py coordinator <files or directories> ...):
+  - compiler.batch.BatchCoordinator hands the .pg files out over TCP (--bind, default
+    127.0.0.1:7373) to worker processes: --local-workers on this machine, plus any started
+    elsewhere with 'python main.py worker HOST:PORT -j N'. Workers pull batches of
+    --batch-size files and steal work from busy workers once the queue is empty.
+  - Files held by a worker that dies (or is silent for --worker-timeout seconds) are handed
+    out again, up to --max-attempts times.
+  - The outcome of every file is written to --results (default batch_results.json);
+    --output-dir also stores the generated .py files.
+  - Accepts the same compiler options as single-file compilation; workers use the
+    coordinator's options.
+- Interactive prompt (python main.py repl):
+  - Runs statements one entry at a time with compiler.repl.PenguinRepl; a block runs once
+    it is closed by an empty line. Functions and variables stay defined across entries.
+  - Accepts the same compiler options as single-file compilation.
 - File Validation:
   - Checks if the file exists and ends with '.pg'.
 - Compilation Process:
@@ -23,9 +82,387 @@ Explanation:
 
 import argparse
 import os
+import sys
+from compiler.batch import DEFAULT_PORT, BatchCoordinator, parse_address, start_local_workers
+from compiler.build import BuildError, ProjectBuilder
 from compiler.compiler import PenguinBubbleCompiler
+from compiler.repl import PenguinRepl
+
+def add_compiler_arguments(parser):
+    """
+    Adds the options shared by single-file compilation and 'build' to an argument parser.
+    """
+    parser.add_argument(
+        '--no-tail-calls',
+        action='store_true',
+        help='Keep self tail calls in penguinDo functions as real recursion.'
+    )
+    parser.add_argument(
+        '--inline',
+        action='store_true',
+        help='Replace calls to small single-returnIce penguinDo functions with their expression.'
+    )
+    parser.add_argument(
+        '--inline-threshold',
+        type=int,
+        default=10,
+        help='Largest returned expression (in expression nodes) that gets inlined. Defaults to 10.'
+    )
+    parser.add_argument(
+        '--hoist-invariants',
+        action='store_true',
+        help='Move loop-invariant assignments and subexpressions out of side-effect-free keepWalking loops.'
+    )
+    parser.add_argument(
+        '--strength-reduction',
+        action='store_true',
+        help='Turn int powers such as n snowball 2 into multiplications and divisions by powers of two '
+             'into multiplications, wherever the result is exactly the same.'
+    )
+    parser.add_argument(
+        '--local-aliases',
+        action='store_true',
+        help='Look up the builtins and functions that penguinDo loops call once per call instead of once per use.'
+    )
+    parser.add_argument(
+        '--alias-threshold',
+        type=int,
+        default=3,
+        help='Fewest statements inside the loops of a function for --local-aliases to apply. Defaults to 3.'
+    )
+    parser.add_argument(
+        '--buffered-output',
+        action='store_true',
+        help='Buffer penguinSay output; it is flushed in large chunks, before every penguinTake prompt, and at exit.'
+    )
+    parser.add_argument(
+        '--backend',
+        choices=['source', 'ast'],
+        default='source',
+        help='Code generation backend: Python source text (default) or Python ast nodes.'
+    )
+    parser.add_argument(
+        '--target',
+        choices=['script', 'async'],
+        default='script',
+        help='Program form: a regular script (default) or an asyncio coroutine whose input and '
+             'output are awaited, for running many programs in one event loop.'
+    )
+    parser.add_argument(
+        '--yield-every',
+        type=int,
+        default=1000,
+        help='Async target: loop iterations and recursive calls between two turns given to other '
+             'programs. Defaults to 1000.'
+    )
+    parser.add_argument(
+        '--outline-depth',
+        type=int,
+        default=16,
+        help='Deepest block nesting kept in place; deeper blocks are moved into generated helper '
+             'functions so the Python output still compiles. 0 keeps every block in place. Defaults to 16.'
+    )
+    parser.add_argument(
+        '--tokenize-workers',
+        type=int,
+        default=1,
+        help='Worker processes used to tokenize large sources. Defaults to 1 (no parallelism).'
+    )
+    parser.add_argument(
+        '--parallel-threshold',
+        type=int,
+        default=1000000,
+        help='Source size in characters from which tokenization runs in parallel. Defaults to 1000000.'
+    )
+    parser.add_argument(
+        '--instrument',
+        action='store_true',
+        help='Count calls, time and loop iterations per .pg line; report them to stderr at exit.'
+    )
+    parser.add_argument(
+        '--profile-output',
+        default=None,
+        help='JSON profile written by an instrumented program. Defaults to <source_file>.profile.json '
+             '(no JSON file for build).'
+    )
+    parser.add_argument(
+        '--pgo-collect',
+        action='store_true',
+        help='Build an instrumented program that records the profile used by --pgo-use '
+             '(calls, loop iterations and branches taken, per .pg line).'
+    )
+    parser.add_argument(
+        '--pgo-use',
+        default=None,
+        metavar='PROFILE',
+        help='Optimize with the profile written by a --pgo-collect build of the same source.'
+    )
+    parser.add_argument(
+        '--pgo-hot-calls',
+        type=int,
+        default=1000,
+        help='Fewest profiled calls for a function to be inlined or memoized with --pgo-use. '
+             'Defaults to 1000.'
+    )
+    parser.add_argument(
+        '--step-budget',
+        type=int,
+        default=None,
+        help='Stop the compiled program once it has run this many loop iterations and recursive '
+             'penguinDo calls. No limit by default.'
+    )
+    parser.add_argument(
+        '--wrap-main',
+        action='store_true',
+        help='Run the top-level statements inside a generated function so their variables are fast locals.'
+    )
+    parser.add_argument(
+        '--minimal-output',
+        action='store_true',
+        help='Leave blank lines out of the generated Python code, for the smallest possible modules.'
+    )
+    parser.add_argument(
+        '--memoize',
+        action='store_true',
+        help='Cache the results of pure penguinDo functions (no penguinSay, penguinTake, or global access).'
+    )
+    parser.add_argument(
+        '--memo-size',
+        type=int,
+        default=1024,
+        help='Maximum number of cached results per memoized function. Defaults to 1024.'
+    )
+    parser.add_argument(
+        '--memo-stats',
+        action='store_true',
+        help='Print memoization cache statistics to stderr when the compiled program exits.'
+    )
+
+
+def compiler_options(args):
+    """
+    Turns parsed command-line options into PenguinBubbleCompiler keyword arguments.
+    """
+    return {
+        "tail_calls": not args.no_tail_calls,
+        "inline": args.inline,
+        "inline_threshold": args.inline_threshold,
+        "memoize": args.memoize,
+        "memo_cache_size": args.memo_size,
+        "memo_stats": args.memo_stats,
+        "hoist_invariants": args.hoist_invariants,
+        "strength_reduction": args.strength_reduction,
+        "local_aliases": args.local_aliases,
+        "alias_threshold": args.alias_threshold,
+        "buffered_output": args.buffered_output,
+        "backend": args.backend,
+        "target": args.target,
+        "yield_every": args.yield_every,
+        "outline_depth": args.outline_depth or None,
+        "tokenize_workers": args.tokenize_workers,
+        "parallel_threshold": args.parallel_threshold,
+        "instrument": args.instrument,
+        "profile_path": args.profile_output,
+        "pgo_collect": args.pgo_collect,
+        "pgo_profile": args.pgo_use,
+        "pgo_hot_calls": args.pgo_hot_calls,
+        "step_budget": args.step_budget,
+        "wrap_main": args.wrap_main,
+        "minimal_output": args.minimal_output,
+    }
+
+
+def build_main(argv):
+    """
+    Entry point of 'main.py build': builds a multi-file program and the modules it brings in.
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py build",
+        description="Build .pg programs and every module they bring in with penguinBring."
+    )
+    parser.add_argument(
+        'entry_files',
+        nargs='+',
+        help='Paths of the .pg programs to build.'
+    )
+    parser.add_argument(
+        '--root',
+        default=None,
+        help='Directory that module names are resolved against. Defaults to the directory of the first entry file.'
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=None,
+        help='Worker processes used to compile modules. Defaults to the number of CPUs.'
+    )
+    parser.add_argument(
+        '--manifest',
+        default=None,
+        help='Path of the build manifest. Defaults to .penguin_build.json in the root directory.'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Rebuild every module, even if it is up to date.'
+    )
+    add_compiler_arguments(parser)
+
+    args = parser.parse_args(argv)
+
+    root = args.root or os.path.dirname(os.path.abspath(args.entry_files[0]))
+    builder = ProjectBuilder(
+        root,
+        compiler_options=compiler_options(args),
+        jobs=args.jobs,
+        manifest_path=args.manifest
+    )
+    try:
+        result = builder.build(args.entry_files, force=args.force)
+    except BuildError as e:
+        print(f"Build Error: {e}")
+        return 1
+
+    for name in result["failed"]:
+        print(f"Error in module '{name}': {result['errors'][name]}")
+    for name in result["blocked"]:
+        print(f"Skipped module '{name}': a module it brings in failed to compile.")
+    print(f"Built {len(result['built'])} module(s), {len(result['up_to_date'])} up to date.")
+    return 1 if result["failed"] else 0
+
+
+def coordinator_main(argv):
+    """
+    Entry point of 'main.py coordinator': compiles a batch of .pg files on worker processes.
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py coordinator",
+        description="Compile and validate many .pg files on local and remote worker processes."
+    )
+    parser.add_argument(
+        'paths',
+        nargs='+',
+        help='The .pg files, and directories searched recursively for .pg files.'
+    )
+    parser.add_argument(
+        '--bind',
+        default=f'127.0.0.1:{DEFAULT_PORT}',
+        help=f'Address workers connect to, as HOST:PORT. Defaults to 127.0.0.1:{DEFAULT_PORT}; '
+             f'use 0.0.0.0:PORT to accept workers on other machines.'
+    )
+    parser.add_argument(
+        '--local-workers',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Worker processes started on this machine. Defaults to the number of CPUs.'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=16,
+        help='Largest number of files handed to a worker at once. Defaults to 16.'
+    )
+    parser.add_argument(
+        '--max-attempts',
+        type=int,
+        default=3,
+        help='Times a file is handed out again after its worker died. Defaults to 3.'
+    )
+    parser.add_argument(
+        '--worker-timeout',
+        type=float,
+        default=300.0,
+        help='Seconds without a message after which a worker counts as dead. Defaults to 300.'
+    )
+    parser.add_argument(
+        '--results',
+        default='batch_results.json',
+        help='Path of the results manifest. Defaults to batch_results.json.'
+    )
+    parser.add_argument(
+        '--output-dir',
+        default=None,
+        help='Directory the generated .py files are written to. By default only outcomes are kept.'
+    )
+    add_compiler_arguments(parser)
+
+    args = parser.parse_args(argv)
+
+    coordinator = BatchCoordinator(
+        args.paths,
+        compiler_options=compiler_options(args),
+        address=parse_address(args.bind),
+        batch_size=args.batch_size,
+        max_attempts=args.max_attempts,
+        worker_timeout=args.worker_timeout,
+        output_dir=args.output_dir
+    )
+    host, port = coordinator.start()
+    print(f"Compiling {len(coordinator.files)} file(s); workers connect to {host}:{port}.")
+    summary = coordinator.run(local_workers=args.local_workers, manifest_path=args.results)
+
+    for status in ("failed", "lost"):
+        for path in summary[status]:
+            print(f"{status.capitalize()}: {path}: {summary['files'][path]['messages']}")
+    print(f"{len(summary['ok'])} ok, {len(summary['failed'])} failed, {len(summary['lost'])} lost. "
+          f"Results written to '{args.results}'.")
+    return 1 if summary["failed"] or summary["lost"] else 0
+
+
+def worker_main(argv):
+    """
+    Entry point of 'main.py worker': compiles files handed out by a coordinator.
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py worker",
+        description="Compile .pg files for a 'main.py coordinator' running on this or another machine."
+    )
+    parser.add_argument(
+        'coordinator',
+        help='Address of the coordinator, as HOST:PORT.'
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Worker processes to start. Defaults to the number of CPUs.'
+    )
+
+    args = parser.parse_args(argv)
+    host, port = parse_address(args.coordinator)
+    for process in start_local_workers(host, port, args.jobs):
+        process.join()
+    return 0
+
+
+def repl_main(argv):
+    """
+    Entry point of 'main.py repl': runs PenguinBubble statements interactively.
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py repl",
+        description="Run PenguinBubble statements one at a time."
+    )
+    add_compiler_arguments(parser)
+
+    args = parser.parse_args(argv)
+    PenguinRepl(compiler_options(args)).interact()
+    return 0
+
 
 def main():
+    # 'main.py build ...' builds multi-file programs, 'main.py coordinator' / 'main.py worker'
+    # compile batches on many machines, 'main.py repl' starts the interactive prompt;
+    # anything else compiles a single file
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        return build_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "coordinator":
+        return coordinator_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "worker":
+        return worker_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "repl":
+        return repl_main(sys.argv[2:])
+
     parser = argparse.ArgumentParser(
         description="PenguinBubbleCompiler: Compile .pg files into Python code."
     )
@@ -38,6 +475,12 @@ def main():
         help='Path to the output Python file. Defaults to <source_file>.py',
         default=None
     )
+    parser.add_argument(
+        '--run',
+        action='store_true',
+        help='Run the compiled program instead of writing it to a .py file.'
+    )
+    add_compiler_arguments(parser)
 
     args = parser.parse_args()
 
@@ -63,7 +506,24 @@ def main():
         code = f.read()
 
     # 5) Compile the source code
-    compiler = PenguinBubbleCompiler()
+    options = compiler_options(args)
+    if (args.instrument or args.pgo_collect) and options["profile_path"] is None:
+        options["profile_path"] = os.path.splitext(source_file)[0] + '.profile.json'
+    try:
+        compiler = PenguinBubbleCompiler(**options)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return
+
+    # 5b) Run the program directly; no .py file is written
+    if args.run:
+        program = compiler.compile_to_code(code, filename=source_file)
+        if program is not None:
+            # Let penguinBring find the compiled modules next to the program
+            sys.path.insert(0, os.path.dirname(os.path.abspath(source_file)))
+            exec(program, {"__name__": "__main__"})
+        return
+
     compiled_code = compiler.compile(code)
 
     # 6) Write the compiled Python code to the output file
@@ -73,4 +533,4 @@ def main():
     print(f"Compilation successful! Output written to '{output_file}'.")
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
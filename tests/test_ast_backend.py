@@ -0,0 +1,106 @@
+#Purpose:
+# Tests the ast backend, which builds Python ast nodes directly from tokens.
+
+"""
+Explanation:
+
+Test Cases:
+
+test_matches_source_backend: Both backends produce the same Python program for the example files.
+test_line_numbers_follow_pg_lines: Every statement carries the .pg line index of its token.
+test_if_chain: penguinWhatAbout and penguinElse extend the preceding penguinIf.
+test_dangling_else_rejected: A penguinElse without a penguinIf is a syntax error at build time.
+test_empty_block_rejected: A block header without statements is a syntax error at build time.
+test_compile_to_code_runs: compile_to_code returns a code object whose tracebacks point at .pg lines.
+"""
+
+import ast
+import contextlib
+import io
+import os
+import traceback
+import unittest
+from compiler.tokenizer import Tokenizer
+from compiler.ast_backend import AstGenerator
+from compiler.compiler import PenguinBubbleCompiler
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples")
+
+
+class TestAstBackend(unittest.TestCase):
+    def setUp(self):
+        self.tokenizer = Tokenizer()
+        self.generator = AstGenerator()
+
+    def compile_quietly(self, compiler, code):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return compiler.compile(code)
+
+    def test_matches_source_backend(self):
+        for name in ("calculator.pg", "temp_converter.pg"):
+            with open(os.path.join(EXAMPLES, name), encoding="utf-8") as f:
+                code = f.read()
+            for options in ({}, {"buffered_output": True, "memoize": True, "inline": True, "instrument": True}):
+                source = self.compile_quietly(PenguinBubbleCompiler(**options), code)
+                unparsed = self.compile_quietly(PenguinBubbleCompiler(backend="ast", **options), code)
+                self.assertEqual(ast.dump(ast.parse(source)), ast.dump(ast.parse(unparsed)))
+
+    def test_line_numbers_follow_pg_lines(self):
+        tokens = self.tokenizer.tokenize("""
+penguinSay "start"
+
+penguinDo(double)(x)
+    returnIce x penguinBoost 2
+iceBucket y = double(4)
+""")
+        module = self.generator.compile_tokens(tokens)
+        self.assertEqual([statement.lineno for statement in module.body], [1, 2, 4])
+        self.assertEqual(module.body[1].body[0].lineno, 3)
+
+    def test_if_chain(self):
+        tokens = self.tokenizer.tokenize("""
+penguinIf(x == 1)
+    penguinSay "one"
+penguinWhatAbout(x == 2)
+    penguinSay "two"
+penguinElse
+    penguinSay "many"
+""")
+        module = self.generator.compile_tokens(tokens)
+        self.assertEqual(len(module.body), 1)
+        self.assertEqual(
+            ast.unparse(module),
+            "if x == 1:\n    print('one')\nelif x == 2:\n    print('two')\nelse:\n    print('many')"
+        )
+
+    def test_dangling_else_rejected(self):
+        tokens = self.tokenizer.tokenize('penguinSay "hi"\npenguinElse\n    penguinSay "no"')
+        with self.assertRaises(SyntaxError) as context:
+            self.generator.compile_tokens(tokens)
+        self.assertIn("line 2", str(context.exception))
+
+    def test_empty_block_rejected(self):
+        tokens = self.tokenizer.tokenize('keepWalking(True)\npenguinSay "done"')
+        with self.assertRaises(SyntaxError) as context:
+            self.generator.compile_tokens(tokens)
+        self.assertIn("expected an indented block", str(context.exception))
+
+    def test_compile_to_code_runs(self):
+        compiler = PenguinBubbleCompiler(backend="ast")
+        with contextlib.redirect_stdout(io.StringIO()):
+            program = compiler.compile_to_code(
+                'penguinSay "hello"\n\niceBucket broken = 1 givePenguins 0\n', filename="demo.pg"
+            )
+        stdout = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(stdout):
+                exec(program, {"__name__": "__main__"})
+        except ZeroDivisionError as e:
+            frame = traceback.extract_tb(e.__traceback__)[-1]
+        else:
+            self.fail("ZeroDivisionError not raised")
+        self.assertEqual(stdout.getvalue(), "hello\n")
+        self.assertEqual((frame.filename, frame.lineno), ("demo.pg", 2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+#Purpose:
+# Tests the async target, which compiles programs to asyncio coroutines.
+
+"""
+Explanation:
+Sessions run in one event loop with asyncio.run; their input comes from lists of answers
+and their output is collected in lists.
+
+Test Cases:
+
+test_async_functions: Functions that say, take, loop or recurse, and their callers, become coroutines.
+test_generated_program: Coroutine calls are awaited, I/O goes through the async helpers, main is a coroutine.
+test_sessions: Many sessions run concurrently, each with its own input, output and globals.
+test_loops_yield: A busy loop gives other tasks of the event loop a turn.
+test_ast_backend: The ast backend builds the same coroutine program.
+test_rejected_programs: penguinBring, instrumentation and async functions that cannot be awaited are rejected.
+"""
+
+import asyncio
+import contextlib
+import io
+import unittest
+from compiler.async_target import AsyncTarget, run_session
+from compiler.compiler import PenguinBubbleCompiler
+from compiler.tokenizer import Tokenizer
+
+PROGRAM = """
+penguinDo(fib)(n)
+    penguinIf(n < 2)
+        returnIce n
+    returnIce fib(n slideDown 1) slideUp fib(n slideDown 2)
+
+penguinDo(square)(x)
+    returnIce x penguinBoost x
+
+penguinDo(ask)(label)
+    penguinTake(value) label
+    returnIce value
+
+penguinDo(twice)(label)
+    returnIce ask(label) penguinBoost 2
+
+iceBucket count = 0
+penguinTake(name) "Name? "
+iceBucket n = twice("Number? ")
+keepWalking(count < n)
+    iceBucket count = count slideUp 1
+penguinSay "Hi " + str(name), square(count), fib(10)
+"""
+
+BUSY = """
+iceBucket i = 0
+keepWalking(i < 2000)
+    iceBucket i = i slideUp 1
+penguinSay i
+"""
+
+
+def session_io(answers):
+    """
+    Returns (read, write, output) for a session answering penguinTake with 'answers'.
+    """
+    pending = list(answers)
+    output = []
+
+    async def read():
+        await asyncio.sleep(0)
+        return pending.pop(0)
+
+    async def write(text):
+        output.append(text)
+
+    return read, write, output
+
+
+class TestAsyncTarget(unittest.TestCase):
+    def compile(self, source, **options):
+        return PenguinBubbleCompiler(target="async", **options).compile(source)
+
+    def test_async_functions(self):
+        tokens = Tokenizer().tokenize(PROGRAM)
+        self.assertEqual(AsyncTarget().async_functions(tokens), {"fib", "ask", "twice"})
+
+    def test_generated_program(self):
+        compiled = self.compile(PROGRAM, memoize=True, buffered_output=True)
+        self.assertIn("async def fib(n):\n"
+                      "    if _penguin_tick() % 1000 == 0: await _penguin_asyncio.sleep(0)\n", compiled)
+        self.assertIn("return await fib(n - 1) + await fib(n - 2)", compiled)
+        self.assertIn("\ndef square(x):", compiled)
+        self.assertIn("return await ask(label) * 2", compiled)
+        self.assertIn("async def _penguin_main():\n    global count, n, name\n", compiled)
+        self.assertIn("    name = await _penguin_async_take(\"Name? \")", compiled)
+        self.assertIn("    await _penguin_async_say(f'Hi {name!s}', square(count), await fib(10))", compiled)
+        self.assertTrue(compiled.endswith('if (__name__ == "__main__"):\n    _penguin_run(_penguin_main)'))
+        self.assertNotIn("_penguin_memoize", compiled)
+        self.assertNotIn("def dynamic_input", compiled)
+
+    def test_sessions(self):
+        program = PenguinBubbleCompiler(target="async").compile_to_code(PROGRAM)
+        sessions = [session_io([f"penguin{i}", str(i % 4)]) for i in range(200)]
+
+        async def run_all():
+            return await asyncio.gather(*(run_session(program, read, write) for read, write, _ in sessions))
+
+        namespaces = asyncio.run(run_all())
+        for i, ((_, _, output), namespace) in enumerate(zip(sessions, namespaces)):
+            count = 2 * (i % 4)
+            self.assertEqual("".join(output), f"Name? Number? Hi penguin{i!s} {count * count} 55\n")
+            self.assertEqual((namespace["name"], namespace["count"]), (f"penguin{i}", count))
+
+    def test_loops_yield(self):
+        program = PenguinBubbleCompiler(target="async", yield_every=10).compile_to_code(BUSY)
+        read, write, output = session_io([])
+        turns = 0
+
+        async def other_task(done):
+            nonlocal turns
+            while not done.is_set():
+                turns += 1
+                await asyncio.sleep(0)
+
+        async def run_both():
+            done = asyncio.Event()
+            other = asyncio.create_task(other_task(done))
+            await asyncio.sleep(0)
+            await run_session(program, read, write)
+            done.set()
+            await other
+
+        asyncio.run(run_both())
+        self.assertEqual(output, ["2000\n"])
+        self.assertGreaterEqual(turns, 150)
+
+    def test_ast_backend(self):
+        outputs = []
+        for backend in ("source", "ast"):
+            program = PenguinBubbleCompiler(target="async", backend=backend).compile_to_code(PROGRAM)
+            read, write, output = session_io(["Ada", "3"])
+            asyncio.run(run_session(program, read, write))
+            outputs.append(output)
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_rejected_programs(self):
+        messages = io.StringIO()
+        with contextlib.redirect_stdout(messages):
+            self.assertEqual(self.compile('penguinBring(geometry)\npenguinSay area(2)\n'), "")
+        self.assertIn("penguinBring is not supported", messages.getvalue())
+        with self.assertRaises(ValueError):
+            PenguinBubbleCompiler(target="async", instrument=True)
+
+        fact = ("penguinDo(fact)(n)\n    penguinIf(n < 2)\n        returnIce 1\n"
+                "    returnIce n penguinBoost fact(n slideDown 1)\n")
+        tokenized = Tokenizer().tokenize
+        for statement, message in (
+            ("iceBucket total = sum(fact(x) for x in xs)", "cannot be called inside a generator expression"),
+            ("iceBucket ys = list(map(fact, xs))", "can only be called directly"),
+            ("iceBucket f = lambda x: fact(x)", "cannot be called inside a lambda"),
+        ):
+            tokens = tokenized(fact + "iceBucket xs = [1, 2, 3]\n" + statement + "\n")
+            with self.assertRaises(SyntaxError) as context:
+                AsyncTarget().transform(tokens)
+            self.assertIn(message, str(context.exception))
+            self.assertIn("line 6", str(context.exception))
+
+        # List comprehensions await inside the coroutine, and local names may shadow 'fact'
+        source = fact + ("penguinDo(g)(fact)\n    returnIce fact\n"
+                         "iceBucket ys = [fact(x) for x in [1, 2, 3]]\npenguinSay ys, g(4)\n")
+        read, write, output = session_io([])
+        program = PenguinBubbleCompiler(target="async").compile_to_code(source)
+        asyncio.run(run_session(program, read, write))
+        self.assertEqual("".join(output), "[1, 2, 6] 4\n")
+
+if __name__ == '__main__':
+    unittest.main()
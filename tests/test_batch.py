@@ -0,0 +1,145 @@
+#Purpose:
+# Tests the batch compile coordinator and its TCP workers.
+
+"""
+Explanation:
+Workers run as threads of the test process and connect over localhost.
+
+Test Cases:
+
+test_collect_files: Directories are searched recursively for .pg files, in sorted order.
+test_batch_compile: Workers compile every file; outcomes, manifest and output files are written.
+test_dead_worker_retried: Files held by a worker that disconnects are compiled by another worker.
+test_lost_after_max_attempts: A file whose worker died max_attempts times is recorded as lost.
+test_work_stealing: An idle worker steals the back half of the busiest worker's files.
+"""
+
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from compiler.batch import BatchCoordinator, _receive, _send, collect_files, run_worker
+
+FILES = {
+    "hello.pg": 'penguinSay "hello"\n',
+    "math/square.pg": 'penguinDo(square)(x)\n    returnIce x penguinBoost x\npenguinSay square(4)\n',
+    "math/broken.pg": 'penguinIf(x ==\n    penguinSay "never"\n',
+    "notes.txt": 'not a program\n',
+}
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        for name, source in FILES.items():
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(source)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def coordinator(self, **options):
+        coordinator = BatchCoordinator([self.root], address=("127.0.0.1", 0), **options)
+        coordinator.start()
+        self.addCleanup(coordinator.close)
+        return coordinator
+
+    def start_worker(self, coordinator):
+        thread = threading.Thread(target=run_worker, args=coordinator.address, daemon=True)
+        thread.start()
+        return thread
+
+    def die_holding_batch(self, coordinator):
+        """
+        Acts as a worker that takes a batch and disconnects without reporting anything.
+        """
+        with socket.create_connection(coordinator.address) as connection, connection.makefile("rwb") as stream:
+            _send(stream, {"type": "hello", "worker": "doomed"})
+            _receive(stream)
+            _send(stream, {"type": "request"})
+            batch = _receive(stream)
+        # The coordinator notices the disconnect on its own thread
+        deadline = time.monotonic() + 10
+        while any(worker.startswith("doomed") for worker in coordinator.assigned) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return [job["path"] for job in batch["jobs"]]
+
+    def test_collect_files(self):
+        files = collect_files([self.root, os.path.join(self.root, "hello.pg")])
+        self.assertEqual(
+            [os.path.relpath(path, self.root) for path in files],
+            ["hello.pg", os.path.join("math", "broken.pg"), os.path.join("math", "square.pg")]
+        )
+
+    def test_batch_compile(self):
+        output_dir = os.path.join(self.root, "out")
+        coordinator = self.coordinator(batch_size=1, output_dir=output_dir)
+        workers = [self.start_worker(coordinator) for _ in range(2)]
+        self.assertTrue(coordinator.wait(timeout=30))
+        for worker in workers:
+            worker.join(timeout=5)
+
+        summary = coordinator.summary()
+        self.assertEqual(summary["ok"], ["hello.pg", os.path.join("math", "square.pg")])
+        self.assertEqual(summary["failed"], [os.path.join("math", "broken.pg")])
+        self.assertIn("Syntax Error", summary["files"][os.path.join("math", "broken.pg")]["messages"])
+
+        with open(os.path.join(output_dir, "math", "square.py"), encoding="utf-8") as f:
+            self.assertIn("def square(x):", f.read())
+        self.assertFalse(os.path.exists(os.path.join(output_dir, "math", "broken.py")))
+
+        manifest_path = os.path.join(self.root, "results.json")
+        coordinator.write_manifest(manifest_path)
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest["files"]["hello.pg"]["status"], "ok")
+        self.assertEqual(manifest["files"]["hello.pg"]["attempts"], 1)
+
+    def test_dead_worker_retried(self):
+        coordinator = self.coordinator(batch_size=2)
+        held = self.die_holding_batch(coordinator)
+        self.assertEqual(len(held), 2)
+
+        self.start_worker(coordinator)
+        self.assertTrue(coordinator.wait(timeout=30))
+        summary = coordinator.summary()
+        self.assertEqual(len(summary["ok"]) + len(summary["failed"]), 3)
+        for path in held:
+            self.assertEqual(summary["files"][path]["attempts"], 2)
+
+    def test_lost_after_max_attempts(self):
+        coordinator = self.coordinator(batch_size=1, max_attempts=2)
+        first = self.die_holding_batch(coordinator)
+        self.assertEqual(self.die_holding_batch(coordinator), first)
+
+        self.start_worker(coordinator)
+        self.assertTrue(coordinator.wait(timeout=30))
+        summary = coordinator.summary()
+        self.assertEqual(summary["lost"], first)
+        self.assertEqual(summary["files"][first[0]]["attempts"], 2)
+
+    def test_work_stealing(self):
+        coordinator = BatchCoordinator([self.root], batch_size=16)
+        busy = coordinator.register("busy")
+        handed = [job["path"] for job in coordinator.next_batch(busy)["jobs"]]
+        self.assertEqual(len(handed), 3)
+
+        idle = coordinator.register("idle")
+        stolen = [job["path"] for job in coordinator.next_batch(idle)["jobs"]]
+        self.assertEqual(stolen, handed[2:])
+        self.assertEqual(coordinator.assigned[busy], handed[:2])
+
+        # The victim hears about the theft with its next acknowledgement
+        ack = coordinator.record(busy, {"path": handed[0], "ok": True})
+        self.assertEqual(ack, {"type": "ack", "skip": handed[2:]})
+        # Nothing left to steal: one file per worker
+        self.assertEqual(coordinator.next_batch(idle)["type"], "wait")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+#Purpose:
+# Tests the execution budget, which stops runaway loops and recursion with a clear error.
+
+"""
+Explanation:
+
+Test Cases:
+
+test_loop_checks: Every keepWalking body starts with a budget check naming the loop's line.
+test_recursive_functions: Only functions that call themselves, directly or through others, are checked.
+test_tail_call_loops: Self tail calls turned into loops are guarded as loops.
+test_local_counter: Functions with loops that call other functions bind the counter to locals at entry; the count stays shared.
+test_leaf_loops: Loops that only call pure builtins count down a local and hand unused steps back; the count stays exact.
+test_runaway_loop_stops: A loop that never ends raises PenguinBudgetExceeded with its .pg line.
+test_budget_not_reached: A program within its budget runs normally, with both backends.
+test_invalid_limit: A budget below 1 is rejected.
+"""
+
+import contextlib
+import io
+import unittest
+from compiler.tokenizer import Tokenizer
+from compiler.budget import StepBudget
+from compiler.compiler import PenguinBubbleCompiler
+
+PROGRAM = """
+penguinDo(ping)(n)
+    penguinIf(n < 1)
+        returnIce 0
+    returnIce pong(n)
+
+penguinDo(pong)(n)
+    returnIce ping(n slideDown 1) slideUp 1
+
+penguinDo(double)(x)
+    returnIce x penguinBoost 2
+
+iceBucket i = 0
+keepWalking(i < 3)
+    iceBucket i = i slideUp 1
+iceBucket result = ping(double(i))
+"""
+
+RUNAWAY = """
+iceBucket total = 0
+keepWalking(True)
+    iceBucket total = total slideUp 1
+"""
+
+
+def run(source, **options):
+    """
+    Compiles and runs a program quietly and returns its namespace.
+    """
+    namespace = {"__name__": "__main__"}
+    with contextlib.redirect_stdout(io.StringIO()):
+        exec(PenguinBubbleCompiler(**options).compile_to_code(source), namespace)
+    return namespace
+
+
+class TestBudget(unittest.TestCase):
+    def setUp(self):
+        self.tokenizer = Tokenizer()
+
+    def checks(self, tokens):
+        return [
+            (token["index"], token["indent"], token["value"])
+            for token in tokens
+            if token["type"] == "iceBucket" and token["value"].startswith(("if _penguin_next(", "if _penguin_local_next("))
+        ]
+
+    def test_loop_checks(self):
+        tokens = self.tokenizer.tokenize(RUNAWAY)
+        guarded = StepBudget(50).guard(tokens)
+        self.assertEqual(len(guarded), len(tokens) + 1)
+        self.assertEqual(guarded[2]["value"],
+                         "if _penguin_next(_penguin_steps) > 50: _penguin_budget_exceeded(50, 2, 'keepWalking')")
+        self.assertEqual(guarded[2]["indent"], guarded[3]["indent"])
+
+    def test_recursive_functions(self):
+        tokens = self.tokenizer.tokenize(PROGRAM)
+        budget = StepBudget(100)
+        self.assertEqual(budget.recursive_functions(tokens), {"ping", "pong"})
+        self.assertEqual([(line, indent) for line, indent, _ in self.checks(budget.guard(tokens))],
+                         [(1, 4), (5, 4), (10, 4)])
+        self.assertEqual(self.checks(budget.guard(tokens))[1][2],
+                         "if _penguin_next(_penguin_steps) > 100: _penguin_budget_exceeded(100, 5, 'penguinDo pong')")
+
+    def test_tail_call_loops(self):
+        source = """
+penguinDo(countdown)(n)
+    penguinIf(n < 1)
+        returnIce 0
+    returnIce countdown(n slideDown 1)
+iceBucket result = countdown(5)
+"""
+        compiler = PenguinBubbleCompiler(step_budget=10)
+        with contextlib.redirect_stdout(io.StringIO()):
+            compiled = compiler.compile(source)
+        self.assertIn("_penguin_budget_exceeded(10, 1, 'keepWalking')", compiled)
+        self.assertNotIn("penguinDo countdown", compiled)
+        self.assertEqual(run(source, step_budget=10)["result"], 0)
+
+    def test_local_counter(self):
+        source = """
+penguinDo(one)()
+    returnIce 1
+
+penguinDo(walk)(n)
+    iceBucket i = 0
+    keepWalking(i < n)
+        iceBucket i = i slideUp one()
+    returnIce i
+
+penguinDo(spin)(n)
+    penguinIf(n < 1)
+        returnIce walk(2)
+    returnIce spin(n slideDown 1)
+
+iceBucket result = walk(3) slideUp spin(2)
+"""
+        guarded = StepBudget(100).guard(self.tokenizer.tokenize(source))
+        self.assertEqual(guarded[3]["value"], "_penguin_local_next, _penguin_local_steps = _penguin_next, _penguin_steps")
+        self.assertEqual([value for _, _, value in self.checks(guarded)], [
+            "if _penguin_local_next(_penguin_local_steps) > 100: _penguin_budget_exceeded(100, 5, 'keepWalking')",
+            "if _penguin_next(_penguin_steps) > 100: _penguin_budget_exceeded(100, 8, 'penguinDo spin')",
+        ])
+        # 3 + 2 loop iterations and 3 recursive calls
+        for backend in ("source", "ast"):
+            namespace = run(source, step_budget=8, tail_calls=False, backend=backend)
+            self.assertEqual(namespace["result"], 5)
+            self.assertEqual(namespace["_penguin_step"](), 9)
+        with self.assertRaises(RuntimeError):
+            run(source, step_budget=7, tail_calls=False)
+
+    def test_leaf_loops(self):
+        source = """
+penguinDo(find)(n, stop)
+    iceBucket i = 0
+    keepWalking(i < n)
+        iceBucket i = i slideUp 1
+        penguinIf(i == stop)
+            returnIce i
+    returnIce abs(0 slideDown i)
+
+penguinDo(spin)(n)
+    penguinIf(n < 1)
+        returnIce find(3, 2)
+    returnIce spin(n slideDown 1)
+
+iceBucket result = find(4, 9) slideUp spin(2) slideUp find(2, 0)
+"""
+        guarded = StepBudget(100).guard(self.tokenizer.tokenize(source))
+        self.assertEqual([token["value"] for token in guarded[:10] if token["type"] == "iceBucket"], [
+            "i = 0",
+            "_penguin_local_left = _penguin_reserve(100)",
+            "_penguin_local_left = _penguin_local_left - 1 or _penguin_budget_exceeded(100, 3, 'keepWalking')",
+            "i = i slideUp 1",
+            "_penguin_release(100, _penguin_local_left)",
+            "_penguin_release(100, _penguin_local_left)",
+        ])
+        self.assertEqual([(token["type"], token["indent"]) for token in guarded[7:10]],
+                         [("iceBucket", 12), ("returnIce", 12), ("iceBucket", 4)])
+        self.assertNotIn("_penguin_local_next", "".join(str(token.get("value")) for token in guarded))
+        # 4 + 2 + 2 loop iterations and 3 recursive calls
+        for backend in ("source", "ast"):
+            namespace = run(source, step_budget=11, tail_calls=False, backend=backend)
+            self.assertEqual(namespace["result"], 4 + 2 + 2)
+            self.assertEqual(namespace["_penguin_step"](), 12)
+        with self.assertRaises(RuntimeError) as context:
+            run(source, step_budget=10, tail_calls=False)
+        self.assertIn("(keepWalking)", str(context.exception))
+
+    def test_runaway_loop_stops(self):
+        for backend in ("source", "ast"):
+            with self.assertRaises(RuntimeError) as context:
+                run(RUNAWAY, step_budget=1000, backend=backend)
+            self.assertEqual(type(context.exception).__name__, "PenguinBudgetExceeded")
+            self.assertEqual(str(context.exception), "step budget of 1000 exceeded at .pg line 2 (keepWalking)")
+
+    def test_budget_not_reached(self):
+        for backend in ("source", "ast"):
+            namespace = run(PROGRAM, step_budget=3 + 13, backend=backend)
+            self.assertEqual(namespace["result"], 6)
+            self.assertEqual(namespace["_penguin_step"](), 17)
+        with self.assertRaises(RuntimeError):
+            run(PROGRAM, step_budget=3 + 12)
+
+    def test_invalid_limit(self):
+        with self.assertRaises(ValueError):
+            StepBudget(0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+#Purpose:
+# Tests building multi-file programs with penguinBring and the incremental build manifest.
+
+"""
+Explanation:
+
+Test Cases:
+
+test_discover_modules: penguinBring statements are followed to the .pg files of the modules.
+test_build_order: Modules come after the modules they bring in.
+test_build_runs: The built entry program runs and uses the functions of the brought-in modules.
+test_incremental_rebuild: Unchanged modules are skipped; a changed module rebuilds its dependents only.
+test_options_change_rebuilds: Different compiler options rebuild every module.
+test_wrap_main_entry_only: With wrap_main, brought-in modules keep the variables their functions read.
+test_missing_module: Bringing in a module without a .pg file is a build error.
+test_cycle_rejected: Modules that bring each other in are a build error.
+test_failed_module_blocks_dependents: Modules depending on a module with a syntax error are not built.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from compiler.build import BuildError, ProjectBuilder
+
+MODULES = {
+    "app.pg": 'penguinBring(shapes.circle)\npenguinBring(mathbits)\npenguinSay circleArea(2)\npenguinSay square(5)\n',
+    "shapes/circle.pg": 'penguinBring(mathbits)\n\npenguinDo(circleArea)(r)\n    returnIce PI penguinBoost square(r)\n',
+    "mathbits.pg": 'iceBucket PI = 3\npenguinDo(square)(x)\n    returnIce x penguinBoost x\n',
+    "notes.pg": 'penguinSay "unrelated"\n',
+}
+
+
+class TestBuild(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        for name, source in MODULES.items():
+            self.write(name, source)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, source):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(source)
+        return path
+
+    def build(self, *names, jobs=1, **options):
+        builder = ProjectBuilder(self.root, compiler_options=options, jobs=jobs)
+        return builder.build([os.path.join(self.root, name) for name in names])
+
+    def test_discover_modules(self):
+        builder = ProjectBuilder(self.root)
+        modules = builder.discover([os.path.join(self.root, "app.pg")])
+        self.assertEqual(set(modules), {"app", "shapes.circle", "mathbits"})
+        self.assertEqual(modules["app"].dependencies, ["shapes.circle", "mathbits"])
+        self.assertEqual(modules["shapes.circle"].output_path, os.path.join(self.root, "shapes", "circle.py"))
+
+    def test_build_order(self):
+        builder = ProjectBuilder(self.root)
+        modules = builder.discover([os.path.join(self.root, "app.pg")])
+        self.assertEqual(builder.build_order(modules), ["mathbits", "shapes.circle", "app"])
+
+    def test_build_runs(self):
+        result = self.build("app.pg", jobs=2)
+        self.assertEqual(sorted(result["built"]), ["app", "mathbits", "shapes.circle"])
+        output = subprocess.run(
+            [sys.executable, "app.py"], cwd=self.root, capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output, "12\n25\n")
+
+    def test_incremental_rebuild(self):
+        self.build("app.pg", "notes.pg")
+        result = self.build("app.pg", "notes.pg")
+        self.assertEqual(result["built"], [])
+        self.assertEqual(len(result["up_to_date"]), 4)
+
+        self.write("shapes/circle.pg", MODULES["shapes/circle.pg"] + "iceBucket unit = circleArea(1)\n")
+        result = self.build("app.pg", "notes.pg")
+        self.assertEqual(result["built"], ["shapes.circle", "app"])
+        self.assertEqual(sorted(result["up_to_date"]), ["mathbits", "notes"])
+
+        os.remove(os.path.join(self.root, "notes.py"))
+        self.assertEqual(self.build("app.pg", "notes.pg")["built"], ["notes"])
+
+    def test_options_change_rebuilds(self):
+        self.build("app.pg")
+        result = self.build("app.pg", buffered_output=True)
+        self.assertEqual(len(result["built"]), 3)
+
+    def test_wrap_main_entry_only(self):
+        result = self.build("app.pg", wrap_main=True)
+        self.assertEqual(sorted(result["built"]), ["app", "mathbits", "shapes.circle"])
+        with open(os.path.join(self.root, "app.py"), encoding="utf-8") as f:
+            self.assertIn("def _penguin_main():", f.read())
+        with open(os.path.join(self.root, "mathbits.py"), encoding="utf-8") as f:
+            self.assertNotIn("_penguin_main", f.read())
+        output = subprocess.run(
+            [sys.executable, "app.py"], cwd=self.root, capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output, "12\n25\n")
+
+        # Bringing in a module that was built as an entry program rebuilds it unwrapped
+        self.write("extra.pg", "penguinBring(app)\n")
+        result = self.build("extra.pg", wrap_main=True)
+        self.assertIn("app", result["built"])
+
+    def test_missing_module(self):
+        self.write("app.pg", "penguinBring(nowhere)\n")
+        with self.assertRaises(BuildError) as context:
+            self.build("app.pg")
+        self.assertIn("module 'nowhere' not found", str(context.exception))
+
+    def test_cycle_rejected(self):
+        self.write("mathbits.pg", "penguinBring(shapes.circle)\n" + MODULES["mathbits.pg"])
+        with self.assertRaises(BuildError) as context:
+            self.build("app.pg")
+        self.assertIn("mathbits, shapes.circle", str(context.exception))
+
+    def test_failed_module_blocks_dependents(self):
+        self.write("mathbits.pg", "penguinDo(square)(x)\n    penguinBring(notes)\n")
+        result = self.build("app.pg", "notes.pg", jobs=2)
+        self.assertEqual(result["failed"], ["mathbits"])
+        self.assertEqual(sorted(result["blocked"]), ["app", "shapes.circle"])
+        self.assertEqual(result["built"], ["notes"])
+        self.assertIn("only allowed at the top level", result["errors"]["mathbits"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,9 +14,20 @@ test_compile_penguin_do: Ensures function definitions are correctly translated.
 test_compile_keep_walking: Tests keepWalking (while loop) translation.
 test_compile_penguin_if_else: Checks if-else statement translation.
 test_compile_complex_structure: Tests a complex compilation involving multiple constructs.
+test_compile_penguin_flock: Checks penguinFlock creation and flock built-ins request the flock runtime helper.
+test_compile_penguin_bring: Checks penguinBring becomes a star import of the module.
+test_compile_buffered_output: Checks penguinSay uses the buffered helper and penguinTake flushes first.
+test_compile_say_concatenation: Checks penguinSay concatenations of literals and str() become f-strings.
+test_say_concatenation_keeps_output: Checks the f-strings print exactly what the concatenations printed.
+test_translation_cache: Checks repeated statements are translated once and counted as cache hits.
+test_translation_cache_keys: Checks statements that differ in indent or added fields are not mixed up.
+test_register_emitter: Checks new token types can be registered on a subclass without changing CodeGenerator.
+test_override_emitter: Checks a replaced emitter is used, and generators created earlier keep the old one.
 """
 import unittest
-from compiler.code_generator import CodeGenerator
+import contextlib
+import io
+from compiler.code_generator import CodeGenerator, lower_say_concatenation
 
 class TestCodeGenerator(unittest.TestCase):
     def setUp(self):
@@ -166,5 +177,140 @@ class TestCodeGenerator(unittest.TestCase):
         ]
         self.assertEqual(compiled, expected)
 
+    def test_compile_buffered_output(self):
+        generator = CodeGenerator(buffered_output=True)
+        tokens = [
+            {"type": "penguinSay", "value": '"Hello"', "indent": 0, "index": 1},
+            {"type": "penguinTake", "name": "x", "prompt": '"Number: "', "indent": 0, "index": 2}
+        ]
+        compiled = generator.compile_tokens(tokens)
+        expected = [
+            '_penguin_say("Hello")',
+            '_penguin_flush()',
+            'x = dynamic_input("Number: ")'
+        ]
+        self.assertEqual(compiled, expected)
+        self.assertEqual(generator.helpers, {"_penguin_say", "dynamic_input"})
+
+    def test_compile_penguin_bring(self):
+        tokens = [{"type": "penguinBring", "name": "shapes.circle", "indent": 0, "index": 1}]
+        self.assertEqual(self.generator.compile_tokens(tokens), ['from shapes.circle import *'])
+
+    def test_compile_penguin_flock(self):
+        tokens = [
+            {"type": "penguinFlock", "name": "scores", "value": "[3, 5, 8]", "indent": 0, "index": 1},
+            {"type": "iceBucket", "value": "bonus = scores slideUp 10", "indent": 0, "index": 2}
+        ]
+        compiled = self.generator.compile_tokens(tokens)
+        expected = [
+            'scores = penguin_flock([3, 5, 8])',
+            'bonus = scores + 10'
+        ]
+        self.assertEqual(compiled, expected)
+        self.assertEqual(self.generator.helpers, {"penguin_flock"})
+
+        tokens = [{"type": "iceBucket", "value": "total = flockSum(values)", "indent": 0, "index": 1}]
+        self.generator.compile_tokens(tokens)
+        self.assertEqual(self.generator.helpers, {"penguin_flock"})
+
+    def test_compile_say_concatenation(self):
+        tokens = [
+            {"type": "penguinSay", "value": '"Result: " + str(result)', "indent": 4, "index": 1},
+            {"type": "penguinSay", "value": 'str(a) + " and " + str(b), "!"', "indent": 0, "index": 2},
+            {"type": "penguinSay", "value": '"Bye " + name', "indent": 0, "index": 3},
+        ]
+        self.assertEqual(self.generator.compile_tokens(tokens), [
+            "    print(f'Result: {result!s}')",
+            "print(f'{a!s} and {b!s}', '!')",
+            'print("Bye " + name)',
+        ])
+
+        # A program that defines its own str keeps the concatenations
+        shadowed = tokens + [{"type": "iceBucket", "value": "str = repr", "indent": 0, "index": 4}]
+        self.assertEqual(self.generator.compile_tokens(shadowed)[0], '    print("Result: " + str(result))')
+
+    def test_say_concatenation_keeps_output(self):
+        values = [
+            '"Result: " + str(result)',
+            'str(result) + "\\n" + str([result, "x"]) + "" + str(None)',
+            '"q" + str(d["k"]) + "\'" + str(1.5), sep="-"',
+            'str(result) + "%"',
+        ]
+        namespace = {"result": 42, "d": {"k": "v"}}
+        for value in values:
+            lowered = lower_say_concatenation(value)
+            self.assertIn("f", lowered.split("(")[0])
+            outputs = []
+            for arguments in (value, lowered):
+                stdout = io.StringIO()
+                with contextlib.redirect_stdout(stdout):
+                    exec(f"print({arguments})", dict(namespace))
+                outputs.append(stdout.getvalue())
+            self.assertEqual(outputs[0], outputs[1], value)
+
+    def test_translation_cache(self):
+        say = {"type": "penguinSay", "value": '"Total: " + str(total)', "indent": 4}
+        flock = {"type": "penguinFlock", "name": "scores", "value": "[1, 2]", "indent": 0}
+        tokens = [dict(say, index=1), dict(flock, index=2), dict(say, index=3), dict(say, index=4)]
+        compiled = self.generator.compile_tokens(tokens)
+        self.assertEqual(compiled, [
+            "    print(f'Total: {total!s}')",
+            "scores = penguin_flock([1, 2])",
+            "    print(f'Total: {total!s}')",
+            "    print(f'Total: {total!s}')",
+        ])
+        self.assertEqual(self.generator.helpers, {"penguin_flock"})
+        info = self.generator.cache_info()
+        self.assertEqual((info["hits"], info["misses"], info["currsize"]), (2, 2, 2))
+        self.assertEqual(info["hit_rate"], 0.5)
+
+        # Helpers of cached statements are still recorded by later compiles
+        self.assertEqual(self.generator.compile_tokens([dict(flock, index=1)]), ["scores = penguin_flock([1, 2])"])
+        self.assertEqual(self.generator.helpers, {"penguin_flock"})
+        self.assertEqual(self.generator.cache_info()["hits"], 3)
+
+        uncached = CodeGenerator(cache_size=0)
+        self.assertEqual(uncached.compile_tokens(tokens), compiled)
+        self.assertEqual(uncached.cache_info()["currsize"], 0)
+
+    def test_translation_cache_keys(self):
+        ice = {"type": "iceBucket", "value": "x = x slideUp 1", "index": 1}
+        say = {"type": "penguinSay", "value": "x", "indent": 4, "index": 3}
+        do = {"type": "penguinDo", "name": "f", "params": "x", "indent": 0, "index": 4}
+        tokens = [
+            dict(ice, indent=0), dict(ice, indent=4), say, dict(say, function="_say"),
+            do, dict(do, decorators=["_penguin_memoize(1024)"]),
+        ]
+        self.assertEqual(self.generator.compile_tokens(tokens), [
+            "x = x + 1", "    x = x + 1", "    print(x)", "    _say(x)",
+            "def f(x):", "@_penguin_memoize(1024)", "def f(x):",
+        ])
+        self.assertEqual(self.generator.cache_info()["hits"], 0)
+
+    def test_register_emitter(self):
+        class DancingGenerator(CodeGenerator):
+            pass
+
+        @DancingGenerator.register_emitter("penguinDance")
+        def emit_dance(generator, token, helpers):
+            return [f"dance({token['value']})"]
+
+        tokens = [{"type": "penguinDance", "value": "3", "indent": 4, "index": 1}]
+        self.assertEqual(DancingGenerator().compile_tokens(tokens), ["    dance(3)"])
+        self.assertNotIn("penguinDance", CodeGenerator.emitters)
+        self.assertEqual(self.generator.compile_tokens(tokens), [])
+
+    def test_override_emitter(self):
+        class ShoutingGenerator(CodeGenerator):
+            pass
+
+        before = ShoutingGenerator()
+        ShoutingGenerator.register_emitter(
+            "penguinSay", lambda generator, token, helpers: [f"print(str({token['value']}).upper())"])
+        tokens = [{"type": "penguinSay", "value": "name", "indent": 0, "index": 1}]
+        self.assertEqual(ShoutingGenerator().compile_tokens(tokens), ["print(str(name).upper())"])
+        self.assertEqual(before.compile_tokens(tokens), ["print(name)"])
+        self.assertEqual(self.generator.compile_tokens(tokens), ["print(name)"])
+
 if __name__ == '__main__':
     unittest.main()
@@ -11,9 +11,19 @@ test_compile_simple_script: Tests the compilation of a simple penguinSay command
 test_compile_full_script: Tests the compilation of a full script containing various commands and control structures.
 test_compile_with_custom_arithmetic_operations: Ensures custom arithmetic operations like slideUp are correctly translated.
 test_compile_with_unrecognized_syntax: Checks that unrecognized commands are skipped without affecting the rest of the compilation.
+test_flock_operations_without_numpy: Flock arithmetic, comparisons and slices behave like NumPy with the pure-Python fallback.
+test_flock_operations_with_numpy: The same program gives the same results on NumPy-backed flocks.
+test_flock_conditions: A flock of several values used as a condition raises ValueError on both paths.
+test_buffered_output_matches_print: Buffered output produces the same text and flushes before every prompt.
+test_only_used_helpers_injected: Runtime helpers are only injected when the program uses them.
+test_minimal_output: Minimal output leaves out blank lines and runs the same way.
 """
 
+import importlib.util
+import io
+import sys
 import unittest
+from unittest import mock
 from compiler.compiler import PenguinBubbleCompiler
 
 class TestCompiler(unittest.TestCase):
@@ -24,16 +34,6 @@ class TestCompiler(unittest.TestCase):
         code = 'penguinSay "Hello, World!"'
         compiled = self.compiler.compile(code)
         expected = '\n'.join([
-            "def dynamic_input(prompt):",
-            "    inp = input(prompt)",
-            "    try:",
-            "        return int(inp)",
-            "    except ValueError:",
-            "        try:",
-            "            return float(inp)",
-            "        except ValueError:",
-            "            return inp",
-            "",
             'print("Hello, World!")'
         ])
         self.assertMultiLineEqual(compiled, expected)
@@ -54,16 +54,6 @@ PENGUIN_ELSE
 """
         compiled = self.compiler.compile(code)
         expected = '\n'.join([
-            "def dynamic_input(prompt):",
-            "    inp = input(prompt)",
-            "    try:",
-            "        return int(inp)",
-            "    except ValueError:",
-            "        try:",
-            "            return float(inp)",
-            "        except ValueError:",
-            "            return inp",
-            "",
             'print("Hello, World!")',
             "x = 10",
             "y = 20",
@@ -82,16 +72,6 @@ PENGUIN_ELSE
         code = 'slideUp(total) = x + y'
         compiled = self.compiler.compile(code)
         expected = '\n'.join([
-            "def dynamic_input(prompt):",
-            "    inp = input(prompt)",
-            "    try:",
-            "        return int(inp)",
-            "    except ValueError:",
-            "        try:",
-            "            return float(inp)",
-            "        except ValueError:",
-            "            return inp",
-            "",
             'total = x + y'
         ])
         self.assertMultiLineEqual(compiled, expected)
@@ -104,20 +84,137 @@ x = 10
 """
         compiled = self.compiler.compile(code)
         expected = '\n'.join([
-            "def dynamic_input(prompt):",
-            "    inp = input(prompt)",
-            "    try:",
-            "        return int(inp)",
-            "    except ValueError:",
-            "        try:",
-            "            return float(inp)",
-            "        except ValueError:",
-            "            return inp",
-            "",
             'print("Hello, World!")',
             "x = 10"
         ])
         self.assertMultiLineEqual(compiled, expected)
 
+    def test_buffered_output_matches_print(self):
+        code = """
+iceBucket i = 0
+keepWalking(i < 3)
+    penguinSay "Line " + str(i)
+    iceBucket i = i slideUp 1
+penguinTake(name) "Name: "
+penguinSay "Bye " + name
+"""
+        outputs = []
+        for buffered in (False, True):
+            compiled = PenguinBubbleCompiler(buffered_output=buffered).compile(code)
+            stdout = io.StringIO()
+            seen_at_prompt = []
+
+            def fake_input(prompt):
+                seen_at_prompt.append(stdout.getvalue())
+                return "Pingu"
+
+            namespace = {}
+            with mock.patch("sys.stdout", stdout), mock.patch("builtins.input", fake_input):
+                exec(compile(compiled, "<penguin>", "exec"), namespace)
+                if buffered:
+                    namespace["_penguin_flush"]()
+            outputs.append((stdout.getvalue(), seen_at_prompt))
+
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[1][1], ["Line 0\nLine 1\nLine 2\n"])
+
+    def test_only_used_helpers_injected(self):
+        for backend in ("source", "ast"):
+            compiler = PenguinBubbleCompiler(backend=backend)
+            self.assertNotIn("dynamic_input", compiler.compile('penguinSay "Hello"'))
+            self.assertEqual(compiler.helpers, set())
+
+            compiled = compiler.compile('penguinTake(name) "Name: "\npenguinSay name')
+            self.assertIn("def dynamic_input(prompt):", compiled)
+            self.assertEqual(compiler.helpers, {"dynamic_input"})
+
+            # Helpers called by name from an iceBucket are kept too
+            compiler.compile('iceBucket age = dynamic_input("Age: ")\niceBucket total = flockSum([1, 2])')
+            self.assertEqual(compiler.helpers, {"dynamic_input", "penguin_flock"})
+
+    def test_minimal_output(self):
+        code = 'penguinDo(double)(x)\n    returnIce x penguinBoost 2\npenguinTake(n) "n: "\npenguinSay double(n)'
+        for backend in ("source", "ast"):
+            full = PenguinBubbleCompiler(backend=backend, buffered_output=True).compile(code)
+            minimal = PenguinBubbleCompiler(backend=backend, buffered_output=True, minimal_output=True).compile(code)
+            self.assertIn("\n\n", full)
+            self.assertEqual(minimal, "\n".join(line for line in full.split("\n") if line))
+
+            stdout = io.StringIO()
+            namespace = {}
+            with mock.patch("sys.stdout", stdout), mock.patch("builtins.input", lambda prompt: "21"):
+                exec(compile(minimal, "<penguin>", "exec"), namespace)
+                namespace["_penguin_flush"]()
+            self.assertEqual(stdout.getvalue(), "42\n")
+
+    FLOCK_PROGRAM = """
+penguinFlock(scores) [3, 5, 8]
+iceBucket bonus = scores slideUp 10 penguinBoost 2
+iceBucket squares = scores snowball 2
+iceBucket gaps = 10 slideDown scores
+iceBucket halves = scores givePenguins [2, 2, 4]
+iceBucket total = flockSum(squares)
+iceBucket low = flockMin(gaps)
+iceBucket high = flockMax(bonus)
+iceBucket tail = scores[1:] slideUp 1
+iceBucket passed = scores > 4
+iceBucket same = scores == [3, 0, 8]
+iceBucket picked = scores[scores >= 5]
+iceBucket chosen = scores[[2, 0]]
+iceBucket rests = scores % 3
+"""
+
+    # Values of FLOCK_PROGRAM on both paths, with flocks as lists
+    FLOCK_RESULTS = {
+        "bonus": [23, 25, 28], "squares": [9, 25, 64], "gaps": [7, 5, 2], "halves": [1.5, 2.5, 2.0],
+        "total": 98, "low": 2, "high": 28, "tail": [6, 9], "passed": [False, True, True],
+        "same": [True, False, True], "picked": [5, 8], "chosen": [8, 3], "rests": [0, 2, 2],
+    }
+
+    def run_flock_program(self, source=None):
+        compiled = self.compiler.compile(source or self.FLOCK_PROGRAM)
+        namespace = {}
+        exec(compile(compiled, "<penguin>", "exec"), namespace)
+        return namespace
+
+    def flock_results(self, namespace):
+        return {
+            name: namespace[name].tolist() if hasattr(namespace[name], "tolist") else list(namespace[name])
+            if isinstance(namespace[name], list) else namespace[name]
+            for name in self.FLOCK_RESULTS
+        }
+
+    def test_flock_operations_without_numpy(self):
+        with mock.patch.dict(sys.modules, {"numpy": None}):
+            namespace = self.run_flock_program()
+        self.assertEqual(list(namespace["bonus"]), [23, 25, 28])
+        self.assertEqual(list(namespace["squares"]), [9, 25, 64])
+        self.assertEqual(list(namespace["gaps"]), [7, 5, 2])
+        self.assertEqual(list(namespace["halves"]), [1.5, 2.5, 2.0])
+        self.assertEqual((namespace["total"], namespace["low"], namespace["high"]), (98, 2, 28))
+        self.assertEqual(self.flock_results(namespace), self.FLOCK_RESULTS)
+        for name in ("tail", "passed", "picked", "chosen"):
+            self.assertEqual(type(namespace[name]).__name__, "_PenguinFlock", name)
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "NumPy is not installed")
+    def test_flock_operations_with_numpy(self):
+        namespace = self.run_flock_program()
+        self.assertEqual(namespace["bonus"].tolist(), [23, 25, 28])
+        self.assertEqual(namespace["halves"].tolist(), [1.5, 2.5, 2.0])
+        self.assertEqual((namespace["total"], namespace["low"], namespace["high"]), (98, 2, 28))
+        self.assertEqual(self.flock_results(namespace), self.FLOCK_RESULTS)
+
+    def test_flock_conditions(self):
+        source = "penguinFlock(scores) [3, 5]\npenguinIf(scores == scores)\n    penguinSay 1\n"
+        single = "penguinFlock(scores) [3]\niceBucket big = 0\npenguinIf(scores > 2)\n    iceBucket big = 1\n"
+        paths = [{"numpy": None}]
+        if importlib.util.find_spec("numpy"):
+            paths.append({})
+        for modules in paths:
+            with mock.patch.dict(sys.modules, modules):
+                with self.assertRaises(ValueError):
+                    self.run_flock_program(source)
+                self.assertEqual(self.run_flock_program(single)["big"], 1)
+
 if __name__ == '__main__':
     unittest.main()
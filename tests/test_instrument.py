@@ -0,0 +1,147 @@
+#Purpose:
+# Tests the instrumented build mode, which counts calls, time and loop iterations per .pg line.
+
+"""
+Explanation:
+
+Test Cases:
+
+test_function_decorator: Every penguinDo gets the profiling decorator, outside other decorators.
+test_loop_counters: Loops count iterations locally and flush the count after the loop and before returnIce.
+test_counts_match_execution: Call and iteration counts match what the program did.
+test_recursion_timed_once: Recursive calls are counted but only the outermost call is timed.
+test_recursion_skips_wrapper: Recursive calls go straight to the function; the wrapper is back after the call.
+test_exit_report: At exit the program prints a sorted report to stderr and writes the JSON profile.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from compiler.tokenizer import Tokenizer
+from compiler.instrument import Instrumenter
+from compiler.compiler import PenguinBubbleCompiler
+
+PROGRAM = """
+penguinDo(fib)(n)
+    penguinIf(n < 2)
+        returnIce n
+    returnIce fib(n slideDown 1) slideUp fib(n slideDown 2)
+
+penguinDo(find)(limit)
+    iceBucket j = 0
+    keepWalking(j < limit)
+        penguinIf(j == 4)
+            returnIce j
+        iceBucket j = j slideUp 1
+    returnIce -1
+
+iceBucket i = 0
+keepWalking(i < 3)
+    iceBucket i = i slideUp 1
+    iceBucket found = find(10)
+iceBucket result = fib(10)
+"""
+
+
+def run_instrumented(source, **options):
+    """
+    Runs an instrumented program without registering its exit report and returns its namespace.
+    """
+    program = PenguinBubbleCompiler(instrument=True, **options).compile_to_code(source)
+    namespace = {"__name__": "__main__"}
+    with mock.patch("atexit.register"):
+        exec(program, namespace)
+    return namespace
+
+
+class TestInstrument(unittest.TestCase):
+    def setUp(self):
+        self.tokenizer = Tokenizer()
+
+    def test_function_decorator(self):
+        tokens = self.tokenizer.tokenize(PROGRAM)
+        tokens[0] = dict(tokens[0], decorators=["_penguin_memoize(1024)"])
+        instrumented = Instrumenter().instrument(tokens)
+        self.assertEqual(instrumented[1]["decorators"], ["_penguin_profile_call(1)", "_penguin_memoize(1024)"])
+        self.assertNotIn("_penguin_profile_call(1)", tokens[0]["decorators"])
+        # Functions without other decorators count their calls in the body
+        find = next(token for token in instrumented if token.get("name") == "find")
+        self.assertEqual(find["decorators"], ["_penguin_profile_call(5, counted=True)"])
+
+    def test_loop_counters(self):
+        tokens = self.tokenizer.tokenize(PROGRAM)
+        instrumented = Instrumenter("profile.json").instrument(tokens)
+        values = [token.get("value") for token in instrumented if token["type"] == "iceBucket"]
+        self.assertEqual(values[0], "_penguin_profile_start('profile.json', {7: 'find', 13: None})")
+        self.assertEqual(values[1:8], [
+            "_penguin_calls[1][1] += 1",
+            "_penguin_calls[5][1] += 1",
+            "j = 0",
+            "_penguin_n7 = 0",
+            "_penguin_n7 += 1",
+            "_penguin_loops[7] += _penguin_n7",
+            "j = j slideUp 1",
+        ])
+        self.assertEqual(values[8], "_penguin_loops[7] += _penguin_n7")
+        self.assertEqual(values[-2:], ["_penguin_loops[13] += _penguin_n13", "result = fib(10)"])
+
+    def test_counts_match_execution(self):
+        namespace = run_instrumented(PROGRAM)
+        self.assertEqual(namespace["_penguin_calls"][1][:2], ["fib", 177])
+        self.assertEqual(namespace["_penguin_calls"][5][:2], ["find", 3])
+        self.assertEqual(namespace["_penguin_loops"], {7: 15, 13: 3})
+        self.assertEqual((namespace["found"], namespace["result"]), (4, 55))
+
+        namespace = run_instrumented(PROGRAM, memoize=True)
+        self.assertEqual(namespace["_penguin_calls"][1][1], 19)
+
+    def test_recursion_timed_once(self):
+        namespace = run_instrumented(PROGRAM)
+        name, calls, total, active = namespace["_penguin_calls"][1]
+        self.assertEqual(active, 0)
+        self.assertGreater(total, 0)
+        with mock.patch("atexit.register"):
+            with mock.patch("time.perf_counter_ns", side_effect=range(0, 10 ** 6, 10)):
+                exec(PenguinBubbleCompiler(instrument=True).compile_to_code(PROGRAM), namespace)
+        self.assertEqual(namespace["_penguin_calls"][1][2], 10)
+
+    def test_recursion_skips_wrapper(self):
+        source = PROGRAM + "penguinDo(depth)(n)\n    penguinIf(n < 1)\n        returnIce len(inspect.stack())\n" \
+                           "    returnIce depth(n slideDown 1)\n"
+        namespace = run_instrumented(source, tail_calls=False)
+        namespace["inspect"] = __import__("inspect")
+        wrapper = namespace["depth"]
+        self.assertIsNot(wrapper, wrapper.__wrapped__)
+        # One frame per recursive call, plus the wrapper of the outermost one
+        self.assertEqual(wrapper(20) - wrapper(0), 20)
+        self.assertIs(namespace["depth"], wrapper)
+        self.assertEqual(namespace["_penguin_calls"][17][:2], ["depth", 22])
+
+    def test_exit_report(self):
+        with tempfile.TemporaryDirectory() as directory:
+            profile = os.path.join(directory, "profile.json")
+            script = os.path.join(directory, "program.py")
+            with open(script, "w", encoding="utf-8") as f:
+                f.write(PenguinBubbleCompiler(instrument=True, profile_path=profile).compile(PROGRAM))
+            report = subprocess.run(
+                [sys.executable, script], capture_output=True, text=True, check=True
+            ).stderr
+            with open(profile, encoding="utf-8") as f:
+                data = json.load(f)
+
+        lines = report.splitlines()
+        self.assertEqual(lines[0], "penguin profile (by .pg line)")
+        self.assertIn("penguinDo fib: 177 calls", report)
+        self.assertTrue(lines[-2].strip().startswith("line     7  keepWalking in find: 15 iterations"))
+        self.assertEqual(sorted(entry["name"] for entry in data["functions"]), ["fib", "find"])
+        self.assertEqual(data["loops"], [
+            {"line": 7, "function": "find", "iterations": 15},
+            {"line": 13, "function": None, "iterations": 3},
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
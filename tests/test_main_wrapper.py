@@ -0,0 +1,92 @@
+#Purpose:
+# Tests the wrap_main mode, which runs the top-level statements inside a generated function.
+
+"""
+Explanation:
+
+Test Cases:
+
+test_wraps_top_level: Top-level statements move into _penguin_main; functions stay at module level.
+test_function_globals_stay_global: Variables that functions read or declare global are declared global.
+test_unsafe_programs_unchanged: Programs whose meaning would change are not wrapped.
+test_same_behaviour: Wrapped programs print the same output and leave the shared globals set, with both backends.
+"""
+
+import contextlib
+import io
+import unittest
+from compiler.tokenizer import Tokenizer
+from compiler.main_wrapper import MainWrapper
+from compiler.compiler import PenguinBubbleCompiler
+
+PROGRAM = """
+penguinDo(scaled)(x)
+    returnIce x penguinBoost factor
+
+penguinDo(tally)(x)
+    iceBucket global count
+    iceBucket count = count slideUp x
+
+iceBucket factor = 3
+iceBucket count = 0
+iceBucket i = 0
+keepWalking(i < 4)
+    iceBucket total = scaled(i)
+    iceBucket tally(total)
+    iceBucket i = i slideUp 1
+penguinSay "total", total, "count", count, sep=":"
+"""
+
+
+class TestMainWrapper(unittest.TestCase):
+    def setUp(self):
+        self.tokenizer = Tokenizer()
+        self.wrapper = MainWrapper()
+
+    def test_wraps_top_level(self):
+        tokens = self.tokenizer.tokenize(PROGRAM)
+        wrapped = self.wrapper.wrap(tokens)
+        self.assertEqual([token["type"] for token in wrapped[:5]],
+                         ["penguinDo", "returnIce", "penguinDo", "iceBucket", "iceBucket"])
+        self.assertEqual(wrapped[5]["name"], "_penguin_main")
+        self.assertEqual((wrapped[5]["indent"], wrapped[5]["index"]), (0, 6))
+        self.assertEqual([token["indent"] for token in wrapped[7:]][:6], [4, 4, 4, 4, 8, 8])
+        self.assertEqual(wrapped[-2]["condition"], '(__name__ == "__main__")')
+        self.assertEqual((wrapped[-1]["value"], wrapped[-1]["indent"]), ("_penguin_main()", 4))
+        self.assertEqual(tokens, self.tokenizer.tokenize(PROGRAM))
+
+    def test_function_globals_stay_global(self):
+        wrapped = self.wrapper.wrap(self.tokenizer.tokenize(PROGRAM))
+        self.assertEqual(wrapped[6]["value"], "global count, factor")
+
+        tokens = self.tokenizer.tokenize('iceBucket x = 1\npenguinSay x')
+        self.assertEqual([token.get("value") for token in self.wrapper.wrap(tokens)[1:3]], ["x = 1", "x"])
+
+    def test_unsafe_programs_unchanged(self):
+        programs = [
+            "penguinDo(f)(x)\n    returnIce 1\npenguinDo(f)(x)\n    returnIce 2\npenguinSay f(0)",
+            "penguinIf(True)\n    penguinDo(f)(x)\n        returnIce 1\npenguinSay f(0)",
+            "penguinDo(f)(x)\n    returnIce 1\niceBucket f = 2",
+            "iceBucket from math import *\npenguinSay sqrt(4)",
+            "penguinSay (",
+        ]
+        for program in programs:
+            tokens = self.tokenizer.tokenize(program)
+            self.assertIs(self.wrapper.wrap(tokens), tokens, program)
+
+    def test_same_behaviour(self):
+        for backend in ("source", "ast"):
+            results = []
+            for wrap_main in (False, True):
+                compiler = PenguinBubbleCompiler(backend=backend, wrap_main=wrap_main, inline=True)
+                namespace = {"__name__": "__main__"}
+                stdout = io.StringIO()
+                with contextlib.redirect_stdout(stdout):
+                    exec(compiler.compile_to_code(PROGRAM), namespace)
+                results.append((stdout.getvalue(), namespace["count"], namespace["factor"], "i" in namespace))
+            self.assertEqual(results[0][:3], ("total:9:count:18\n", 18, 3))
+            self.assertEqual(results[1][:3], results[0][:3])
+            self.assertEqual((results[0][3], results[1][3]), (True, False))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,437 @@
+#Purpose:
+# Tests the optimization passes applied to tokens before code generation.
+
+"""
+Explanation:
+
+Test Cases:
+
+test_pure_function_detection: Recursive arithmetic functions are detected as pure.
+test_impure_functions_rejected: penguinSay, penguinTake, global reads and impure callees disqualify a function.
+test_memoize_adds_decorator: Pure functions receive the memoization decorator and request its runtime helper.
+test_memoize_leaves_input_tokens_untouched: The pass copies the tokens it rewrites.
+test_memoized_program_runs: The generated program computes the same results with the cache in place.
+test_memoize_unhashable_arguments: Calls with unhashable arguments bypass the cache.
+test_tail_call_becomes_loop: A self tail call is rewritten into a parameter rebind and continue.
+test_tail_call_runs_deep: Tail-recursive functions run far past the Python recursion limit.
+test_tail_call_inside_loop_kept: Tail calls inside keepWalking loops remain real calls.
+test_tail_calls_disabled: The pass can be turned off.
+test_inline_small_function: Calls with name/constant arguments are replaced by the substituted expression.
+test_inline_respects_threshold: Functions above the size threshold keep their calls.
+test_inline_skips_unsafe_calls: Complex arguments, global reads and shadowed names prevent inlining.
+test_inlined_say_arguments: Inlining inside penguinSay keeps its arguments separate instead of printing a tuple.
+test_hoist_invariants: Invariant assignments and operands move into a guarded preheader.
+test_hoist_skips_loops_with_effects: Output before the statement, mutation and impure calls keep code in the loop.
+test_hoist_keeps_escaping_values: Values that could be shared across iterations are recomputed.
+test_hoist_skips_aliased_augmented_lists: 'a += [1]' grows the list another name refers to, so len() stays in the loop.
+test_hoisted_program_runs: Hoisting keeps results, including loops that never run and pure callees.
+test_local_aliases: Builtins, helpers and functions called in loops are bound to locals at function entry.
+test_local_aliases_respect_shadowing: Locals, rebound names, late definitions and small loops are left alone.
+test_aliased_program_runs: Aliasing keeps results and output, with both output modes.
+test_strength_reduction: Int powers become multiplications and power-of-two divisions become multiplications.
+test_strength_reduction_skips_unknown_kinds: Parameters, float powers, flocks, lambdas and other divisors are left alone.
+test_reduced_program_runs: Reduced programs compute exactly the same results.
+"""
+
+import contextlib
+import io
+import unittest
+from compiler.tokenizer import Tokenizer
+from compiler.optimizer import Optimizer
+from compiler.analysis import find_pure_functions
+from compiler.compiler import PenguinBubbleCompiler
+
+FIB_SOURCE = """
+penguinDo(fib)(n)
+    penguinIf(n < 2)
+        returnIce n
+    returnIce fib(n slideDown 1) slideUp fib(n slideDown 2)
+"""
+
+SUM_SOURCE = """
+penguinDo(sumTo)(n, acc)
+    penguinIf(n == 0)
+        returnIce acc
+    returnIce sumTo(n slideDown 1, acc slideUp n)
+"""
+
+
+def run_program(source, **options):
+    """
+    Compiles a .pg program and executes it, returning its global namespace.
+    """
+    compiled = PenguinBubbleCompiler(**options).compile(source)
+    namespace = {}
+    exec(compile(compiled, "<penguin>", "exec"), namespace)
+    return namespace
+
+
+class TestOptimizer(unittest.TestCase):
+    def setUp(self):
+        self.tokenizer = Tokenizer()
+
+    def test_pure_function_detection(self):
+        tokens = self.tokenizer.tokenize(FIB_SOURCE + """
+penguinDo(twice)(n)
+    iceBucket doubled = fib(n) penguinBoost 2
+    returnIce doubled
+""")
+        self.assertEqual(find_pure_functions(tokens), {"fib", "twice"})
+
+    def test_impure_functions_rejected(self):
+        tokens = self.tokenizer.tokenize("""
+penguinDo(shout)(n)
+    penguinSay n
+    returnIce n
+
+penguinDo(ask)(n)
+    penguinTake(answer) "Answer: "
+    returnIce answer slideUp n
+
+penguinDo(shift)(n)
+    returnIce n slideUp offset
+
+penguinDo(loud)(n)
+    returnIce shout(n)
+
+penguinDo(grow)(items)
+    iceBucket items.append(1)
+    returnIce items
+
+iceBucket offset = 3
+""")
+        self.assertEqual(find_pure_functions(tokens), set())
+
+    def test_memoize_adds_decorator(self):
+        tokens = self.tokenizer.tokenize(FIB_SOURCE)
+        optimizer = Optimizer(memoize=True, memo_cache_size=64)
+        optimized = optimizer.optimize(tokens)
+        self.assertEqual(optimized[0]["decorators"], ["_penguin_memoize(64)"])
+        self.assertEqual(optimizer.helpers, {"_penguin_memoize"})
+
+    def test_memoize_leaves_input_tokens_untouched(self):
+        tokens = self.tokenizer.tokenize(FIB_SOURCE)
+        Optimizer(memoize=True).optimize(tokens)
+        self.assertNotIn("decorators", tokens[0])
+
+    def test_memoized_program_runs(self):
+        namespace = run_program(FIB_SOURCE + "iceBucket result = fib(90)\n", memoize=True)
+        self.assertEqual(namespace["result"], 2880067194370816120)
+        self.assertGreater(namespace["fib"].cache_info().hits, 0)
+
+    def test_memoize_unhashable_arguments(self):
+        namespace = run_program("""
+penguinDo(total)(values)
+    returnIce sum(values)
+
+iceBucket result = total([1, 2, 3])
+""", memoize=True)
+        self.assertEqual(namespace["result"], 6)
+        self.assertEqual(namespace["total"].cache_info().currsize, 0)
+
+    def test_tail_call_becomes_loop(self):
+        tokens = self.tokenizer.tokenize(SUM_SOURCE)
+        optimized = Optimizer().optimize(tokens)
+        self.assertEqual(
+            [(token["type"], token["indent"]) for token in optimized],
+            [
+                ("penguinDo", 0),
+                ("keepWalking", 4),
+                ("penguinIf", 8),
+                ("returnIce", 12),
+                ("iceBucket", 8),
+                ("continueWalking", 8),
+            ]
+        )
+        self.assertEqual(optimized[4]["value"], "n, acc = n - 1, acc + n")
+
+    def test_tail_call_runs_deep(self):
+        namespace = run_program(SUM_SOURCE + "iceBucket result = sumTo(50000, 0)\n")
+        self.assertEqual(namespace["result"], 1250025000)
+
+    def test_tail_call_inside_loop_kept(self):
+        tokens = self.tokenizer.tokenize("""
+penguinDo(spin)(n)
+    keepWalking(n > 0)
+        returnIce spin(n slideDown 1)
+""")
+        self.assertEqual(Optimizer().optimize(tokens), tokens)
+
+    def test_tail_calls_disabled(self):
+        tokens = self.tokenizer.tokenize(SUM_SOURCE)
+        self.assertEqual(Optimizer(tail_calls=False).optimize(tokens), tokens)
+
+    def test_inline_small_function(self):
+        tokens = self.tokenizer.tokenize("""
+penguinDo(addOperation)(x, y)
+    returnIce x slideUp y
+iceBucket result = addOperation(num1, 2) penguinBoost 3
+penguinSay addOperation(result, result)
+penguinSay "sum:", addOperation(num1, 1)
+""")
+        optimized = Optimizer(inline=True).optimize(tokens)
+        self.assertEqual(optimized[2]["value"], "result = (num1 + 2) * 3")
+        self.assertEqual(optimized[3]["value"], "result + result")
+        self.assertEqual(optimized[4]["value"], "'sum:', num1 + 1")
+
+    def test_inline_respects_threshold(self):
+        tokens = self.tokenizer.tokenize("""
+penguinDo(poly)(x)
+    returnIce x penguinBoost x slideUp 2 penguinBoost x slideUp 1
+iceBucket result = poly(3)
+""")
+        self.assertEqual(Optimizer(inline=True, inline_threshold=4).optimize(tokens), tokens)
+        optimized = Optimizer(inline=True, inline_threshold=20).optimize(tokens)
+        self.assertEqual(optimized[2]["value"], "result = 3 * 3 + 2 * 3 + 1")
+
+    def test_inline_skips_unsafe_calls(self):
+        tokens = self.tokenizer.tokenize("""
+penguinDo(addOperation)(x, y)
+    returnIce x slideUp y
+penguinDo(shift)(x)
+    returnIce x slideUp offset
+penguinDo(caller)(addOperation)
+    returnIce addOperation(1, 2)
+iceBucket offset = 1
+iceBucket a = addOperation(f(1), 2)
+iceBucket b = shift(3)
+""")
+        self.assertEqual(Optimizer(inline=True).optimize(tokens), tokens)
+
+    def test_inlined_say_arguments(self):
+        source = """
+penguinDo(add)(x, y)
+    returnIce x slideUp y
+iceBucket x = 1
+iceBucket y = 2
+penguinSay "sum", add(x, y)
+penguinSay "sums", add(x, 1), add(2, y), sep="-"
+"""
+        optimized = Optimizer(inline=True).optimize(self.tokenizer.tokenize(source))
+        self.assertEqual(optimized[4]["value"], "'sum', x + y")
+        self.assertEqual(optimized[5]["value"], "'sums', x + 1, 2 + y, sep='-'")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            run_program(source, inline=True)
+        self.assertEqual(output.getvalue(), "sum 3\nsums-2-4\n")
+
+    def test_hoist_invariants(self):
+        tokens = self.tokenizer.tokenize("""
+keepWalking(i < n penguinBoost 2)
+    iceBucket limit = top penguinBoost 2
+    iceBucket total = total slideUp limit penguinBoost i slideUp abs(top slideDown n)
+    iceBucket i = i slideUp 1
+""")
+        optimized = Optimizer(hoist_invariants=True).optimize(tokens)
+        self.assertEqual(
+            [(token["type"], token["indent"], token.get("value", token.get("condition"))) for token in optimized],
+            [
+                ("iceBucket", 0, "_penguin_inv1 = n * 2"),
+                ("penguinIf", 0, "i < _penguin_inv1"),
+                ("iceBucket", 4, "limit = top penguinBoost 2"),
+                ("iceBucket", 4, "_penguin_inv2 = abs(top - n)"),
+                ("keepWalking", 4, "i < _penguin_inv1"),
+                ("iceBucket", 8, "total = total + limit * i + _penguin_inv2"),
+                ("iceBucket", 8, "i = i slideUp 1"),
+            ]
+        )
+
+    def test_hoist_skips_loops_with_effects(self):
+        for body in (
+            "    penguinSay i\n    iceBucket limit = top penguinBoost 2\n",
+            "    iceBucket limit = top penguinBoost 2\n    iceBucket items.append(limit)\n",
+            "    iceBucket limit = top penguinBoost 2\n    iceBucket items[i] = limit\n",
+            "    iceBucket limit = top penguinBoost 2\n    iceBucket log(limit)\n",
+        ):
+            tokens = self.tokenizer.tokenize("keepWalking(i < 3)\n" + body + "    iceBucket i = i slideUp 1\n")
+            self.assertEqual(Optimizer(hoist_invariants=True).optimize(tokens), tokens)
+
+    def test_hoist_keeps_escaping_values(self):
+        tokens = self.tokenizer.tokenize("""
+keepWalking(i < 3)
+    iceBucket row = base penguinBoost 2
+    iceBucket rows = rows slideUp [row]
+    iceBucket i = i slideUp 1
+""")
+        self.assertEqual(Optimizer(hoist_invariants=True).optimize(tokens), tokens)
+
+    def test_hoist_skips_aliased_augmented_lists(self):
+        source = """
+iceBucket a = []
+iceBucket b = a
+keepWalking(len(b) < 3)
+    iceBucket a += [1]
+"""
+        tokens = self.tokenizer.tokenize(source)
+        self.assertEqual(Optimizer(hoist_invariants=True).optimize(tokens), tokens)
+        self.assertEqual(run_program(source, hoist_invariants=True)["b"], [1, 1, 1])
+
+        # Augmented assignments to numbers only rebind the name
+        tokens = self.tokenizer.tokenize("iceBucket i = 0\nkeepWalking(i < n penguinBoost 2)\n    iceBucket i += 1\n")
+        self.assertEqual(Optimizer(hoist_invariants=True).optimize(tokens)[1]["value"], "_penguin_inv1 = n * 2")
+
+    def test_hoisted_program_runs(self):
+        source = """
+penguinDo(sq)(x)
+    returnIce x penguinBoost x
+
+penguinDo(work)(n, k)
+    iceBucket acc = 0
+    iceBucket i = 0
+    keepWalking(i < n)
+        iceBucket j = 0
+        keepWalking(j < n)
+            iceBucket acc = acc slideUp sq(k) penguinBoost j slideUp i
+            iceBucket j = j slideUp 1
+        iceBucket i = i slideUp 1
+    returnIce acc
+
+iceBucket d = 0
+iceBucket never = 5
+keepWalking(never < 3)
+    iceBucket q = 10 givePenguins d
+    iceBucket never = never slideUp q
+iceBucket result = work(4, 3)
+"""
+        plain = run_program(source)
+        hoisted = run_program(source, hoist_invariants=True)
+        self.assertEqual(hoisted["result"], plain["result"])
+        self.assertNotIn("q", hoisted)
+        self.assertIn("_penguin_inv1 = sq(k)", PenguinBubbleCompiler(hoist_invariants=True).compile(source))
+
+    ALIAS_SOURCE = """
+penguinDo(square)(x)
+    returnIce x penguinBoost x
+
+penguinDo(show)(items)
+    iceBucket i = 0
+    iceBucket total = 0
+    keepWalking(i < len(items))
+        penguinSay "item", square(items[i]), abs(-i)
+        iceBucket total = total slideUp items[i]
+        iceBucket i = i slideUp 1
+    returnIce max(items)
+
+iceBucket r = show([1, 2, 3])
+"""
+
+    def test_local_aliases(self):
+        tokens = self.tokenizer.tokenize(self.ALIAS_SOURCE)
+        optimized = Optimizer(local_aliases=True).optimize(tokens)
+        self.assertEqual(optimized[3], {
+            "type": "iceBucket",
+            "value": "_penguin_local_abs, _penguin_local_len, _penguin_local_print, _penguin_local_square"
+                     " = abs, len, print, square",
+            "indent": 4,
+            "index": 3,
+        })
+        self.assertEqual(optimized[6]["condition"], "i < _penguin_local_len(items)")
+        self.assertEqual(optimized[7]["function"], "_penguin_local_print")
+        self.assertEqual(optimized[7]["value"], "'item', _penguin_local_square(items[i]), _penguin_local_abs(-i)")
+        self.assertEqual(optimized[10]["value"], "max(items)")
+        self.assertNotIn("function", tokens[6])
+
+        buffered = Optimizer(local_aliases=True, buffered_output=True).optimize(tokens)
+        self.assertIn("_penguin_local_say", buffered[3]["value"])
+        self.assertEqual(buffered[7]["function"], "_penguin_local_say")
+
+    def test_local_aliases_respect_shadowing(self):
+        loop = ("    keepWalking(i < len(items))\n        penguinSay abs(i)\n"
+                "        iceBucket j = i\n        iceBucket i = i slideUp 1\n")
+        programs = [
+            # The function binds the names itself
+            "penguinDo(f)(items, len)\n    iceBucket abs = 3\n    iceBucket print = 4\n" + loop,
+            # The program rebinds them at module level or through global
+            "penguinDo(f)(items)\n" + loop + "iceBucket len = 1\niceBucket abs = 2\niceBucket print = 3",
+            "penguinDo(f)(items)\n" + loop + "penguinDo(g)()\n    iceBucket global len, abs, print\n    returnIce 0",
+            # Only two statements in the loop
+            "penguinDo(f)(items)\n    keepWalking(i < len(items))\n        iceBucket i = i slideUp abs(1)",
+        ]
+        for program in programs:
+            tokens = self.tokenizer.tokenize(program)
+            self.assertEqual(Optimizer(local_aliases=True).optimize(tokens), tokens, program)
+
+        # A function defined after the main program starts may not exist yet at entry
+        tokens = self.tokenizer.tokenize(
+            "penguinDo(f)(items)\n" + loop.replace("abs(i)", "later(i)") + "iceBucket x = 1\n"
+            "penguinDo(later)(v)\n    returnIce v"
+        )
+        optimized = Optimizer(local_aliases=True).optimize(tokens)
+        self.assertEqual(optimized[1]["value"], "_penguin_local_len, _penguin_local_print = len, print")
+
+    def test_aliased_program_runs(self):
+        for buffered in (False, True):
+            outputs = []
+            for aliases in (False, True):
+                stdout = io.StringIO()
+                with contextlib.redirect_stdout(stdout):
+                    namespace = run_program(self.ALIAS_SOURCE, local_aliases=aliases, buffered_output=buffered)
+                    if buffered:
+                        namespace["_penguin_flush"]()
+                outputs.append((stdout.getvalue(), namespace["r"]))
+            self.assertEqual(outputs[0], outputs[1])
+            self.assertEqual(outputs[1][1], 3)
+
+    STRENGTH_SOURCE = """
+iceBucket scale = 8
+penguinDo(work)(n)
+    iceBucket i = 0
+    iceBucket total = 0
+    iceBucket x = 0.0
+    iceBucket f = 1.5
+    keepWalking(i < n)
+        iceBucket total = total slideUp i snowball 2 slideUp i snowball 3 slideUp scale snowball 4
+        iceBucket x = (x slideUp i) givePenguins 2.0
+        iceBucket x = x givePenguins 4 slideUp f snowball 2
+        iceBucket x /= 0.5
+        iceBucket y = n givePenguins 2.0
+        iceBucket i = i slideUp 1
+    returnIce total, x, y
+iceBucket r = work(10)
+"""
+
+    def test_strength_reduction(self):
+        tokens = self.tokenizer.tokenize(self.STRENGTH_SOURCE)
+        optimized = Optimizer(strength_reduction=True).optimize(tokens)
+        values = [token.get("value") for token in optimized]
+        self.assertIn("total = total + i * i + i * i * i + scale * scale * scale * scale", values)
+        self.assertIn("x = (x + i) * 0.5", values)
+        self.assertIn("x = x * 0.25 + f ** 2", values)
+        self.assertIn("x *= 2.0", values)
+        # Parameters may hold anything, so their divisions stay
+        self.assertIn("y = n givePenguins 2.0", values)
+        self.assertNotEqual(tokens, optimized)
+        self.assertEqual(Optimizer().optimize(tokens), tokens)
+
+    def test_strength_reduction_skips_unknown_kinds(self):
+        for program in (
+            "iceBucket f = 1.5\niceBucket y = f snowball 2\n",
+            "iceBucket i = 3\niceBucket g = (lambda i: i snowball 2)(1.5)\n",
+            "iceBucket i = 7\niceBucket y = i givePenguins 4\n",
+            "iceBucket x = 7.0\niceBucket y = x givePenguins 3.0\n",
+            "iceBucket i = 3\npenguinFlock(i) [1, 2]\niceBucket y = i snowball 2\n",
+            "iceBucket i = 3\npenguinBring(geometry)\niceBucket y = i snowball 2\n",
+            "penguinDo(f)(i)\n    iceBucket global i\n    iceBucket i = 2.5\niceBucket i = 3\niceBucket y = i snowball 2\n",
+            "iceBucket x = 1j\niceBucket y = x givePenguins 2.0\n",
+        ):
+            tokens = self.tokenizer.tokenize(program)
+            self.assertEqual(Optimizer(strength_reduction=True).optimize(tokens), tokens, program)
+
+    def test_reduced_program_runs(self):
+        source = self.STRENGTH_SOURCE + """
+iceBucket big = 10 snowball 400
+iceBucket huge = big snowball 2
+iceBucket tiny = 5e-324
+iceBucket small = tiny givePenguins 2.0 slideUp tiny givePenguins 4
+iceBucket neg = -3
+iceBucket cube = neg snowball 3
+"""
+        results = []
+        for reduction in (False, True):
+            namespace = run_program(source, strength_reduction=reduction)
+            results.append([namespace[name] for name in ("r", "huge", "small", "cube")])
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[1][0][0], sum(i ** 2 + i ** 3 + 8 ** 4 for i in range(10)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+#Purpose:
+# Tests the outlining pass, which moves deeply nested blocks into generated helper functions.
+
+"""
+Explanation:
+Programs are compiled with and without outlining and run with exec; both must print the
+same text. A small outline_depth makes ordinary programs deep enough to be outlined.
+
+Test Cases:
+
+test_shallow_programs: Programs within the depth limit are returned unchanged.
+test_deep_loops: 40 nested keepWalking loops compile and run with both backends.
+test_exits: breakIce, returnIce and tail calls (continueWalking) leaving an outlined body still work.
+test_variables: Locals are passed in and returned, globals and enclosing functions' variables still work.
+test_unbound_locals: A local assigned only on some paths is still unbound where it was before.
+test_bodies_left_in_place: Bodies with lambdas or 'global' statements are not moved.
+test_local_aliases: Aliases of print and dynamic_input bound by local_aliases are passed to the helpers.
+"""
+
+import contextlib
+import io
+import unittest
+import unittest.mock
+from compiler.analysis import block_depths
+from compiler.compiler import PenguinBubbleCompiler
+from compiler.outline import Outliner
+from compiler.tokenizer import Tokenizer
+
+EXITS = """
+penguinDo(search)(limit)
+    iceBucket found = 0
+    iceBucket i = 0
+    keepWalking(i < limit)
+        iceBucket i = i slideUp 1
+        penguinIf(i % 2 == 0)
+            penguinIf(i > 7)
+                penguinIf(i == 12)
+                    returnIce found penguinBoost 100
+        penguinIf(i > 3)
+            penguinIf(i == 9)
+                breakIce
+            iceBucket found = found slideUp i
+    returnIce found
+
+penguinDo(count)(n, acc)
+    penguinIf(n == 0)
+        returnIce acc
+    penguinIf(n % 2 == 0)
+        penguinIf(n % 4 == 0)
+            returnIce count(n slideDown 1, acc slideUp 2)
+    returnIce count(n slideDown 1, acc slideUp 1)
+
+penguinSay search(20), search(10), search(6), count(10, 0)
+"""
+
+VARIABLES = """
+iceBucket counter = 0
+penguinDo(outer)(k)
+    iceBucket base = k penguinBoost 10
+    penguinDo(inner)(m)
+        iceBucket global counter
+        iceBucket acc = 0
+        keepWalking(m > 0)
+            penguinIf(m > 1)
+                penguinIf(m > 2)
+                    iceBucket acc = acc slideUp base
+                    iceBucket counter = counter slideUp 1
+            iceBucket m = m slideDown 1
+        returnIce acc
+    returnIce inner(k)
+
+iceBucket n = 0
+keepWalking(n < 3)
+    iceBucket n = n slideUp 1
+    penguinIf(n > 1)
+        penguinIf(n > 2)
+            iceBucket last = n
+penguinSay outer(4), counter, last
+"""
+
+UNBOUND = """
+penguinDo(pick)(flag)
+    penguinIf(True)
+        penguinIf(flag)
+            penguinIf(True)
+                iceBucket chosen = 1
+    returnIce chosen
+
+penguinSay pick(True)
+penguinSay pick(False)
+"""
+
+
+def deep_loops(depth):
+    lines = ["iceBucket total = 0"]
+    for level in range(depth):
+        pad = "    " * level
+        lines.append(f"{pad}iceBucket i{level} = 0")
+        lines.append(f"{pad}keepWalking(i{level} < 1)")
+        lines.append(f"{pad}    iceBucket i{level} = i{level} slideUp 1")
+    lines.append("    " * depth + "iceBucket total = total slideUp 1")
+    lines.append("penguinSay total")
+    return "\n".join(lines) + "\n"
+
+
+def run(source, **options):
+    """
+    Compiles and runs a program; returns what it printed and the generated code.
+    """
+    compiled = PenguinBubbleCompiler(**options).compile(source)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            exec(compile(compiled, "<penguin>", "exec"), {"__name__": "__main__"})
+        except Exception as e:
+            print(type(e).__name__)
+    return output.getvalue(), compiled
+
+
+class TestOutline(unittest.TestCase):
+    def assertSameOutput(self, source, outline_depth=2, **options):
+        expected, _ = run(source, outline_depth=None, **options)
+        output, compiled = run(source, outline_depth=outline_depth, **options)
+        self.assertIn("def _penguin_block_1(", compiled)
+        self.assertEqual(output, expected)
+        return compiled
+
+    def test_shallow_programs(self):
+        tokens = Tokenizer().tokenize(EXITS)
+        self.assertIs(Outliner().transform(tokens), tokens)
+        with self.assertRaises(ValueError):
+            Outliner(max_depth=1)
+
+    def test_deep_loops(self):
+        tokens = Outliner(max_depth=16).transform(Tokenizer().tokenize(deep_loops(40)))
+        self.assertLessEqual(max(block_depths(tokens)), 16)
+        for backend in ("source", "ast"):
+            self.assertEqual(run(deep_loops(40), backend=backend)[0], "1\n")
+
+    def test_exits(self):
+        compiled = self.assertSameOutput(EXITS)
+        self.assertIn("if _penguin_flow == 1: break", compiled)
+        self.assertIn("if _penguin_flow == 2: continue", compiled)
+        self.assertIn("if _penguin_flow == 3: return _penguin_result", compiled)
+        self.assertSameOutput(EXITS, wrap_main=True, backend="ast")
+
+    def test_variables(self):
+        compiled = self.assertSameOutput(VARIABLES)
+        self.assertIn("acc, m = _penguin_block_", compiled)
+        self.assertIn("(acc, base, m):\n    global counter\n", compiled)
+        self.assertSameOutput(VARIABLES, wrap_main=True)
+
+    def test_unbound_locals(self):
+        compiled = self.assertSameOutput(UNBOUND)
+        self.assertIn('locals().get("chosen", _penguin_unbound)', compiled)
+        self.assertEqual(run(UNBOUND, outline_depth=2)[0], "1\nUnboundLocalError\n")
+
+    def test_bodies_left_in_place(self):
+        for statement in ("iceBucket f = lambda: x", "iceBucket global x"):
+            source = ("penguinDo(f)(x)\n    penguinIf(x)\n        penguinIf(x)\n"
+                      f"            {statement}\n    returnIce x\n")
+            self.assertNotIn("_penguin_block", run(source, outline_depth=2)[1])
+
+    def test_local_aliases(self):
+        source = """
+penguinDo(show)(n)
+    iceBucket i = 0
+    keepWalking(i < n)
+        penguinIf(i > 0)
+            penguinIf(i > 1)
+                penguinSay "i", i
+                penguinTake(answer) "more? "
+        iceBucket i = i slideUp 1
+    returnIce i
+penguinSay show(4)
+"""
+        with unittest.mock.patch("builtins.input", lambda prompt: "yes"):
+            compiled = self.assertSameOutput(source, local_aliases=True, alias_threshold=1)
+        self.assertIn("def _penguin_block_1(_penguin_local_dynamic_input, _penguin_local_print,", compiled)
+        self.assertIn("_penguin_block_2(_penguin_local_dynamic_input, _penguin_local_print,", compiled)
+
+if __name__ == '__main__':
+    unittest.main()
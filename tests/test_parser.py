@@ -9,6 +9,9 @@ Test Cases:
 Valid Tokens: Tests various valid token types to ensure they pass parsing without errors.
 Invalid Tokens: Tests scenarios where required fields are missing, expecting SyntaxError to be raised.
 Edge Cases: Includes tests for unrecognized tokens and empty token lists.
+penguinFlock: Requires both a name and initial values.
+penguinBring: Requires a dotted module name and may only appear at the top level.
+register_validator: New token types can be validated on a subclass without changing Parser.
 """
 
 import unittest
@@ -164,5 +167,38 @@ class TestParser(unittest.TestCase):
         parsed = self.parser.parse(tokens)
         self.assertEqual(parsed, tokens)
 
+    def test_parse_missing_value_in_penguin_flock(self):
+        tokens = [{"type": TokenType.PENGUIN_FLOCK, "name": "scores"}]
+        with self.assertRaises(SyntaxError) as context:
+            self.parser.parse(tokens)
+        self.assertIn("Missing 'name' or 'value' in penguinFlock statement.", str(context.exception))
+    def test_parse_penguin_bring(self):
+        tokens = [{"type": TokenType.PENGUIN_BRING, "name": "shapes.circle", "indent": 0}]
+        self.assertEqual(self.parser.parse(tokens), tokens)
+
+        for token, message in (
+            ({"type": TokenType.PENGUIN_BRING, "name": "shapes/circle", "indent": 0}, "Invalid module name"),
+            ({"type": TokenType.PENGUIN_BRING, "name": "shapes", "indent": 4}, "only allowed at the top level"),
+        ):
+            with self.assertRaises(SyntaxError) as context:
+                self.parser.parse([token])
+            self.assertIn(message, str(context.exception))
+
+    def test_register_validator(self):
+        class DancingParser(Parser):
+            pass
+
+        @DancingParser.register_validator("penguinDance")
+        def validate_dance(token):
+            if "value" not in token:
+                raise SyntaxError("Missing 'value' in penguinDance statement.")
+
+        tokens = [{"type": "penguinDance"}]
+        with self.assertRaises(SyntaxError) as context:
+            DancingParser().parse(tokens)
+        self.assertIn("Missing 'value' in penguinDance statement.", str(context.exception))
+        self.assertEqual(self.parser.parse(tokens), tokens)
+        self.assertNotIn("penguinDance", Parser.validators)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,157 @@
+#Purpose:
+# Tests profile-guided optimization: collecting a profile and compiling with it.
+
+"""
+Explanation:
+The training run of a --pgo-collect build happens in a separate Python process, so the
+profile is written by the program's own exit hook.
+
+Test Cases:
+
+test_reorder_branches: The most frequently taken branch of a chain moves to the front; penguinElse stays last.
+test_reorder_needs_exclusive_conditions: Chains whose conditions may overlap keep their order.
+test_collect_profile: A collect build records calls, branches taken and the source digest.
+test_use_profile: Hot functions are inlined or memoized, cold ones are not, and the output is unchanged.
+test_stale_profile_ignored: A profile of a different source is reported and not applied.
+test_invalid_profile: Loading a profile without branch counters raises ValueError.
+"""
+
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from compiler.tokenizer import Tokenizer
+from compiler.compiler import PenguinBubbleCompiler
+from compiler.pgo import Profile, reorder_branches, source_digest
+
+PROGRAM = """
+penguinDo(fib)(n)
+    penguinIf(n < 2)
+        returnIce n
+    returnIce fib(n slideDown 1) slideUp fib(n slideDown 2)
+
+penguinDo(double)(x)
+    returnIce x penguinBoost 2
+
+penguinDo(half)(x)
+    returnIce x slideDown 1
+
+iceBucket i = 0
+iceBucket total = 0
+keepWalking(i < 50)
+    iceBucket kind = 1 if i % 10 else 0
+    penguinIf(kind == 0)
+        iceBucket total = total slideUp half(i)
+    penguinWhatAbout(kind == 1)
+        iceBucket total = total slideUp double(i)
+    penguinElse
+        penguinSay "never"
+    iceBucket i = i slideUp 1
+penguinSay total
+penguinSay fib(15)
+"""
+
+CHAIN = """
+penguinIf(choice == 1)
+    penguinSay "one"
+penguinWhatAbout(choice == 2)
+    penguinIf(x == "a")
+        penguinSay "a"
+    penguinWhatAbout(x == "b")
+        penguinSay "b"
+penguinWhatAbout(3 == choice)
+    penguinSay "three"
+penguinElse
+    penguinSay "other"
+"""
+
+
+def run_python(source, directory):
+    """
+    Runs generated Python code in a new process and returns what it printed.
+    """
+    script = os.path.join(directory, "program.py")
+    with open(script, "w", encoding="utf-8") as f:
+        f.write(source)
+    result = subprocess.run([sys.executable, script], capture_output=True, text=True, check=True)
+    return result.stdout
+
+
+class TestPgo(unittest.TestCase):
+    def setUp(self):
+        self.tokenizer = Tokenizer()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.profile_path = os.path.join(self.directory.name, "program.profile.json")
+
+    def collect(self, source):
+        compiled = PenguinBubbleCompiler(pgo_collect=True, profile_path=self.profile_path).compile(source)
+        output = run_python(compiled, self.directory.name)
+        return output, Profile.load(self.profile_path)
+
+    def test_reorder_branches(self):
+        tokens = self.tokenizer.tokenize(CHAIN)
+        profile = Profile(branches={1: 5, 3: 2, 4: 1, 6: 7, 8: 40, 10: 100})
+        reordered = reorder_branches(tokens, profile)
+        self.assertEqual(
+            [(token["type"], token.get("condition", token.get("value"))) for token in reordered],
+            [
+                ("penguinIf", "(3 == choice)"), ("penguinSay", '"three"'),
+                ("penguinWhatAbout", "(choice == 1)"), ("penguinSay", '"one"'),
+                ("penguinWhatAbout", "(choice == 2)"),
+                ("penguinIf", '(x == "b")'), ("penguinSay", '"b"'),
+                ("penguinWhatAbout", '(x == "a")'), ("penguinSay", '"a"'),
+                ("penguinElse", None), ("penguinSay", '"other"'),
+            ]
+        )
+        self.assertEqual(tokens[0]["type"], "penguinIf")
+
+    def test_reorder_needs_exclusive_conditions(self):
+        profile = Profile(branches={1: 1, 3: 50})
+        for conditions in (("n < 2", "n < 5"), ("n == 1", "n == 1.0"), ("n == 1", "m == 2"),
+                           ("n == 1", "f(n) == 2")):
+            source = (f"penguinIf({conditions[0]})\n    penguinSay 1\n"
+                      f"penguinWhatAbout({conditions[1]})\n    penguinSay 2\n")
+            tokens = self.tokenizer.tokenize(source)
+            self.assertIs(reorder_branches(tokens, profile), tokens, conditions)
+
+    def test_collect_profile(self):
+        output, profile = self.collect(PROGRAM)
+        self.assertEqual(output, "2345\n610\n")
+        self.assertEqual(profile.source, source_digest(PROGRAM))
+        self.assertEqual(profile.calls, {1: 1973, 5: 45, 7: 5})
+        self.assertEqual(profile.branches, {2: 987, 13: 5, 15: 45, 17: 0})
+
+    def test_use_profile(self):
+        expected, profile = self.collect(PROGRAM)
+        compiled = PenguinBubbleCompiler(pgo_profile=profile, pgo_hot_calls=20).compile(PROGRAM)
+
+        self.assertIn("if (kind == 1):\n        total = total + i * 2\n    elif (kind == 0):", compiled)
+        self.assertIn("half(i)", compiled)
+        self.assertIn("@_penguin_memoize(1024)\ndef fib(n):", compiled)
+        self.assertEqual(run_python(compiled, self.directory.name), expected)
+
+    def test_stale_profile_ignored(self):
+        _, profile = self.collect(PROGRAM)
+        edited = PROGRAM.replace("i < 50", "i < 60")
+        messages = io.StringIO()
+        with contextlib.redirect_stdout(messages):
+            compiled = PenguinBubbleCompiler(pgo_profile=profile, pgo_hot_calls=20).compile(edited)
+        self.assertIn("different version", messages.getvalue())
+        self.assertIn("if (kind == 0):", compiled)
+        self.assertNotIn("_penguin_memoize", compiled)
+
+    def test_invalid_profile(self):
+        compiled = PenguinBubbleCompiler(instrument=True, profile_path=self.profile_path).compile(PROGRAM)
+        run_python(compiled, self.directory.name)
+        with open(self.profile_path, encoding="utf-8") as f:
+            self.assertNotIn("branches", json.load(f))
+        with self.assertRaises(ValueError):
+            PenguinBubbleCompiler(pgo_profile=self.profile_path)
+
+if __name__ == '__main__':
+    unittest.main()
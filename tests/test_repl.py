@@ -0,0 +1,121 @@
+#Purpose:
+# Tests the interactive prompt, which runs PenguinBubble statements one entry at a time.
+
+"""
+Explanation:
+
+Test Cases:
+
+test_statement_runs_immediately: A statement outside a block runs as soon as it is fed.
+test_block_waits_for_blank_line: A block header keeps the entry open until an empty line closes it.
+test_if_chain_and_dedent: penguinElse continues a penguinIf; an unindented statement ends the block and runs.
+test_state_persists: Functions, variables and dynamic_input stay defined across entries.
+test_helpers_injected_once: Runtime helpers are only injected by the first entry that needs them.
+test_rebound_str: A str bound in an earlier entry is used by penguinSay concatenations in later ones.
+test_errors_keep_session: Syntax and run-time errors are reported without ending the session.
+test_interact: The interactive loop reads lines until end of input and runs the last open entry.
+"""
+
+import contextlib
+import io
+import unittest
+from unittest import mock
+from compiler.repl import PenguinRepl
+
+
+class TestRepl(unittest.TestCase):
+    def feed(self, repl, *lines):
+        """
+        Feeds lines to the REPL and returns (results of feed, printed output).
+        """
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            results = [repl.feed(line) for line in lines]
+        return results, stdout.getvalue()
+
+    def test_statement_runs_immediately(self):
+        repl = PenguinRepl()
+        self.assertEqual(self.feed(repl, 'penguinSay "hi"'), ([False], "hi\n"))
+        self.assertEqual(self.feed(repl, ""), ([False], ""))
+
+    def test_block_waits_for_blank_line(self):
+        repl = PenguinRepl()
+        results, output = self.feed(repl, "keepWalking(x < 3)", "    iceBucket x = x slideUp 1")
+        self.assertEqual((results, output), ([True, True], ""))
+        repl.namespace["x"] = 0
+        self.assertEqual(self.feed(repl, ""), ([False], ""))
+        self.assertEqual(repl.namespace["x"], 3)
+
+    def test_if_chain_and_dedent(self):
+        repl = PenguinRepl()
+        results, output = self.feed(
+            repl,
+            "iceBucket x = 2",
+            "penguinIf(x > 3)",
+            '    penguinSay "big"',
+            "penguinElse",
+            '    penguinSay "small"',
+            'penguinSay "after"',
+        )
+        self.assertEqual(results, [False, True, True, True, True, False])
+        self.assertEqual(output, "small\nafter\n")
+
+    def test_state_persists(self):
+        repl = PenguinRepl({"memoize": True})
+        self.feed(repl, "penguinDo(square)(n)", "    returnIce n penguinBoost n", "")
+        self.feed(repl, "iceBucket total = square(4)")
+        with mock.patch("builtins.input", return_value="2.5"):
+            self.feed(repl, 'penguinTake(factor) "Factor? "')
+        results, output = self.feed(repl, "penguinSay total * factor")
+        self.assertEqual(output, "40.0\n")
+        self.assertEqual(repl.namespace["square"].cache_info().misses, 1)
+
+    def test_rebound_str(self):
+        for backend in ("source", "ast"):
+            repl = PenguinRepl({"backend": backend})
+            self.feed(repl, 'iceBucket str = lambda value: "X"')
+            self.assertEqual(self.feed(repl, 'penguinSay "a" + str(1)')[1], "aX\n")
+            self.assertEqual(self.feed(PenguinRepl({"backend": backend}), 'penguinSay "a" + str(1)')[1], "a1\n")
+
+    def test_helpers_injected_once(self):
+        repl = PenguinRepl({"buffered_output": True})
+        self.feed(repl, 'penguinSay "one"')
+        buffer = repl.namespace["_penguin_buffer"]
+        self.assertIn("_penguin_say", repl.defined_helpers)
+        with contextlib.redirect_stdout(io.StringIO()):
+            source = repl.compiler.compile('penguinSay "two"', skip_helpers=repl.defined_helpers)
+        self.assertNotIn("def dynamic_input", source)
+        self.assertNotIn("_penguin_buffer = []", source)
+        self.assertEqual(self.feed(repl, 'penguinSay "two"')[1], "two\n")
+        self.assertIs(repl.namespace["_penguin_buffer"], buffer)
+
+    def test_errors_keep_session(self):
+        repl = PenguinRepl()
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            _, output = self.feed(repl, "iceBucket y = 1 givePenguins 0", "    penguinSay 1", "iceBucket z = (")
+        self.assertIn("ZeroDivisionError", stderr.getvalue())
+        self.assertIn('File "<entry 1>", line 1', stderr.getvalue())
+        self.assertIn("unexpected indentation", output)
+        self.assertIn("Syntax Error", output)
+        self.assertEqual(self.feed(repl, 'penguinSay "ok"')[1], "ok\n")
+
+    def test_interact(self):
+        lines = iter(["iceBucket total = 0", "keepWalking(total < 5)", "    iceBucket total = total slideUp 2"])
+
+        def read(prompt):
+            prompts.append(prompt)
+            try:
+                return next(lines)
+            except StopIteration:
+                raise EOFError
+
+        prompts = []
+        repl = PenguinRepl()
+        with contextlib.redirect_stdout(io.StringIO()):
+            repl.interact(read)
+        self.assertEqual(prompts, ["pg> ", "pg> ", "... ", "... "])
+        self.assertEqual(repl.namespace["total"], 6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -15,10 +15,33 @@ test_keep_walking: Verifies keepWalking loops.
 test_penguin_if_else: Tests if-else statements.
 test_custom_arithmetic_operations: Checks custom arithmetic operations mapping.
 test_unrecognized_syntax: Ensures unrecognized commands are skipped.
+test_penguin_flock: Checks penguinFlock extracts the flock name and its initial values.
+test_penguin_bring: Checks penguinBring extracts the module name.
+test_start_index: Line indices continue from the given start index.
+test_chunk_bounds: Chunks are only cut before non-empty lines without indentation.
+test_tokenize_parallel: Parallel tokenization produces the same tokens as tokenize.
+test_parallel_cutoff: Small sources, fewer than 3 workers and machines with 1 or 2 CPUs tokenize without worker processes.
+test_retokenize: Retokenizing an edit in place gives the tokens of the edited source and keeps untouched tokens.
+test_retokenize_invalid_range: An edit whose range ends before it starts is rejected.
+test_retokenize_physical_lines: Edits in physical line numbers, including blank lines, keep tokens and line counts in step.
 """
 import unittest
+import unittest.mock
 from compiler.tokenizer import Tokenizer
 
+PARALLEL_SOURCE = """penguinDo(addOperation)(x, y)
+    returnIce x slideUp y
+
+penguinTake(num1) "Enter a number: "
+penguinIf(num1 > 0)
+    penguinSay addOperation(num1, 1)
+
+penguinElse
+    penguinSay "zero"
+keepWalking(num1 < 3)
+    slideUp(num1) = num1 + 1
+"""
+
 class TestTokenizer(unittest.TestCase):
     def setUp(self):
         self.tokenizer = Tokenizer()
@@ -127,5 +150,93 @@ penguinElse
         expected = []  # Should skip unrecognized syntax
         self.assertEqual(tokens, expected)
 
+    def test_penguin_flock(self):
+        code = 'penguinFlock(scores) [3, 5, 8]'
+        tokens = self.tokenizer.tokenize(code)
+        expected = [{"type": "penguinFlock", "name": "scores", "value": "[3, 5, 8]", "indent": 0, "index": 1}]
+        self.assertEqual(tokens, expected)
+    def test_penguin_bring(self):
+        tokens = self.tokenizer.tokenize('penguinBring(shapes.circle)')
+        expected = [{"type": "penguinBring", "name": "shapes.circle", "indent": 0, "index": 1}]
+        self.assertEqual(tokens, expected)
+
+    def test_start_index(self):
+        tokens = self.tokenizer.tokenize('penguinSay "a"\n\npenguinSay "b"', start_index=10)
+        self.assertEqual([token["index"] for token in tokens], [11, 12])
+
+    def test_chunk_bounds(self):
+        lines = PARALLEL_SOURCE.split("\n")
+        bounds = self.tokenizer._chunk_bounds(lines, 4)
+        self.assertEqual(bounds[0][0], 0)
+        self.assertEqual(bounds[-1][1], len(lines))
+        for (_, end), (start, _) in zip(bounds, bounds[1:]):
+            self.assertEqual(end, start)
+            self.assertTrue(lines[start] and not lines[start][0].isspace())
+
+    def test_tokenize_parallel(self):
+        code = PARALLEL_SOURCE * 20
+        expected = self.tokenizer.tokenize(code)
+        with unittest.mock.patch("os.cpu_count", return_value=4):
+            self.assertEqual(self.tokenizer.tokenize_parallel(code, workers=3, min_size=0), expected)
+        self.assertEqual(self.tokenizer.tokenize_parallel(code, workers=1), expected)
+
+    def test_parallel_cutoff(self):
+        code = PARALLEL_SOURCE * 20
+        expected = self.tokenizer.tokenize(code)
+        with unittest.mock.patch("compiler.tokenizer.ProcessPoolExecutor", side_effect=AssertionError):
+            with unittest.mock.patch("os.cpu_count", return_value=4):
+                self.assertEqual(self.tokenizer.tokenize_parallel(code, workers=4), expected)
+                self.assertEqual(self.tokenizer.tokenize_parallel(code, workers=4, min_size=len(code) + 1), expected)
+                self.assertEqual(self.tokenizer.tokenize_parallel(code, workers=2, min_size=0), expected)
+            for cpus in (1, 2):
+                with unittest.mock.patch("os.cpu_count", return_value=cpus):
+                    self.assertEqual(self.tokenizer.tokenize_parallel(code, workers=4, min_size=0), expected)
+
+    def test_retokenize(self):
+        lines = [ln for ln in PARALLEL_SOURCE.split("\n") if ln.strip()]
+        edits = [
+            {"first": 5, "last": 5, "text": '    penguinSay "positive"'},
+            {"first": 2, "last": 2, "text": "    iceBucket z = x\n\n    returnIce z"},
+            {"first": 3, "last": 7, "text": ""},
+            {"first": 4, "last": 3, "text": 'penguinSay "inserted"'},
+            {"first": 10, "last": 9, "text": 'penguinSay "end"'},
+        ]
+        for edit in edits:
+            edited = lines[:edit["first"] - 1] + edit["text"].split("\n") + lines[edit["last"]:]
+            tokens = self.tokenizer.tokenize(PARALLEL_SOURCE)
+            first, last = tokens[0], tokens[-1]
+            self.assertIs(self.tokenizer.retokenize(tokens, edit), tokens)
+            self.assertEqual(tokens, self.tokenizer.tokenize("\n".join(edited)), edit)
+            self.assertIs(tokens[0], first)
+            if edit["last"] < 9:
+                self.assertIs(tokens[-1], last)
+
+    def test_retokenize_invalid_range(self):
+        with self.assertRaises(ValueError):
+            self.tokenizer.retokenize([], {"first": 3, "last": 1, "text": ""})
+
+    def test_retokenize_physical_lines(self):
+        edits = [
+            {"first_line": 3, "last_line": 2, "text": ""},
+            {"first_line": 2, "last_line": 2, "text": "    iceBucket z = x\n\n\n    returnIce z"},
+            {"first_line": 4, "last_line": 9, "text": "penguinSay 1"},
+            {"first_line": 1, "last_line": 1, "text": ""},
+        ]
+        source = PARALLEL_SOURCE
+        tokens = self.tokenizer.tokenize(source)
+        counts = self.tokenizer.line_counts(source)
+        for edit in edits:
+            lines = source.split("\n")
+            lines[edit["first_line"] - 1:edit["last_line"]] = edit["text"].split("\n")
+            source = "\n".join(lines)
+            self.tokenizer.retokenize(tokens, edit, line_counts=counts)
+            self.assertEqual(tokens, self.tokenizer.tokenize(source), edit)
+            self.assertEqual(counts, self.tokenizer.line_counts(source), edit)
+
+        with self.assertRaises(ValueError):
+            self.tokenizer.retokenize(tokens, {"first_line": 1, "last_line": 1, "text": ""})
+        with self.assertRaises(ValueError):
+            self.tokenizer.retokenize(tokens, {"first_line": 1, "last_line": len(counts), "text": ""}, counts)
+
 if __name__ == '__main__':
     unittest.main()